@@ -0,0 +1,18 @@
+-- CreateTable
+CREATE TABLE "public"."StockIntraday" (
+    "id" TEXT NOT NULL,
+    "symbol" TEXT NOT NULL,
+    "interval" TEXT NOT NULL,
+    "time" TIMESTAMP(3) NOT NULL,
+    "open" DOUBLE PRECISION NOT NULL,
+    "high" DOUBLE PRECISION NOT NULL,
+    "low" DOUBLE PRECISION NOT NULL,
+    "close" DOUBLE PRECISION NOT NULL,
+    "volume" INTEGER NOT NULL,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT "StockIntraday_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE UNIQUE INDEX "StockIntraday_symbol_interval_time_key" ON "public"."StockIntraday"("symbol", "interval", "time");
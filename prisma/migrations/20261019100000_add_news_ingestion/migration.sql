@@ -0,0 +1,23 @@
+-- AlterTable
+ALTER TABLE "public"."News" ADD COLUMN     "category" TEXT,
+ADD COLUMN     "impactScore" DOUBLE PRECISION,
+ADD COLUMN     "sentiment" TEXT,
+ADD COLUMN     "tags" TEXT[];
+
+-- CreateTable
+CREATE TABLE "public"."NewsSymbol" (
+    "newsId" TEXT NOT NULL,
+    "symbol" TEXT NOT NULL,
+    "publishedAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "NewsSymbol_pkey" PRIMARY KEY ("newsId","symbol")
+);
+
+-- CreateIndex
+CREATE INDEX "News_publishedAt_idx" ON "public"."News"("publishedAt");
+
+-- CreateIndex
+CREATE INDEX "NewsSymbol_symbol_publishedAt_idx" ON "public"."NewsSymbol"("symbol", "publishedAt");
+
+-- AddForeignKey
+ALTER TABLE "public"."NewsSymbol" ADD CONSTRAINT "NewsSymbol_newsId_fkey" FOREIGN KEY ("newsId") REFERENCES "public"."News"("id") ON DELETE CASCADE ON UPDATE CASCADE;
@@ -0,0 +1,11 @@
+-- DropIndex
+DROP INDEX "public"."News_publishedAt_idx";
+
+-- DropIndex
+DROP INDEX "public"."NewsSymbol_symbol_publishedAt_idx";
+
+-- CreateIndex
+CREATE INDEX "News_publishedAt_id_idx" ON "public"."News"("publishedAt", "id");
+
+-- CreateIndex
+CREATE INDEX "NewsSymbol_symbol_publishedAt_newsId_idx" ON "public"."NewsSymbol"("symbol", "publishedAt", "newsId");
@@ -0,0 +1,2 @@
+-- AlterTable
+ALTER TABLE "public"."News" ADD COLUMN     "clusterId" TEXT;
@@ -0,0 +1,13 @@
+-- CreateTable
+CREATE TABLE "public"."NewsSentimentDaily" (
+    "symbol" TEXT NOT NULL,
+    "date" TEXT NOT NULL,
+    "count" INTEGER NOT NULL,
+    "positive" INTEGER NOT NULL,
+    "negative" INTEGER NOT NULL,
+    "neutral" INTEGER NOT NULL,
+    "impactSum" DOUBLE PRECISION NOT NULL,
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "NewsSentimentDaily_pkey" PRIMARY KEY ("symbol","date")
+);
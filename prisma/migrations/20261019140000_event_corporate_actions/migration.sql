@@ -0,0 +1,9 @@
+-- AlterTable
+ALTER TABLE "public"."Event" ADD COLUMN     "cashDividend" DOUBLE PRECISION,
+ADD COLUMN     "externalId" TEXT,
+ADD COLUMN     "rightsPrice" DOUBLE PRECISION,
+ADD COLUMN     "rightsRatio" DOUBLE PRECISION,
+ADD COLUMN     "shareRatio" DOUBLE PRECISION;
+
+-- CreateIndex
+CREATE UNIQUE INDEX "Event_stockId_externalId_key" ON "public"."Event"("stockId", "externalId");
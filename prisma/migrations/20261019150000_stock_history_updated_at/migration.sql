@@ -0,0 +1,2 @@
+-- AlterTable
+ALTER TABLE "public"."StockHistory" ADD COLUMN     "updatedAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP;
@@ -1,16 +1,32 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Query
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 import logging
 import asyncio
-from datetime import datetime
+import json
+from datetime import date, datetime
 
 from ..models import (
     StockPrice, StockInfo, StockHistory, SyncRequest, SyncResponse, MarketIndex,
-    NewsArticle, NewsCategory, NewsFilter, NewsResponse
+    NewsArticle, NewsCategory, NewsFilter, NewsResponse, NewsSentimentDay, PortfolioValuation,
+    PortfolioRisk, OptimizeRequest, OptimizeResponse, ScreenerRequest, ScreenerResponse, CorporateEvent
 )
 from ..services.vnstock_service import vnstock_service
 from ..services.database import db_service
 from ..services.news_service import news_service
+from ..services.news_ingestion import news_ingestion_service
+from ..services.news_sentiment import news_sentiment_service
+from ..services.portfolio_service import portfolio_service
+from ..services.risk_service import risk_service
+from ..services.adjustment_service import adjustment_service
+from ..services.bar_store import bar_store
+from ..services.price_matrix import price_matrix_service
+from ..services.screener_service import screener_service
+from ..services.trading_calendar import trading_calendar
+from ..services.resilience import CircuitBreaker, breaker_states
+from ..services.realtime_service import quote_hub
+from ..utils.pagination import decode_cursor
+from ..utils.resample import SUPPORTED_INTERVALS
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -21,7 +37,14 @@ async def root():
 
 @router.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now()}
+    breakers = breaker_states()
+    # Report degraded (not unhealthy) while an upstream circuit is open
+    degraded = any(b["state"] != CircuitBreaker.CLOSED for b in breakers.values())
+    return {
+        "status": "degraded" if degraded else "healthy",
+        "circuit_breakers": breakers,
+        "timestamp": datetime.now()
+    }
 
 @router.get("/stocks/{symbol}/price", response_model=StockPrice)
 async def get_stock_price(symbol: str):
@@ -48,27 +71,156 @@ async def get_stock_info(symbol: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/stocks/{symbol}/history", response_model=StockHistory)
-async def get_stock_history(symbol: str, period: str = "1Y"):
+async def get_stock_history(
+    symbol: str,
+    period: str = "1Y",
+    adjusted: bool = Query(False, description="Adjust earlier bars for dividends, bonus shares and splits")
+):
     """Get historical stock data"""
     try:
         stock_history = vnstock_service.get_stock_history(symbol.upper(), period)
         if not stock_history:
             raise HTTPException(status_code=404, detail=f"Stock history for {symbol} not found")
+        if adjusted:
+            stock_history = adjustment_service.adjust(stock_history)
         return stock_history
     except Exception as e:
         logger.error(f"Error getting stock history: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/stocks/{symbol}/events", response_model=List[CorporateEvent])
+async def get_corporate_events(symbol: str):
+    """Stored price-adjusting corporate actions of a stock, oldest first"""
+    try:
+        return adjustment_service.get_events(symbol.upper())
+    except Exception as e:
+        logger.error(f"Error getting corporate events: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/stocks/{symbol}/events/sync")
+async def sync_corporate_events(symbol: str):
+    """Fetch dividends, bonus issues, splits and rights issues from the data source into Event"""
+    try:
+        loop = asyncio.get_running_loop()
+        stored = await loop.run_in_executor(None, adjustment_service.ingest, symbol.upper())
+        if stored is None:
+            raise HTTPException(status_code=404, detail=f"Stock {symbol} is not synced yet")
+        return {"symbol": symbol.upper(), "stored": stored}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error syncing corporate events: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+MAX_BAR_DAYS = 3650
+
+@router.get("/stocks/{symbol}/bars", response_model=StockHistory)
+async def get_stock_bars(
+    symbol: str,
+    interval: str = Query("1D", description="1m, 5m, 15m, 30m, 1H, 1D, 1W or 1M"),
+    days: Optional[int] = Query(None, ge=1, le=MAX_BAR_DAYS, description="Lookback in calendar days")
+):
+    """Get OHLCV bars, resampled from the finest stored granularity"""
+    if interval not in SUPPORTED_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"Unsupported interval {interval}")
+    try:
+        bars = vnstock_service.get_stock_bars(symbol.upper(), interval, days)
+        if not bars:
+            raise HTTPException(status_code=404, detail=f"{interval} bars for {symbol} not found")
+        return bars
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting stock bars: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/market/indices", response_model=List[MarketIndex])
-async def get_market_indices():
+async def get_market_indices(
+    indices: Optional[str] = Query(None, description="Indices to fetch (comma-separated, e.g. VNINDEX,VN30)")
+):
     """Get market indices data"""
     try:
-        indices = vnstock_service.get_market_indices()
+        index_list = [s.strip().upper() for s in indices.split(',')] if indices else None
+        indices = vnstock_service.get_market_indices(index_list)
         return indices
     except Exception as e:
         logger.error(f"Error getting market indices: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.websocket("/ws/quotes")
+async def quotes_websocket(websocket: WebSocket, symbols: Optional[str] = None):
+    """Push realtime quote deltas over WebSocket.
+    
+    Clients send {"action": "subscribe" | "unsubscribe", "symbols": [...]}
+    to change their symbol set; an invalid command gets an error message.
+    """
+    await websocket.accept()
+    try:
+        subscription = quote_hub.subscribe(symbols.split(',') if symbols else [])
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    
+    async def receive_commands():
+        while True:
+            message = await websocket.receive_json()
+            try:
+                if not isinstance(message, dict):
+                    raise ValueError("Commands must be JSON objects")
+                requested = message.get('symbols', [])
+                if message.get('action') == 'unsubscribe':
+                    quote_hub.remove_symbols(subscription, requested)
+                else:
+                    quote_hub.add_symbols(subscription, requested)
+            except ValueError as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+    
+    async def send_quotes():
+        while True:
+            await websocket.send_json(await subscription.get())
+    
+    tasks = [asyncio.create_task(receive_commands()), asyncio.create_task(send_quotes())]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() and not isinstance(task.exception(), WebSocketDisconnect):
+                logger.error(f"Quote websocket error: {task.exception()}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        quote_hub.unsubscribe(subscription)
+
+@router.get("/stream/quotes")
+async def stream_quotes(request: Request, symbols: str = Query(..., description="Symbols to stream (comma-separated)")):
+    """Push realtime quote deltas as Server-Sent Events"""
+    try:
+        subscription = quote_hub.subscribe(symbols.split(','))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def event_stream():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(subscription.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+        finally:
+            quote_hub.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/stream/stats")
+async def stream_stats():
+    """Realtime quote hub statistics"""
+    return quote_hub.stats()
+
 @router.get("/stocks/search")
 async def search_stocks(q: str, limit: int = 10):
     """Search for stocks"""
@@ -179,12 +331,19 @@ async def sync_stocks_task(symbols: List[str], period: str = "1Y"):
                 else:
                     logger.error(f"Failed to update info for {symbol}")
             
-            # Get historical data
-            history_data = vnstock_service.get_stock_history(symbol, period)
+            # Corporate actions for adjusted history; the stock row exists by now
+            events_stored = adjustment_service.ingest(symbol)
+            if events_stored:
+                logger.info(f"Stored {events_stored} corporate events for {symbol}")
+            
+            # Get historical data; always downloaded so upstream corrections reach the stores
+            history_data = vnstock_service.get_stock_history(symbol, period, use_store=False)
             if history_data:
-                # Convert to database format
+                # Convert to database format; a session still trading has no final bar yet
                 history_list = []
                 for item in history_data.data:
+                    if not trading_calendar.session_closed(item.date):
+                        continue
                     history_list.append({
                         'date': item.date,
                         'open': item.open,
@@ -197,8 +356,19 @@ async def sync_stocks_task(symbols: List[str], period: str = "1Y"):
                 
                 if db_service.insert_stock_history(symbol, history_list):
                     logger.info(f"Updated history for {symbol}")
+                    price_matrix_service.apply_bars(symbol, history_list)
                 else:
                     logger.error(f"Failed to update history for {symbol}")
+                if bar_store.enabled and not bar_store.write(symbol, history_list):
+                    logger.error(f"Failed to write stored bars for {symbol}")
+                
+                # Sessions inside the fetched range without a bar: suspensions or a partial download
+                missing = trading_calendar.missing_sessions([item.date for item in history_data.data])
+                if missing:
+                    logger.warning(
+                        f"{symbol} history has no bars for {len(missing)} trading sessions: {', '.join(missing[:5])}"
+                        + (" ..." if len(missing) > 5 else "")
+                    )
             
             synced_symbols.append(symbol)
             
@@ -210,17 +380,112 @@ async def sync_stocks_task(symbols: List[str], period: str = "1Y"):
             failed_symbols.append(symbol)
     
     logger.info(f"Sync completed. Success: {len(synced_symbols)}, Failed: {len(failed_symbols)}")
+    
+    # Prices changed: recompute the valuation snapshots that hold these symbols
+    refreshed = portfolio_service.refresh_for_symbols(synced_symbols)
+    if refreshed:
+        logger.info(f"Refreshed {refreshed} portfolio valuation snapshots")
+
+# Portfolio API Endpoints
+MAX_OPTIMIZE_SYMBOLS = 500
+MAX_FRONTIER_POINTS = 200
+MIN_RISK_WINDOW = 20
+MAX_RISK_WINDOW = 1250  # 5Y of daily returns, shared by the risk and optimisation endpoints
+
+@router.post("/portfolios/optimize", response_model=OptimizeResponse)
+async def optimize_portfolio(request: OptimizeRequest):
+    """Min-variance, mean-variance or risk-parity weights and an optional efficient frontier"""
+    if not request.symbols or len(request.symbols) > MAX_OPTIMIZE_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"Provide 1 to {MAX_OPTIMIZE_SYMBOLS} symbols")
+    if not 0 <= request.frontier_points <= MAX_FRONTIER_POINTS:
+        raise HTTPException(status_code=400, detail=f"frontier_points must be 0 to {MAX_FRONTIER_POINTS}")
+    if not MIN_RISK_WINDOW <= request.window <= MAX_RISK_WINDOW:
+        raise HTTPException(status_code=400, detail=f"window must be {MIN_RISK_WINDOW} to {MAX_RISK_WINDOW} returns")
+    if request.risk_aversion <= 0:
+        raise HTTPException(status_code=400, detail="risk_aversion must be positive")
+    try:
+        loop = asyncio.get_running_loop()
+        # CPU-bound solve; keep the event loop free
+        return await loop.run_in_executor(None, risk_service.optimize, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error optimizing portfolio: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+MAX_SCREENER_RESULTS = 500
+
+@router.post("/screener", response_model=ScreenerResponse)
+async def screen_stocks(request: ScreenerRequest):
+    """Filter and rank the market with an expression over fundamentals and technical indicators"""
+    if not 1 <= request.limit <= MAX_SCREENER_RESULTS:
+        raise HTTPException(status_code=400, detail=f"limit must be 1 to {MAX_SCREENER_RESULTS}")
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, screener_service.screen, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error screening stocks: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/portfolios/{portfolio_id}/valuation", response_model=PortfolioValuation)
+async def get_portfolio_valuation(
+    portfolio_id: str,
+    refresh: bool = Query(False, description="Recompute instead of serving the snapshot")
+):
+    """Market value, unrealised P&L, weights and day change of every holding in a portfolio"""
+    try:
+        valuation = portfolio_service.get_valuation(portfolio_id, refresh)
+        if valuation is None:
+            raise HTTPException(status_code=404, detail=f"Portfolio {portfolio_id} not found")
+        return valuation
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error valuing portfolio {portfolio_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/portfolios/{portfolio_id}/risk", response_model=PortfolioRisk)
+async def get_portfolio_risk(
+    portfolio_id: str,
+    window: int = Query(250, ge=MIN_RISK_WINDOW, le=MAX_RISK_WINDOW, description="Daily returns to use"),
+    confidence: float = Query(0.95, gt=0.5, lt=1, description="VaR / CVaR confidence level")
+):
+    """Volatility, beta, VaR/CVaR, drawdown and correlations of a portfolio from stored history"""
+    try:
+        portfolio_risk = risk_service.analyze_portfolio(portfolio_id, window, confidence)
+        if portfolio_risk is None:
+            raise HTTPException(status_code=404, detail=f"Portfolio {portfolio_id} not found")
+        return portfolio_risk
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error analysing risk for portfolio {portfolio_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 # News API Endpoints
+def _validate_news_cursor(cursor: Optional[str]):
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("/news", response_model=NewsResponse)
 async def get_news(
     category: Optional[str] = Query(None, description="Filter by category"),
     symbols: Optional[str] = Query(None, description="Filter by symbols (comma-separated)"),
     sentiment: Optional[str] = Query(None, description="Filter by sentiment"),
     limit: int = Query(20, description="Number of articles to return"),
-    page: int = Query(1, description="Page number")
+    page: int = Query(1, description="Page number"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    collapse: bool = Query(True, description="Return one article per near-duplicate story")
 ):
     """Get news articles with optional filtering"""
+    _validate_news_cursor(cursor)
     try:
         # Parse symbols if provided
         symbol_list = None
@@ -233,16 +498,45 @@ async def get_news(
             symbols=symbol_list,
             sentiment=sentiment,
             limit=limit,
-            page=page
+            page=page,
+            cursor=cursor,
+            collapse_stories=collapse
         )
         
-        news_response = news_service.get_all_news(filters)
+        news_response = await news_service.get_stored_news(filters)
         return news_response
         
     except Exception as e:
         logger.error(f"Error getting news: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/news/search", response_model=NewsResponse)
+async def search_news(
+    q: str = Query(..., min_length=1, description='Keywords; diacritics optional, "quoted phrases" supported'),
+    limit: int = Query(20, ge=1, le=100, description="Number of articles to return")
+):
+    """Full-text search over news, ranked by relevance"""
+    try:
+        return await news_service.search_news(q, limit)
+    except Exception as e:
+        logger.error(f"Error searching news: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/news/ingestion")
+async def get_news_ingestion_status():
+    """Get background news ingestion status"""
+    return news_ingestion_service.status()
+
+@router.post("/news/ingestion/run")
+async def run_news_ingestion():
+    """Run one news ingestion pass immediately"""
+    try:
+        new_articles = await news_ingestion_service.run_once()
+        return {"new_articles": len(new_articles), "status": news_ingestion_service.status()}
+    except Exception as e:
+        logger.error(f"Error running news ingestion: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/news/categories", response_model=List[NewsCategory])
 async def get_news_categories():
     """Get available news categories"""
@@ -253,20 +547,43 @@ async def get_news_categories():
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/news/stocks/{symbol}", response_model=List[NewsArticle])
-async def get_news_by_symbol(symbol: str, limit: int = Query(10, description="Number of articles")):
+async def get_news_by_symbol(
+    symbol: str,
+    response: Response,
+    limit: int = Query(10, description="Number of articles"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page")
+):
     """Get news articles related to a specific stock symbol"""
+    _validate_news_cursor(cursor)
     try:
-        articles = news_service.get_news_by_symbol(symbol.upper(), limit)
-        return articles
+        news_response = await news_service.get_stored_news_by_symbol(symbol.upper(), limit, cursor)
+        if news_response.next_cursor:
+            response.headers["X-Next-Cursor"] = news_response.next_cursor
+        return news_response.articles
     except Exception as e:
         logger.error(f"Error getting news for symbol {symbol}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/news/stocks/{symbol}/sentiment", response_model=List[NewsSentimentDay])
+async def get_news_sentiment(
+    symbol: str,
+    from_date: Optional[date] = Query(None, alias="from", description="First session date (YYYY-MM-DD)"),
+    to_date: Optional[date] = Query(None, alias="to", description="Last session date (YYYY-MM-DD)")
+):
+    """Daily news sentiment for a symbol, keyed by trading session like stock history"""
+    if from_date and to_date and from_date > to_date:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    try:
+        return await news_sentiment_service.get_daily(symbol, from_date, to_date)
+    except Exception as e:
+        logger.error(f"Error getting news sentiment for {symbol}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/news/cafef", response_model=List[NewsArticle])
 async def get_cafef_news(limit: int = Query(20, description="Number of articles")):
     """Get news from CafeF RSS feed"""
     try:
-        articles = news_service.get_news_from_cafef(limit)
+        articles = await news_service.get_stored_news_by_source('cafef', limit)
         return articles
     except Exception as e:
         logger.error(f"Error getting CafeF news: {e}")
@@ -276,12 +593,28 @@ async def get_cafef_news(limit: int = Query(20, description="Number of articles"
 async def get_vnexpress_news(limit: int = Query(20, description="Number of articles")):
     """Get news from VnExpress RSS feed"""
     try:
-        articles = news_service.get_news_from_vnexpress(limit)
+        articles = await news_service.get_stored_news_by_source('vnexpress', limit)
         return articles
     except Exception as e:
         logger.error(f"Error getting VnExpress news: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/news/sources")
+async def get_news_sources():
+    """List configured news sources"""
+    return [{"key": source.key, "name": source.name} for source in news_service.news_sources.values()]
+
+@router.get("/news/sources/{source_key}", response_model=List[NewsArticle])
+async def get_news_by_source(source_key: str, limit: int = Query(20, description="Number of articles")):
+    """Get news from one configured source"""
+    if source_key not in news_service.news_sources:
+        raise HTTPException(status_code=404, detail=f"News source {source_key} not found")
+    try:
+        return await news_service.get_stored_news_by_source(source_key, limit)
+    except Exception as e:
+        logger.error(f"Error getting {source_key} news: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/news/vnstock", response_model=List[NewsArticle])
 async def get_vnstock_news(symbol: Optional[str] = Query(None, description="Optional symbol filter")):
     """Get news from VNStock API"""
@@ -24,4 +24,59 @@ class Settings:
     # Sync Settings
     SYNC_INTERVAL_MINUTES = int(os.getenv("SYNC_INTERVAL_MINUTES", "15"))
     
+    # Upstream Resilience Settings
+    UPSTREAM_TIMEOUT_SECONDS = float(os.getenv("UPSTREAM_TIMEOUT_SECONDS", "10"))
+    REQUEST_BUDGET_SECONDS = float(os.getenv("REQUEST_BUDGET_SECONDS", "20"))
+    UPSTREAM_MAX_WORKERS = int(os.getenv("UPSTREAM_MAX_WORKERS", "16"))
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+    
+    # Market Settings (comma-separated, e.g. VNINDEX,HNXINDEX,UPCOM,VN30,HNX30)
+    MARKET_INDICES = [s for s in os.getenv("MARKET_INDICES", "VNINDEX,HNXINDEX,UPCOM").split(",") if s]
+    
+    # Realtime Settings
+    REALTIME_POLL_SECONDS = float(os.getenv("REALTIME_POLL_SECONDS", "3"))
+    REALTIME_MARKET_HOURS_ONLY = os.getenv("REALTIME_MARKET_HOURS_ONLY", "true").lower() == "true"
+    REALTIME_MAX_SYMBOLS = int(os.getenv("REALTIME_MAX_SYMBOLS", "100"))  # per connection
+    
+    # Intraday Settings
+    INTRADAY_BASE_INTERVAL = os.getenv("INTRADAY_BASE_INTERVAL", "1m")
+    INTRADAY_DEFAULT_DAYS = int(os.getenv("INTRADAY_DEFAULT_DAYS", "5"))
+    
+    # News Settings
+    NEWS_SOURCE_TIMEOUT_SECONDS = float(os.getenv("NEWS_SOURCE_TIMEOUT_SECONDS", "8"))
+    NEWS_SOURCES_FILE = os.getenv("NEWS_SOURCES_FILE")  # JSON list of extra/replacement RSS feeds
+    NEWS_INGEST_ENABLED = os.getenv("NEWS_INGEST_ENABLED", "true").lower() == "true"
+    NEWS_INGEST_INTERVAL_SECONDS = float(os.getenv("NEWS_INGEST_INTERVAL_SECONDS", "300"))
+    NEWS_INGEST_LIMIT_PER_SOURCE = int(os.getenv("NEWS_INGEST_LIMIT_PER_SOURCE", "50"))
+    NEWS_INDEX_MAX_ARTICLES = int(os.getenv("NEWS_INDEX_MAX_ARTICLES", "200000"))
+    NEWS_ENRICH_CACHE_SIZE = int(os.getenv("NEWS_ENRICH_CACHE_SIZE", "20000"))
+    NEWS_KEYWORDS_FILE = os.getenv("NEWS_KEYWORDS_FILE")  # JSON sentiment/category dictionaries
+    NEWS_DUPLICATE_THRESHOLD = float(os.getenv("NEWS_DUPLICATE_THRESHOLD", "0.5"))  # estimated Jaccard
+    NEWS_CLUSTER_WINDOW = int(os.getenv("NEWS_CLUSTER_WINDOW", "20000"))  # recent signatures kept
+    SYMBOL_REGISTRY_REFRESH_SECONDS = float(os.getenv("SYMBOL_REGISTRY_REFRESH_SECONDS", str(24 * 3600)))
+    
+    # Cache Settings
+    RATIO_CACHE_TTL_SECONDS = float(os.getenv("RATIO_CACHE_TTL_SECONDS", str(12 * 3600)))
+    # Portfolio valuation snapshots; syncs refresh them, the TTL picks up holding edits
+    PORTFOLIO_SNAPSHOT_TTL_SECONDS = float(os.getenv("PORTFOLIO_SNAPSHOT_TTL_SECONDS", "60"))
+    # Return matrices are keyed by the stored history version, so the TTL only bounds memory
+    RISK_RETURNS_CACHE_TTL_SECONDS = float(os.getenv("RISK_RETURNS_CACHE_TTL_SECONDS", str(6 * 3600)))
+    RISK_BENCHMARK = os.getenv("RISK_BENCHMARK", "VNINDEX")
+    # Wide dates x symbols price matrix behind the screener; reloaded when the stored history changes
+    PRICE_MATRIX_LOOKBACK_DAYS = int(os.getenv("PRICE_MATRIX_LOOKBACK_DAYS", "400"))
+    PRICE_MATRIX_CHECK_SECONDS = float(os.getenv("PRICE_MATRIX_CHECK_SECONDS", "60"))
+    # close and volume always; add open,high,low for OHLC work (float32, ~2 MB per field per 1,600 x 300)
+    PRICE_MATRIX_FIELDS = [f.strip() for f in os.getenv("PRICE_MATRIX_FIELDS", "close,volume").split(",") if f.strip()]
+    # Directory for a memory-mapped copy shared by all workers; empty keeps it per process
+    PRICE_MATRIX_MMAP_DIR = os.getenv("PRICE_MATRIX_MMAP_DIR", "")
+    # Columnar daily bar files written by syncs (full history, read via mmap); empty disables the store
+    BAR_STORE_DIR = os.getenv("BAR_STORE_DIR", "")
+    # vnstock quotes prices in thousands of VND; corporate-action amounts are stored in VND
+    PRICE_UNIT_VND = float(os.getenv("PRICE_UNIT_VND", "1000"))
+    # Events and factor vectors are dropped on ingestion, so the TTL only bounds staleness across workers
+    ADJUSTMENT_CACHE_TTL_SECONDS = float(os.getenv("ADJUSTMENT_CACHE_TTL_SECONDS", str(6 * 3600)))
+    # JSON {"<year>": ["YYYY-MM-DD", ...]} of exchange holidays replacing the built-in list for those years
+    TRADING_HOLIDAYS_FILE = os.getenv("TRADING_HOLIDAYS_FILE")
+    
 settings = Settings()
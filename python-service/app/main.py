@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from typing import List
 import logging
 import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime
 
 from .config import settings
@@ -16,12 +17,23 @@ from .services.database import db_service
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background jobs with the application"""
+    from .services.news_ingestion import news_ingestion_service
+    
+    if settings.NEWS_INGEST_ENABLED:
+        news_ingestion_service.start()
+    yield
+    await news_ingestion_service.stop()
+
 def create_app() -> FastAPI:
     """Create and configure FastAPI application"""
     app = FastAPI(
         title="VNStock API Service",
         description="Python service for Vietnam Stock Market data using vnstock",
-        version="1.0.0"
+        version="1.0.0",
+        lifespan=lifespan
     )
 
     # Configure CORS
@@ -31,6 +43,8 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # Cursor-paginated news lists return the next page's cursor in a header
+        expose_headers=["X-Next-Cursor"],
     )
 
     # Include routes
@@ -1,6 +1,7 @@
-from typing import List, Optional, Dict, Any
-from pydantic import BaseModel
+from typing import List, Optional, Dict, Any, Union
+from pydantic import BaseModel, field_validator
 from datetime import datetime
+from .utils.timezones import as_utc
 
 class StockPrice(BaseModel):
     symbol: str
@@ -41,6 +42,125 @@ class StockHistory(BaseModel):
     symbol: str
     data: List[StockHistoryData]
 
+class CorporateEvent(BaseModel):
+    symbol: str
+    type: str  # DIVIDEND, STOCK_DIVIDEND, BONUS_SHARES, SPLIT, RIGHTS_ISSUE
+    title: str
+    ex_date: str  # first session trading without the entitlement
+    cash_dividend: Optional[float] = None  # VND per share
+    share_ratio: Optional[float] = None  # new shares per share held
+    rights_ratio: Optional[float] = None  # rights per share held
+    rights_price: Optional[float] = None  # VND per rights share
+    external_id: Optional[str] = None
+
+class HoldingValuation(BaseModel):
+    symbol: str
+    name: Optional[str] = None
+    quantity: int
+    avg_price: Optional[float] = None
+    price: Optional[float] = None  # currentPrice, else last close
+    market_value: Optional[float] = None
+    cost_basis: Optional[float] = None
+    unrealized_pnl: Optional[float] = None
+    unrealized_pnl_percent: Optional[float] = None
+    weight: Optional[float] = None  # share of the portfolio's priced market value
+    day_change: Optional[float] = None
+    day_change_percent: Optional[float] = None
+    trading_date: Optional[str] = None
+
+class PortfolioValuation(BaseModel):
+    portfolio_id: str
+    holdings: List[HoldingValuation]
+    market_value: float
+    cost_basis: float
+    unrealized_pnl: float
+    unrealized_pnl_percent: Optional[float] = None
+    day_change: float
+    day_change_percent: Optional[float] = None
+    as_of: datetime
+
+class HoldingRisk(BaseModel):
+    symbol: str
+    weight: float  # market-value weight among holdings with history
+    volatility: float  # annualised
+    beta: Optional[float] = None
+    risk_contribution: float  # share of portfolio variance
+
+class PortfolioRisk(BaseModel):
+    portfolio_id: str
+    benchmark: str
+    start_date: str
+    end_date: str
+    observations: int  # daily returns used
+    confidence: float
+    volatility: float  # annualised
+    beta: Optional[float] = None
+    var_historical: float  # one-day loss fractions
+    cvar_historical: float
+    var_parametric: float
+    cvar_parametric: float
+    max_drawdown: float
+    holdings: List[HoldingRisk]
+    correlation: List[List[float]]  # in holdings order
+    missing_symbols: List[str] = []  # held but without enough stored history
+
+class OptimizeRequest(BaseModel):
+    symbols: List[str]
+    method: str = "min_variance"  # min_variance, mean_variance, risk_parity
+    window: int = 250  # daily returns used for expected returns and covariance, 20 to 1250
+    min_weight: float = 0.0  # bounds apply to the variance methods; risk parity is long-only and rejects them
+    max_weight: float = 1.0
+    risk_aversion: float = 3.0  # mean_variance only, > 0
+    risk_free_rate: float = 0.0  # annual, for Sharpe ratios
+    frontier_points: int = 0  # > 0 adds an efficient frontier under the same bounds
+
+class AssetAllocation(BaseModel):
+    symbol: str
+    weight: float
+    expected_return: float  # annualised historical mean
+    volatility: float  # annualised
+    risk_contribution: float  # share of portfolio variance
+
+class FrontierPoint(BaseModel):
+    risk_aversion: float
+    expected_return: float
+    volatility: float
+    sharpe: Optional[float] = None
+    weights: Dict[str, float]
+
+class OptimizeResponse(BaseModel):
+    method: str
+    allocations: List[AssetAllocation]
+    expected_return: float
+    volatility: float
+    sharpe: Optional[float] = None
+    frontier: List[FrontierPoint] = []
+    start_date: str
+    end_date: str
+    observations: int
+    missing_symbols: List[str] = []  # requested but without enough stored history
+
+class ScreenerRequest(BaseModel):
+    expression: str  # e.g. "pe < 12 and roe > 15 and rsi14 < 30 and close > sma200"
+    sort_by: Optional[str] = None  # numeric expression to rank by; market_cap when omitted
+    descending: bool = True
+    limit: int = 50
+
+class ScreenerResult(BaseModel):
+    symbol: str
+    name: str
+    exchange: Optional[str] = None
+    sector: Optional[str] = None
+    score: Optional[float] = None  # value of the sort expression
+    values: Dict[str, Optional[Union[float, str]]]  # every field the request referenced
+
+class ScreenerResponse(BaseModel):
+    expression: str
+    total: int  # matches before the limit
+    results: List[ScreenerResult]
+    pushed_down: List[str] = []  # conditions answered by the database
+    as_of: Optional[str] = None  # last history date behind technical fields
+
 class SyncRequest(BaseModel):
     symbols: List[str]
     period: Optional[str] = "1Y"
@@ -73,6 +193,13 @@ class NewsArticle(BaseModel):
     sentiment: Optional[str] = None  # 'positive', 'negative', 'neutral'
     impact_score: Optional[float] = None  # 0-100 scale
     tags: List[str] = []
+    cluster_id: Optional[str] = None  # id of the story's representative article
+    
+    @field_validator('publish_date')
+    @classmethod
+    def _utc_publish_date(cls, value: datetime) -> datetime:
+        # Aware UTC; naive values are stored UTC times
+        return as_utc(value)
 
 class NewsCategory(BaseModel):
     id: str
@@ -86,9 +213,27 @@ class NewsFilter(BaseModel):
     from_date: Optional[datetime] = None
     to_date: Optional[datetime] = None
     limit: int = 20
+    page: int = 1
+    cursor: Optional[str] = None  # opaque; takes precedence over page
+    collapse_stories: bool = True  # one representative per near-duplicate story
+    
+    @field_validator('from_date', 'to_date')
+    @classmethod
+    def _utc_bounds(cls, value: Optional[datetime]) -> Optional[datetime]:
+        return as_utc(value) if value is not None else None
 
 class NewsResponse(BaseModel):
     articles: List[NewsArticle]
-    total: int
+    total: Optional[int] = None  # not counted for cursor pages read from the database
     page: int
     per_page: int
+    next_cursor: Optional[str] = None
+
+class NewsSentimentDay(BaseModel):
+    symbol: str
+    date: str  # trading session, same format as StockHistoryData.date
+    count: int
+    positive: int
+    negative: int
+    neutral: int
+    mean_impact: Optional[float] = None
@@ -0,0 +1,189 @@
+"""
+Corporate-action adjusted price series.
+
+Dividends, bonus issues, stock dividends, splits and rights issues are
+ingested from the data source into the "Event" table. History is stored raw;
+when an adjusted series is requested, each stored event's factor is derived
+from the last close before its ex-date and the factors are compounded into
+one vector per series, applied with a single vectorised multiplication. Both
+the events and the factor vectors are cached per symbol, so repeated reads
+only pay for the multiplication.
+"""
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..config import settings
+from ..models import CorporateEvent, StockHistory, StockHistoryData
+from ..utils import adjustments
+from ..utils.cache import TTLCache
+from ..utils.text_search import fold
+from .database import db_service
+from .vnstock_service import vnstock_service
+
+logger = logging.getLogger(__name__)
+
+ADJUSTING_TYPES = ('DIVIDEND', 'STOCK_DIVIDEND', 'BONUS_SHARES', 'SPLIT', 'RIGHTS_ISSUE')
+PAR_VALUE_VND = 10000
+
+
+def _number(value) -> Optional[float]:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if np.isfinite(number) and number > 0 else None
+
+
+def _fraction(value) -> Optional[float]:
+    """A ratio in the unit its field states, never guessed from its size.
+
+    vnstock publishes ratios as fractions (0.2). Text carries its own unit:
+    "20%" is a percentage and "10:3" is old shares to new shares.
+    """
+    if isinstance(value, str):
+        text = value.strip().replace(',', '.')
+        if text.endswith('%'):
+            number = _number(text[:-1])
+            return number / 100 if number is not None else None
+        if ':' in text:
+            old, _, new = text.partition(':')
+            old, new = _number(old), _number(new)
+            return new / old if old is not None and new is not None else None
+    return _number(value)
+
+
+def parse_events(symbol: str, frame: Optional[pd.DataFrame]) -> List[CorporateEvent]:
+    """Price-adjusting events from a vnstock ``Company.events()`` frame; other events are skipped"""
+    if frame is None or frame.empty:
+        return []
+    events = []
+    for row in frame.to_dict('records'):
+        ex_date = row.get('exright_date') or row.get('exer_right_date')
+        if not isinstance(ex_date, str) or not ex_date:
+            continue
+        code = str(row.get('event_list_code') or '').upper()
+        title = str(row.get('event_title') or row.get('event_list_name') or code)
+        folded = fold(title)
+        ratio, value = _fraction(row.get('ratio')), _number(row.get('value'))
+
+        fields = {}
+        if code == 'DIV' or 'co tuc bang tien' in folded:
+            event_type = 'DIVIDEND'
+            # The amount is sometimes only given as a share of par value
+            fields['cash_dividend'] = value or (ratio * PAR_VALUE_VND if ratio else None)
+        elif code == 'ISS' or 'co phieu' in folded:
+            if 'quyen mua' in folded:
+                event_type = 'RIGHTS_ISSUE'
+                fields['rights_ratio'], fields['rights_price'] = ratio, value
+            elif 'chia tach' in folded:
+                event_type = 'SPLIT'
+                # A split states the shares one share becomes (2, or 1:2), not the shares added
+                fields['share_ratio'] = ratio - 1 if ratio and ratio > 1 else None
+            else:
+                event_type = 'BONUS_SHARES' if 'thuong' in folded else 'STOCK_DIVIDEND'
+                fields['share_ratio'] = ratio
+        else:
+            continue
+        if not any(fields.get(key) for key in ('cash_dividend', 'share_ratio', 'rights_ratio')):
+            continue
+
+        external_id = row.get('id')
+        events.append(CorporateEvent(
+            symbol=symbol, type=event_type, title=title, ex_date=ex_date[:10],
+            external_id=str(external_id) if external_id else f"{event_type}:{ex_date[:10]}",
+            **fields
+        ))
+    return events
+
+
+class AdjustmentService:
+    """Cached corporate events and cumulative adjustment factors"""
+
+    def __init__(self, price_unit_vnd: float, cache_ttl_seconds: float):
+        self.price_unit_vnd = price_unit_vnd
+        self._events = TTLCache(ttl_seconds=cache_ttl_seconds, max_entries=4096)
+        self._factors = TTLCache(ttl_seconds=cache_ttl_seconds, max_entries=4096)
+        # Bumped on ingestion so factor vectors built from older events are never reused
+        self._generations: Dict[str, int] = {}
+
+    def get_events(self, symbol: str) -> List[CorporateEvent]:
+        """Stored price-adjusting events of a symbol, oldest first"""
+        events = self._events.get(symbol)
+        if events is None:
+            events = db_service.get_corporate_events(symbol, list(ADJUSTING_TYPES))
+            if events is None:
+                # Store unavailable: serve unadjusted rather than fail, and retry next time
+                return []
+            self._events.set(symbol, events)
+        return events
+
+    def ingest(self, symbol: str) -> Optional[int]:
+        """Fetch and store a symbol's corporate actions; returns how many, None if the stock is not stored"""
+        events = parse_events(symbol, vnstock_service.get_company_events(symbol))
+        stored = db_service.upsert_corporate_events(symbol, events) if events else 0
+        self._events.invalidate(symbol)
+        self._generations[symbol] = self._generations.get(symbol, 0) + 1
+        return stored
+
+    def factors(self, symbol: str, dates: List[str], closes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Cumulative (price, volume) factor vectors for a raw series of a symbol"""
+        if not dates:
+            return np.ones(0), np.ones(0)
+        # The factors depend on the closes before each ex-date, which a sync can correct
+        closes = np.asarray(closes, dtype=float)
+        key = (symbol, self._generations.get(symbol, 0), dates[0], dates[-1], len(dates), hash(closes.tobytes()))
+        cached = self._factors.get(key)
+        if cached is not None:
+            return cached
+
+        events = self.get_events(symbol)
+        day_array = np.array(dates, dtype=str)
+        if events:
+            ex_dates = np.array([e.ex_date for e in events], dtype=str)
+            amounts = np.array([
+                [e.cash_dividend, e.share_ratio, e.rights_ratio, e.rights_price] for e in events
+            ], dtype=float)
+            # Cash amounts are in VND, prices in the data source's unit
+            prev_close = adjustments.previous_closes(day_array, closes, ex_dates)
+            price, volume = adjustments.event_factors(
+                prev_close, amounts[:, 0] / self.price_unit_vnd, amounts[:, 1], amounts[:, 2],
+                amounts[:, 3] / self.price_unit_vnd
+            )
+            result = (adjustments.cumulative_factors(day_array, ex_dates, price),
+                      adjustments.cumulative_factors(day_array, ex_dates, volume))
+        else:
+            result = (np.ones(len(dates)), np.ones(len(dates)))
+        self._factors.set(key, result)
+        return result
+
+    def adjust(self, history: StockHistory) -> StockHistory:
+        """Copy of a raw daily history with earlier bars adjusted for later corporate actions"""
+        bars = history.data
+        dates = [bar.date[:10] for bar in bars]
+        prices = np.array([[bar.open, bar.high, bar.low, bar.close] for bar in bars], dtype=float).reshape(-1, 4)
+        volumes = np.array([bar.volume for bar in bars], dtype=float)
+        price_factor, volume_factor = self.factors(history.symbol, dates, prices[:, 3])
+        if not len(bars) or (np.all(price_factor == 1) and np.all(volume_factor == 1)):
+            return history
+
+        adjusted = prices * price_factor[:, None]
+        adjusted_volume = np.rint(volumes * volume_factor)
+        return StockHistory(
+            symbol=history.symbol,
+            data=[
+                StockHistoryData(
+                    date=bar.date, open=float(o), high=float(h), low=float(l), close=float(c),
+                    volume=int(v), value=bar.value
+                )
+                for bar, (o, h, l, c), v in zip(bars, adjusted, adjusted_volume)
+            ]
+        )
+
+
+adjustment_service = AdjustmentService(
+    price_unit_vnd=settings.PRICE_UNIT_VND,
+    cache_ttl_seconds=settings.ADJUSTMENT_CACHE_TTL_SECONDS
+)
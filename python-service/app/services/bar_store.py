@@ -0,0 +1,215 @@
+"""
+Columnar on-disk store of daily bars, read through mmap.
+
+Each symbol's full daily history lives in ``<BAR_STORE_DIR>/<SYMBOL>.npy`` as
+a (columns x bars) float64 array sorted by date, with dates as YYYYMMDD
+numbers, plus an ``index.json`` of row counts and date ranges. Files are
+memory-mapped on read, so a column over any date range is a contiguous slice
+of the page cache rather than a query result: multi-year, full-market scans
+run at disk speed. Unlike "StockHistory", which keeps about a year, the store
+accumulates everything syncs write.
+
+Writers merge new bars into the existing file and atomically replace it, so
+readers that already mapped the old file keep a consistent view. Every
+uvicorn worker writes (syncs and read-through fetches alike), so writes take
+an flock on ``store.lock``; the set of stored symbols is the directory's bar
+files, with ``index.json`` kept as metadata only.
+"""
+import fcntl
+import json
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('date', 'open', 'high', 'low', 'close', 'volume', 'value')
+INDEX_FILE = 'index.json'
+LOCK_FILE = 'store.lock'
+SYMBOL_PATTERN = re.compile(r'^[A-Z0-9_]{1,20}$')
+
+
+def date_key(date: str) -> int:
+    """'YYYY-MM-DD' (or a longer timestamp) as the stored YYYYMMDD number"""
+    return int(str(date)[:10].replace('-', ''))
+
+
+def date_string(key) -> str:
+    key = int(key)
+    return f"{key // 10000:04d}-{key // 100 % 100:02d}-{key % 100:02d}"
+
+
+class Bars:
+    """Zero-copy view of one symbol's bars; ``bars['close']`` is a contiguous column"""
+
+    def __init__(self, symbol: str, data: np.ndarray):
+        self.symbol = symbol
+        self.data = data
+
+    def __len__(self) -> int:
+        return self.data.shape[1]
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.data[COLUMNS.index(column)]
+
+    @property
+    def dates(self) -> List[str]:
+        return [date_string(key) for key in self['date']]
+
+    def to_frame(self) -> pd.DataFrame:
+        frame = pd.DataFrame({column: np.asarray(self[column]) for column in COLUMNS[1:]})
+        frame.insert(0, 'date', self.dates)
+        return frame
+
+
+class BarStore:
+    """Per-symbol memory-mapped daily bar files"""
+
+    def __init__(self, root: Optional[str]):
+        self.root = root or None
+        self._maps: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.root is not None
+
+    def _path(self, symbol: str) -> str:
+        if not SYMBOL_PATTERN.match(symbol):
+            raise ValueError(f"Invalid symbol {symbol!r}")
+        return os.path.join(self.root, f"{symbol}.npy")
+
+    def _map(self, symbol: str) -> Optional[np.ndarray]:
+        """The symbol's whole file, mapped once per version of the file"""
+        path = self._path(symbol)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        # Writers replace the file, so a new inode or mtime means new contents
+        version = (stat.st_ino, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._maps.get(symbol)
+            if cached is None or cached[0] != version:
+                cached = (version, np.load(path, mmap_mode='r'))
+                self._maps[symbol] = cached
+            return cached[1]
+
+    def read(self, symbol: str, start: Optional[str] = None, end: Optional[str] = None) -> Optional[Bars]:
+        """Bars of a symbol between two dates (inclusive) as a view of the mapped file"""
+        data = self._map(symbol)
+        if data is None:
+            return None
+        dates = data[0]
+        lo = np.searchsorted(dates, date_key(start)) if start else 0
+        hi = np.searchsorted(dates, date_key(end), side='right') if end else len(dates)
+        return Bars(symbol, data[:, lo:hi])
+
+    def coverage(self, symbol: str) -> Optional[tuple]:
+        """(first, last) stored date of a symbol"""
+        data = self._map(symbol)
+        if data is None or not data.shape[1]:
+            return None
+        return date_string(data[0, 0]), date_string(data[0, -1])
+
+    def symbols(self) -> List[str]:
+        """Symbols with a bar file; the files, not index.json, are the source of truth"""
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return []
+        symbols = []
+        for name in names:
+            symbol, extension = os.path.splitext(name)
+            if extension == '.npy' and SYMBOL_PATTERN.match(symbol):
+                symbols.append(symbol)
+        return sorted(symbols)
+
+    def scan(self, start: Optional[str] = None, end: Optional[str] = None,
+             symbols: Optional[List[str]] = None) -> Iterator[Bars]:
+        """Bars of every stored symbol (or ``symbols``) over a date range, one mapped view at a time"""
+        for symbol in sorted(symbols) if symbols is not None else self.symbols():
+            bars = self.read(symbol, start, end)
+            if bars is not None and len(bars):
+                yield bars
+
+    def write(self, symbol: str, bars: List[Dict[str, Any]]) -> bool:
+        """Merge bars (dicts with date and OHLCV fields) into a symbol's file; new values win"""
+        if not bars:
+            return True
+        try:
+            new = np.array([
+                [date_key(bar['date'])] + [bar.get(column) for column in COLUMNS[1:]] for bar in bars
+            ], dtype=float).T
+            path = self._path(symbol)
+            os.makedirs(self.root, exist_ok=True)
+            with self._lock, self._exclusive():
+                existing = np.load(path) if os.path.exists(path) else np.empty((len(COLUMNS), 0))
+                combined = np.concatenate([new, existing], axis=1)
+                # np.unique keeps the first occurrence of each date, i.e. the new bar
+                _, first = np.unique(combined[0], return_index=True)
+                merged = np.ascontiguousarray(combined[:, first])
+                temporary = f"{path}.{os.getpid()}.tmp.npy"
+                np.save(temporary, merged)
+                os.replace(temporary, path)
+                self._maps.pop(symbol, None)
+                index = self._read_index()
+                index[symbol] = {
+                    'rows': merged.shape[1], 'first': date_string(merged[0, 0]), 'last': date_string(merged[0, -1])
+                }
+                self._write_index(index)
+            return True
+        except Exception as e:
+            logger.error(f"Error writing bars for {symbol}: {e}")
+            return False
+
+    @contextmanager
+    def _exclusive(self):
+        """Cross-process lock around a read-merge-write of a bar file and the index"""
+        with open(os.path.join(self.root, LOCK_FILE), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.root, INDEX_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write_index(self, index: Dict[str, Dict[str, Any]]):
+        path = os.path.join(self.root, INDEX_FILE)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump(index, f)
+        os.replace(temporary, path)
+
+    def rebuild_index(self) -> int:
+        """Recreate index.json from the bar files, e.g. after copying a store; returns the symbol count"""
+        index = {}
+        for name in sorted(os.listdir(self.root)):
+            symbol, extension = os.path.splitext(name)
+            if extension != '.npy' or not SYMBOL_PATTERN.match(symbol):
+                continue
+            data = np.load(os.path.join(self.root, name), mmap_mode='r')
+            if data.shape[1]:
+                index[symbol] = {
+                    'rows': data.shape[1], 'first': date_string(data[0, 0]), 'last': date_string(data[0, -1])
+                }
+        with self._lock, self._exclusive():
+            self._write_index(index)
+        return len(index)
+
+
+bar_store = BarStore(settings.BAR_STORE_DIR)
@@ -1,10 +1,14 @@
 import psycopg2
 import psycopg2.extras
-from typing import List, Optional, Dict, Any
+from typing import Callable, List, Optional, Dict, Any
 import pandas as pd
 from datetime import datetime
 import logging
 from ..config import settings
+from ..models import CorporateEvent, NewsArticle, NewsFilter, NewsResponse, NewsSentimentDay
+from ..utils.pagination import decode_cursor, encode_cursor
+from ..utils.timezones import naive_utc
+from .trading_calendar import market_now
 from cuid import cuid
 
 logger = logging.getLogger(__name__)
@@ -80,8 +84,8 @@ class DatabaseService:
             
             # Insert new history data - generate cuid for each record
             insert_query = """
-            INSERT INTO "StockHistory" (id, symbol, date, open, high, low, close, volume, value, "createdAt")
-            VALUES (%(id)s, %(symbol)s, %(date)s, %(open)s, %(high)s, %(low)s, %(close)s, %(volume)s, %(value)s, NOW())
+            INSERT INTO "StockHistory" (id, symbol, date, open, high, low, close, volume, value, "createdAt", "updatedAt")
+            VALUES (%(id)s, %(symbol)s, %(date)s, %(open)s, %(high)s, %(low)s, %(close)s, %(volume)s, %(value)s, NOW(), NOW())
             ON CONFLICT (symbol, date) 
             DO UPDATE SET 
                 open = EXCLUDED.open,
@@ -89,7 +93,8 @@ class DatabaseService:
                 low = EXCLUDED.low,
                 close = EXCLUDED.close,
                 volume = EXCLUDED.volume,
-                value = EXCLUDED.value
+                value = EXCLUDED.value,
+                "updatedAt" = NOW()
             """
             
             for data in history_data:
@@ -106,6 +111,77 @@ class DatabaseService:
             logger.error(f"Error inserting stock history: {e}")
             return False
     
+    def get_close_history(self, symbols: List[str], start_date: str) -> pd.DataFrame:
+        """Daily closes of several symbols since ``start_date`` (YYYY-MM-DD) in long format"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            query = """
+            SELECT date, symbol, close
+            FROM "StockHistory"
+            WHERE symbol = ANY(%s) AND date >= %s
+            ORDER BY date
+            """
+            cursor.execute(query, (list(symbols), start_date))
+            df = pd.DataFrame(cursor.fetchall(), columns=['date', 'symbol', 'close'])
+            
+            cursor.close()
+            conn.close()
+            return df
+            
+        except Exception as e:
+            logger.error(f"Error getting close history: {e}")
+            return pd.DataFrame(columns=['date', 'symbol', 'close'])
+    
+    def get_history_matrix(self, start_date: str, fields: List[str],
+                           exclude: Optional[List[str]] = None) -> pd.DataFrame:
+        """Daily bars (``fields`` of open/high/low/close/volume) of every stored symbol not in ``exclude`` since ``start_date``, long format"""
+        columns = ['date', 'symbol'] + [f for f in ('open', 'high', 'low', 'close', 'volume') if f in fields]
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            query = f"""
+            SELECT {', '.join(columns)}
+            FROM "StockHistory"
+            WHERE date >= %s AND NOT (symbol = ANY(%s))
+            ORDER BY date
+            """
+            cursor.execute(query, (start_date, list(exclude or [])))
+            df = pd.DataFrame(cursor.fetchall(), columns=columns)
+            
+            cursor.close()
+            conn.close()
+            return df
+            
+        except Exception as e:
+            logger.error(f"Error getting history matrix: {e}")
+            return pd.DataFrame(columns=columns)
+    
+    def get_history_version(self, symbols: Optional[List[str]] = None) -> Optional[tuple]:
+        """(last date, row count, last update) of the stored history of some symbols (all when None); changes whenever a sync adds or rewrites bars"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            if symbols is None:
+                cursor.execute('SELECT MAX(date), COUNT(*), MAX("updatedAt") FROM "StockHistory"')
+            else:
+                cursor.execute(
+                    'SELECT MAX(date), COUNT(*), MAX("updatedAt") FROM "StockHistory" WHERE symbol = ANY(%s)',
+                    (list(symbols),)
+                )
+            row = cursor.fetchone()
+            
+            cursor.close()
+            conn.close()
+            return tuple(row) if row and row[0] else None
+            
+        except Exception as e:
+            logger.error(f"Error getting history version: {e}")
+            return None
+    
     def get_tracked_symbols(self) -> List[str]:
         """Get list of symbols being tracked in portfolios"""
         try:
@@ -131,6 +207,156 @@ class DatabaseService:
             logger.error(f"Error getting tracked symbols: {e}")
             return []
     
+    def get_portfolio_holdings(self, portfolio_id: str) -> Optional[pd.DataFrame]:
+        """Holdings of a portfolio joined with their current Stock prices; None if the store is unavailable.
+        
+        An unknown portfolio gives no rows; an empty one gives a single row without a symbol.
+        """
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            query = """
+            SELECT s.symbol, s.name, ps.quantity, ps."avgPrice", s."currentPrice", s.close,
+                   s."changeValue", s."tradingDate"
+            FROM "Portfolio" p
+            LEFT JOIN "PortfolioStock" ps ON ps."portfolioId" = p.id
+            LEFT JOIN "Stock" s ON ps."stockId" = s.id
+            WHERE p.id = %s
+            ORDER BY s.symbol
+            """
+            cursor.execute(query, (portfolio_id,))
+            df = pd.DataFrame(cursor.fetchall(), columns=[
+                'symbol', 'name', 'quantity', 'avg_price', 'current_price', 'close', 'change', 'trading_date'
+            ])
+            
+            cursor.close()
+            conn.close()
+            return df
+            
+        except Exception as e:
+            logger.error(f"Error getting portfolio holdings: {e}")
+            return None
+    
+    def get_portfolio_version(self, portfolio_id: str) -> Optional[tuple]:
+        """(holding count, last holding edit, last price update, last portfolio edit); changes on any write that moves a valuation"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            query = """
+            SELECT COUNT(ps.id), MAX(ps."updatedAt"), MAX(s."updatedAt"), MAX(p."updatedAt")
+            FROM "Portfolio" p
+            LEFT JOIN "PortfolioStock" ps ON ps."portfolioId" = p.id
+            LEFT JOIN "Stock" s ON ps."stockId" = s.id
+            WHERE p.id = %s
+            """
+            cursor.execute(query, (portfolio_id,))
+            row = cursor.fetchone()
+            
+            cursor.close()
+            conn.close()
+            return tuple(row)
+            
+        except Exception as e:
+            logger.error(f"Error getting portfolio version: {e}")
+            return None
+    
+    def upsert_corporate_events(self, symbol: str, events: List[CorporateEvent]) -> Optional[int]:
+        """Insert or refresh corporate actions by external id; returns the count, None if the stock is not stored"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT id FROM "Stock" WHERE symbol = %s', (symbol,))
+            row = cursor.fetchone()
+            if not row:
+                cursor.close()
+                conn.close()
+                return None
+            
+            query = """
+            INSERT INTO "Event" (id, "stockId", type, title, "eventDate", "cashDividend", "shareRatio",
+                                 "rightsRatio", "rightsPrice", "externalId", "createdAt")
+            VALUES (%(id)s, %(stock_id)s, %(type)s, %(title)s, %(ex_date)s::timestamp, %(cash_dividend)s,
+                    %(share_ratio)s, %(rights_ratio)s, %(rights_price)s, %(external_id)s, NOW())
+            ON CONFLICT ("stockId", "externalId")
+            DO UPDATE SET
+                type = EXCLUDED.type,
+                title = EXCLUDED.title,
+                "eventDate" = EXCLUDED."eventDate",
+                "cashDividend" = EXCLUDED."cashDividend",
+                "shareRatio" = EXCLUDED."shareRatio",
+                "rightsRatio" = EXCLUDED."rightsRatio",
+                "rightsPrice" = EXCLUDED."rightsPrice"
+            """
+            for event in events:
+                cursor.execute(query, {**event.model_dump(), 'id': cuid(), 'stock_id': row[0]})
+            
+            conn.commit()
+            cursor.close()
+            conn.close()
+            return len(events)
+            
+        except Exception as e:
+            logger.error(f"Error upserting corporate events for {symbol}: {e}")
+            return None
+    
+    def get_corporate_events(self, symbol: str, types: List[str]) -> Optional[List[CorporateEvent]]:
+        """Stored events of the given types for a stock, oldest first; None on error"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            query = """
+            SELECT s.symbol, e.type, e.title, to_char(e."eventDate", 'YYYY-MM-DD'), e."cashDividend",
+                   e."shareRatio", e."rightsRatio", e."rightsPrice", e."externalId"
+            FROM "Event" e
+            JOIN "Stock" s ON e."stockId" = s.id
+            WHERE s.symbol = %s AND e.type = ANY(%s)
+            ORDER BY e."eventDate"
+            """
+            cursor.execute(query, (symbol, list(types)))
+            events = [
+                CorporateEvent(
+                    symbol=row[0], type=row[1], title=row[2], ex_date=row[3], cash_dividend=row[4],
+                    share_ratio=row[5], rights_ratio=row[6], rights_price=row[7], external_id=row[8]
+                )
+                for row in cursor.fetchall()
+            ]
+            
+            cursor.close()
+            conn.close()
+            return events
+            
+        except Exception as e:
+            logger.error(f"Error getting corporate events for {symbol}: {e}")
+            return None
+    
+    def screen_stocks(self, columns: Dict[str, str], condition: str,
+                      params: Dict[str, Any]) -> Optional[pd.DataFrame]:
+        """Stocks matching a SQL ``condition`` over "Stock" s, with ``columns`` (name -> SQL) selected"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            select = ', '.join(f'{sql} AS "{name}"' for name, sql in columns.items())
+            query = f"""
+            SELECT s.symbol, s.name, {select}
+            FROM "Stock" s
+            WHERE {condition}
+            """
+            cursor.execute(query, params)
+            df = pd.DataFrame(cursor.fetchall(), columns=['symbol', 'name'] + list(columns))
+            
+            cursor.close()
+            conn.close()
+            return df
+            
+        except Exception as e:
+            logger.error(f"Error screening stocks: {e}")
+            return None
+    
     def update_stock_info(self, symbol: str, info_data: Dict[str, Any]) -> bool:
         """Update stock company information"""
         try:
@@ -167,4 +393,305 @@ class DatabaseService:
             logger.error(f"Error updating stock info: {e}")
             return False
 
+    def insert_intraday_bars(self, symbol: str, interval: str, bars: List[Dict[str, Any]]) -> bool:
+        """Upsert intraday bars for one symbol and interval"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            insert_query = """
+            INSERT INTO "StockIntraday" (id, symbol, interval, time, open, high, low, close, volume, "createdAt")
+            VALUES %s
+            ON CONFLICT (symbol, interval, time)
+            DO UPDATE SET
+                open = EXCLUDED.open,
+                high = EXCLUDED.high,
+                low = EXCLUDED.low,
+                close = EXCLUDED.close,
+                volume = EXCLUDED.volume
+            """
+            rows = [
+                (cuid(), symbol, interval, bar['time'], bar['open'], bar['high'],
+                 bar['low'], bar['close'], bar['volume'])
+                for bar in bars
+            ]
+            psycopg2.extras.execute_values(
+                cursor, insert_query, rows,
+                template="(%s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())",
+                page_size=1000
+            )
+            
+            conn.commit()
+            cursor.close()
+            conn.close()
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error inserting intraday bars: {e}")
+            return False
+    
+    def get_intraday_bars(self, symbol: str, interval: str, start: datetime,
+                          end: Optional[datetime] = None) -> pd.DataFrame:
+        """Get stored intraday bars for one symbol and interval, oldest first"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            query = """
+            SELECT time, open, high, low, close, volume
+            FROM "StockIntraday"
+            WHERE symbol = %s AND interval = %s AND time >= %s AND time <= %s
+            ORDER BY time
+            """
+            cursor.execute(query, (symbol, interval, start, end or market_now()))
+            df = pd.DataFrame(cursor.fetchall(), columns=['time', 'open', 'high', 'low', 'close', 'volume'])
+            
+            cursor.close()
+            conn.close()
+            return df
+            
+        except Exception as e:
+            logger.error(f"Error getting intraday bars: {e}")
+            return pd.DataFrame(columns=['time', 'open', 'high', 'low', 'close', 'volume'])
+    
+    def get_intraday_coverage(self, symbol: str) -> Dict[str, tuple]:
+        """Get (first, last) stored bar time per intraday interval for a symbol"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            query = """
+            SELECT interval, MIN(time), MAX(time)
+            FROM "StockIntraday"
+            WHERE symbol = %s
+            GROUP BY interval
+            """
+            cursor.execute(query, (symbol,))
+            coverage = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+            
+            cursor.close()
+            conn.close()
+            return coverage
+            
+        except Exception as e:
+            logger.error(f"Error getting intraday coverage: {e}")
+            return {}
+
+    def insert_news_articles(self, articles: List[NewsArticle],
+                             aggregate: Optional[Callable[[List[NewsArticle]], List[tuple]]] = None
+                             ) -> Optional[List[str]]:
+        """Insert ingested articles, skipping ids already stored; returns the new ids, None on failure.
+        
+        ``aggregate`` turns the newly stored articles into NewsSentimentDaily
+        deltas, which are added in the same transaction so the aggregates never
+        miss or double-count an article.
+        """
+        if not articles:
+            return []
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            # Article ids are the news service content hash, so re-ingesting is a no-op.
+            # stockId links the primary symbol for the Next.js app's News relation.
+            insert_query = """
+            INSERT INTO "News" (id, "stockId", title, summary, content, url, source, category,
+                                sentiment, "impactScore", tags, "clusterId", "publishedAt", "createdAt")
+            VALUES %s
+            ON CONFLICT (id) DO NOTHING
+            RETURNING id
+            """
+            rows = [
+                (a.id, a.related_symbols[0] if a.related_symbols else None, a.title, a.summary,
+                 a.content, a.url, a.source, a.category, a.sentiment, a.impact_score,
+                 a.tags, a.cluster_id, naive_utc(a.publish_date))
+                for a in articles
+            ]
+            inserted = psycopg2.extras.execute_values(
+                cursor, insert_query, rows,
+                template="""(%s, (SELECT id FROM "Stock" WHERE symbol = %s), %s, %s, %s, %s, %s, %s,
+                             %s, %s, %s, %s, %s, NOW())""",
+                fetch=True
+            )
+            new_ids = {row[0] for row in inserted}
+            
+            symbol_rows = [
+                (a.id, symbol, naive_utc(a.publish_date))
+                for a in articles if a.id in new_ids
+                for symbol in set(a.related_symbols)
+            ]
+            if symbol_rows:
+                psycopg2.extras.execute_values(
+                    cursor,
+                    'INSERT INTO "NewsSymbol" ("newsId", symbol, "publishedAt") VALUES %s ON CONFLICT DO NOTHING',
+                    symbol_rows
+                )
+            if aggregate is not None:
+                self._add_sentiment_rows(cursor, aggregate([a for a in articles if a.id in new_ids]))
+            
+            conn.commit()
+            cursor.close()
+            conn.close()
+            return [a.id for a in articles if a.id in new_ids]
+            
+        except Exception as e:
+            logger.error(f"Error inserting news articles: {e}")
+            return None
+    
+    def get_news_articles(self, filters: Optional[NewsFilter] = None,
+                          source: Optional[str] = None) -> Optional[NewsResponse]:
+        """Query stored articles newest first; returns None if the store is unavailable"""
+        filters = filters or NewsFilter()
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            conditions = []
+            params: Dict[str, Any] = {}
+            if filters.category:
+                conditions.append('n.category = %(category)s')
+                params['category'] = filters.category
+            if filters.sentiment:
+                conditions.append('n.sentiment = %(sentiment)s')
+                params['sentiment'] = filters.sentiment
+            if filters.from_date:
+                conditions.append('n."publishedAt" >= %(from_date)s')
+                params['from_date'] = naive_utc(filters.from_date)
+            if filters.to_date:
+                conditions.append('n."publishedAt" <= %(to_date)s')
+                params['to_date'] = naive_utc(filters.to_date)
+            if filters.symbols:
+                conditions.append("""EXISTS (
+                    SELECT 1 FROM "NewsSymbol" fs
+                    WHERE fs."newsId" = n.id AND fs.symbol = ANY(%(symbols)s)
+                )""")
+                params['symbols'] = [s.upper() for s in filters.symbols]
+            if source:
+                conditions.append('n.source = %(source)s')
+                params['source'] = source
+            if filters.collapse_stories:
+                # Near-duplicates point at their story's representative
+                conditions.append('(n."clusterId" IS NULL OR n."clusterId" = n.id)')
+            
+            page = max(filters.page, 1)
+            if filters.cursor:
+                # Keyset pagination: walks the (publishedAt, id) index, no count or offset
+                cursor_date, cursor_id = decode_cursor(filters.cursor)
+                conditions.append('(n."publishedAt", n.id) < (%(cursor_date)s, %(cursor_id)s)')
+                params['cursor_date'] = naive_utc(cursor_date)
+                params['cursor_id'] = cursor_id
+                params['offset'] = 0
+                total_column = 'NULL'
+            else:
+                params['offset'] = (page - 1) * filters.limit
+                total_column = 'COUNT(*) OVER ()'
+            # One extra row tells whether another page exists
+            params['limit'] = filters.limit + 1
+            where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+            
+            query = f"""
+            SELECT n.id, n.title, n.summary, n.content, n.url, n.source, n."publishedAt",
+                   n.category, n.sentiment, n."impactScore", n.tags,
+                   ARRAY(SELECT ns.symbol FROM "NewsSymbol" ns WHERE ns."newsId" = n.id) AS symbols,
+                   n."clusterId",
+                   {total_column} AS total
+            FROM "News" n
+            {where}
+            ORDER BY n."publishedAt" DESC, n.id DESC
+            LIMIT %(limit)s OFFSET %(offset)s
+            """
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            
+            cursor.close()
+            conn.close()
+            
+            articles = [self._row_to_news_article(row) for row in rows[:filters.limit]]
+            next_cursor = None
+            if len(rows) > filters.limit and articles:
+                next_cursor = encode_cursor(articles[-1].publish_date, articles[-1].id)
+            if filters.cursor:
+                total = None
+            else:
+                total = rows[0][-1] if rows else 0
+            return NewsResponse(
+                articles=articles,
+                total=total,
+                page=page,
+                per_page=filters.limit,
+                next_cursor=next_cursor
+            )
+            
+        except Exception as e:
+            logger.error(f"Error getting news articles: {e}")
+            return None
+    
+    @staticmethod
+    def _add_sentiment_rows(cursor, rows: List[tuple]):
+        if not rows:
+            return
+        upsert_query = """
+        INSERT INTO "NewsSentimentDaily" (symbol, date, count, positive, negative, neutral, "impactSum", "updatedAt")
+        VALUES %s
+        ON CONFLICT (symbol, date)
+        DO UPDATE SET
+            count = "NewsSentimentDaily".count + EXCLUDED.count,
+            positive = "NewsSentimentDaily".positive + EXCLUDED.positive,
+            negative = "NewsSentimentDaily".negative + EXCLUDED.negative,
+            neutral = "NewsSentimentDaily".neutral + EXCLUDED.neutral,
+            "impactSum" = "NewsSentimentDaily"."impactSum" + EXCLUDED."impactSum",
+            "updatedAt" = NOW()
+        """
+        psycopg2.extras.execute_values(
+            cursor, upsert_query, rows,
+            template="(%s, %s, %s, %s, %s, %s, %s, NOW())"
+        )
+    
+    def get_news_sentiment_daily(self, symbol: str, start: Optional[str] = None,
+                                 end: Optional[str] = None) -> Optional[List[NewsSentimentDay]]:
+        """Daily sentiment aggregates for a symbol, oldest first; None if the store is unavailable"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            # Dates are ISO strings, so string comparison is date order
+            query = """
+            SELECT symbol, date, count, positive, negative, neutral, "impactSum"
+            FROM "NewsSentimentDaily"
+            WHERE symbol = %s AND date >= %s AND date <= %s
+            ORDER BY date
+            """
+            cursor.execute(query, (symbol, start or '0000-00-00', end or '9999-99-99'))
+            days = [
+                NewsSentimentDay(symbol=row[0], date=row[1], count=row[2], positive=row[3], negative=row[4],
+                                 neutral=row[5], mean_impact=row[6] / row[2] if row[2] else None)
+                for row in cursor.fetchall()
+            ]
+            
+            cursor.close()
+            conn.close()
+            return days
+            
+        except Exception as e:
+            logger.error(f"Error getting news sentiment aggregates: {e}")
+            return None
+    
+    @staticmethod
+    def _row_to_news_article(row) -> NewsArticle:
+        return NewsArticle(
+            id=row[0],
+            title=row[1],
+            summary=row[2] or '',
+            content=row[3],
+            url=row[4] or '',
+            source=row[5] or '',
+            publish_date=row[6],
+            category=row[7],
+            sentiment=row[8],
+            impact_score=row[9],
+            tags=row[10] or [],
+            related_symbols=row[11] or [],
+            cluster_id=row[12]
+        )
+
 db_service = DatabaseService()
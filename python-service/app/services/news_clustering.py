@@ -0,0 +1,117 @@
+"""
+Story clustering of near-duplicate news.
+
+The same story is published by several sources with different URLs and
+slightly different wording, so exact id dedupe keeps every copy. At ingestion
+each article gets a MinHash signature over its folded title and summary; LSH
+buckets find earlier articles sharing a band, and an article whose estimated
+similarity to one of them reaches the threshold joins that article's story
+cluster. The cluster id is the id of the story's first (earliest) article,
+which is the representative feeds return.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+
+from ..config import settings
+from ..models import NewsArticle
+from ..utils.minhash import MinHasher
+
+logger = logging.getLogger(__name__)
+
+
+class StoryClusterer:
+    """Assigns articles to story clusters against a window of recent signatures"""
+
+    def __init__(self, threshold: float = 0.5, max_articles: int = 20000,
+                 hasher: Optional[MinHasher] = None):
+        self.threshold = threshold
+        self.max_articles = max_articles
+        self.hasher = hasher or MinHasher()
+        # article id -> (signature, band keys, cluster id), oldest first
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._buckets: List[Dict[bytes, Set[str]]] = [{} for _ in range(self.hasher.bands)]
+        self._lock = threading.Lock()
+        self.duplicates = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _match(self, signature: np.ndarray, band_keys: List[bytes]) -> Optional[str]:
+        """Cluster id of the most similar remembered article above the threshold"""
+        candidates: Set[str] = set()
+        for bucket, key in zip(self._buckets, band_keys):
+            candidates.update(bucket.get(key, ()))
+        best_cluster, best_similarity = None, self.threshold
+        for news_id in candidates:
+            other, _, cluster_id = self._entries[news_id]
+            similarity = self.hasher.similarity(signature, other)
+            if similarity >= best_similarity:
+                best_cluster, best_similarity = cluster_id, similarity
+        return best_cluster
+
+    def _remember(self, news_id: str, signature: np.ndarray, band_keys: List[bytes], cluster_id: str):
+        self._entries[news_id] = (signature, band_keys, cluster_id)
+        for bucket, key in zip(self._buckets, band_keys):
+            bucket.setdefault(key, set()).add(news_id)
+        while len(self._entries) > self.max_articles:
+            old_id, (_, old_keys, _) = self._entries.popitem(last=False)
+            for bucket, key in zip(self._buckets, old_keys):
+                members = bucket.get(key)
+                if members is not None:
+                    members.discard(old_id)
+                    if not members:
+                        del bucket[key]
+
+    def _assign(self, article: NewsArticle) -> str:
+        known = self._entries.get(article.id)
+        if known is not None:
+            return known[2]
+        signature = self.hasher.signature(f"{article.title} {article.summary}")
+        if signature is None:
+            return article.cluster_id or article.id
+        band_keys = self.hasher.band_keys(signature)
+        cluster_id = article.cluster_id or self._match(signature, band_keys)
+        if cluster_id is None:
+            cluster_id = article.id
+        elif cluster_id != article.id:
+            self.duplicates += 1
+        self._remember(article.id, signature, band_keys, cluster_id)
+        return cluster_id
+
+    def assign(self, articles: List[NewsArticle]) -> List[NewsArticle]:
+        """Copies of the articles with ``cluster_id`` set, oldest first so the earliest report leads a story"""
+        ordered = sorted(articles, key=lambda a: (a.publish_date, a.id))
+        with self._lock:
+            return [a.model_copy(update={'cluster_id': self._assign(a)}) for a in ordered]
+
+    def load(self, articles: List[NewsArticle]):
+        """Rebuild the window from stored articles, keeping their persisted cluster ids"""
+        with self._lock:
+            self._entries.clear()
+            for bucket in self._buckets:
+                bucket.clear()
+        # Only the newest window is remembered; older ones would be evicted anyway
+        newest = sorted(articles, key=lambda a: (a.publish_date, a.id))[-self.max_articles:]
+        self.assign(newest)
+        logger.info(f"Story clusterer loaded {len(self._entries)} signatures")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"signatures": len(self._entries), "duplicates": self.duplicates, "threshold": self.threshold}
+
+
+def collapse_stories(articles: List[NewsArticle], threshold: float = None) -> List[NewsArticle]:
+    """One representative per story among ad-hoc articles (e.g. a live fetch), in input order"""
+    clustered = StoryClusterer(threshold=threshold or settings.NEWS_DUPLICATE_THRESHOLD,
+                               max_articles=len(articles) or 1).assign(articles)
+    representatives = {a.id for a in clustered if a.cluster_id == a.id}
+    return [a for a in articles if a.id in representatives]
+
+
+story_clusterer = StoryClusterer(
+    threshold=settings.NEWS_DUPLICATE_THRESHOLD,
+    max_articles=settings.NEWS_CLUSTER_WINDOW
+)
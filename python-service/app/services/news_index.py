@@ -0,0 +1,215 @@
+"""
+In-memory inverted index over ingested news.
+
+Articles are kept in publish order with posting sets per symbol, category,
+sentiment and source, so filtered queries intersect the smallest posting sets
+and only touch matching articles instead of scanning the whole store. Story
+representatives (see news_clustering) have their own key list so collapsed
+feeds skip near-duplicates without a scan. Titles and summaries are also kept
+in a positional full-text index for search.
+"""
+import bisect
+import heapq
+import logging
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from ..config import settings
+from ..models import NewsArticle, NewsFilter, NewsResponse
+from ..utils.pagination import decode_cursor, encode_cursor
+from ..utils.text_search import TextIndex
+
+logger = logging.getLogger(__name__)
+
+# Sort key of an article: (publish timestamp, id); unique and totally ordered
+IndexKey = Tuple[float, str]
+
+
+def article_key(article: NewsArticle) -> IndexKey:
+    return (article.publish_date.timestamp(), article.id)
+
+
+def cursor_key(cursor: str) -> IndexKey:
+    publish_date, news_id = decode_cursor(cursor)
+    return (publish_date.timestamp(), news_id)
+
+
+class NewsIndex:
+    """Thread-safe index of the newest ``max_articles`` articles"""
+
+    def __init__(self, max_articles: int = 200000):
+        self.max_articles = max_articles
+        self._articles: Dict[str, NewsArticle] = {}
+        self._keys: List[IndexKey] = []  # ascending, newest last
+        self._story_keys: List[IndexKey] = []  # keys of story representatives only
+        self._duplicates: Set[str] = set()  # ids that are not their story's representative
+        self._postings: Dict[str, Dict[str, Set[str]]] = {
+            'symbol': {}, 'category': {}, 'sentiment': {}, 'source': {}
+        }
+        self.text = TextIndex()
+        self._lock = threading.Lock()
+        self.ready = False
+        # False once older articles exist in the store than the index holds
+        self.complete = True
+
+    def __len__(self) -> int:
+        return len(self._articles)
+
+    @staticmethod
+    def _terms(article: NewsArticle) -> Iterable[Tuple[str, str]]:
+        for symbol in set(article.related_symbols):
+            yield 'symbol', symbol.upper()
+        if article.category:
+            yield 'category', article.category
+        if article.sentiment:
+            yield 'sentiment', article.sentiment
+        if article.source:
+            yield 'source', article.source
+
+    def add(self, articles: Iterable[NewsArticle]) -> int:
+        """Index articles not already present; returns how many were added"""
+        added = 0
+        with self._lock:
+            for article in articles:
+                if article.id in self._articles:
+                    continue
+                self._articles[article.id] = article
+                key = article_key(article)
+                self._insert_key(self._keys, key)
+                if article.cluster_id and article.cluster_id != article.id:
+                    self._duplicates.add(article.id)
+                else:
+                    self._insert_key(self._story_keys, key)
+                for field, term in self._terms(article):
+                    self._postings[field].setdefault(term, set()).add(article.id)
+                self.text.add(article.id, article.title, article.summary)
+                added += 1
+            self._evict()
+        return added
+
+    @staticmethod
+    def _insert_key(keys: List[IndexKey], key: IndexKey):
+        # New articles are usually the newest, so this is normally an append
+        if not keys or key > keys[-1]:
+            keys.append(key)
+        else:
+            bisect.insort(keys, key)
+
+    def _evict(self):
+        excess = len(self._keys) - self.max_articles
+        if excess <= 0:
+            return
+        for _, news_id in self._keys[:excess]:
+            article = self._articles.pop(news_id)
+            for field, term in self._terms(article):
+                posting = self._postings[field].get(term)
+                if posting is not None:
+                    posting.discard(news_id)
+                    if not posting:
+                        del self._postings[field][term]
+            self.text.remove(news_id)
+            self._duplicates.discard(news_id)
+        del self._story_keys[:bisect.bisect_right(self._story_keys, self._keys[excess - 1])]
+        del self._keys[:excess]
+        self.complete = False
+
+    def load(self, articles: List[NewsArticle], complete: bool):
+        """Replace the index contents with articles hydrated from the store"""
+        with self._lock:
+            self._articles.clear()
+            self._keys.clear()
+            self._story_keys.clear()
+            self._duplicates.clear()
+            for postings in self._postings.values():
+                postings.clear()
+            self.text.clear()
+        self.add(articles)
+        self.complete = complete and len(self._articles) == len(articles)
+        self.ready = True
+        logger.info(f"News index loaded {len(self._articles)} articles (complete={self.complete})")
+
+    def _candidate_ids(self, filters: NewsFilter, source: Optional[str]) -> Optional[Set[str]]:
+        """Intersect posting sets, smallest first; None means no term filter"""
+        sets: List[Set[str]] = []
+        if filters.symbols:
+            postings = self._postings['symbol']
+            symbol_sets = [postings.get(s.upper(), set()) for s in filters.symbols]
+            sets.append(symbol_sets[0] if len(symbol_sets) == 1 else set().union(*symbol_sets))
+        for field, term in (('category', filters.category), ('sentiment', filters.sentiment),
+                            ('source', source)):
+            if term:
+                sets.append(self._postings[field].get(term, set()))
+        if not sets:
+            return None
+
+        sets.sort(key=len)
+        result = set(sets[0])
+        for other in sets[1:]:
+            if not result:
+                break
+            result &= other
+        return result
+
+    def query(self, filters: Optional[NewsFilter] = None, source: Optional[str] = None) -> NewsResponse:
+        """Newest-first page of matching articles.
+
+        A ``filters.cursor`` from a previous page's ``next_cursor`` starts the
+        page right after that article instead of at ``filters.page``.
+        """
+        filters = filters or NewsFilter()
+        # (ts,) sorts before every (ts, id), so these bound whole timestamps
+        low = (filters.from_date.timestamp(),) if filters.from_date else None
+        high = (math.nextafter(filters.to_date.timestamp(), math.inf),) if filters.to_date else None
+        page = max(filters.page, 1)
+        limit = filters.limit
+
+        with self._lock:
+            candidate_ids = self._candidate_ids(filters, source)
+            if candidate_ids is None:
+                keys = self._story_keys if filters.collapse_stories else self._keys
+                lo = bisect.bisect_left(keys, low) if low else 0
+                hi = bisect.bisect_left(keys, high) if high else len(keys)
+                total = max(hi - lo, 0)
+
+                if filters.cursor:
+                    end = min(hi, bisect.bisect_left(keys, cursor_key(filters.cursor)))
+                else:
+                    end = hi - (page - 1) * limit
+                start = max(lo, end - limit)
+                page_keys = keys[start:end][::-1] if end > lo else []
+                more = bool(page_keys) and start > lo
+            else:
+                if filters.collapse_stories:
+                    candidate_ids -= self._duplicates
+                # Only the page needs ordering: a bounded heap instead of sorting every candidate
+                keys = [article_key(self._articles[i]) for i in candidate_ids]
+                if low or high:
+                    keys = [k for k in keys if (not low or k >= low) and (not high or k < high)]
+                total = len(keys)
+
+                if filters.cursor:
+                    cursor = cursor_key(filters.cursor)
+                    keys = [k for k in keys if k < cursor]
+                    skip = 0
+                else:
+                    skip = (page - 1) * limit
+                page_keys = heapq.nlargest(skip + limit, keys)[skip:]
+                more = len(keys) > skip + len(page_keys)
+            articles = [self._articles[news_id] for _, news_id in page_keys]
+
+        next_cursor = None
+        if articles and more:
+            next_cursor = encode_cursor(articles[-1].publish_date, articles[-1].id)
+        return NewsResponse(articles=articles, total=total, page=page, per_page=limit,
+                            next_cursor=next_cursor)
+
+    def search(self, query: str, limit: int = 20) -> NewsResponse:
+        """Articles matching a full-text query, best BM25 score first"""
+        with self._lock:
+            ranked, total = self.text.search(query, limit)
+            articles = [self._articles[news_id] for news_id, _ in ranked]
+        return NewsResponse(articles=articles, total=total, page=1, per_page=limit)
+
+
+news_index = NewsIndex(max_articles=settings.NEWS_INDEX_MAX_ARTICLES)
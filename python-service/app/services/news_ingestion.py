@@ -0,0 +1,134 @@
+"""
+Background news ingestion.
+
+Polls every news source on a schedule, deduplicates articles by their
+content-hash id, assigns near-duplicates to story clusters and persists new
+ones into the News / NewsSymbol tables (and the daily sentiment aggregates)
+so the news endpoints can serve indexed database reads instead of re-fetching
+and re-parsing RSS feeds on every request. Feeds are polled with conditional
+requests (ETag / Last-Modified), so an unchanged feed costs a 304 and no parsing.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from ..config import settings
+from ..models import NewsArticle, NewsFilter
+from .database import db_service
+from .news_clustering import story_clusterer
+from .news_index import news_index
+from .news_sentiment import aggregate_rows
+from .news_service import news_service
+from .symbol_registry import symbol_registry
+
+logger = logging.getLogger(__name__)
+
+
+class NewsIngestionService:
+    """Scheduled fetch -> dedupe -> persist loop"""
+
+    def __init__(self, interval_seconds: float, limit_per_source: int):
+        self.interval_seconds = interval_seconds
+        self.limit_per_source = limit_per_source
+        self._task: Optional[asyncio.Task] = None
+        self._runs = 0
+        self._last_run: Optional[datetime] = None
+        self._last_new_articles = 0
+        self._total_new_articles = 0
+        self._last_error: Optional[str] = None
+
+    async def run_once(self) -> List[NewsArticle]:
+        """Fetch all sources once and persist unseen articles; returns the new ones"""
+        loop = asyncio.get_running_loop()
+        # Symbol tagging validates against the listing; reload it when stale
+        await loop.run_in_executor(None, symbol_registry.refresh_if_stale)
+
+        articles, feed_updates = await news_service.poll_articles_async(limit_per_source=self.limit_per_source)
+
+        unique: Dict[str, NewsArticle] = {}
+        for article in articles:
+            unique.setdefault(article.id, article)
+
+        # Signatures are computed once here; the cluster id is stored with the article
+        clustered = await loop.run_in_executor(None, story_clusterer.assign, list(unique.values()))
+        unique = {article.id: article for article in clustered}
+
+        # Articles and their sentiment aggregates are stored in one transaction
+        new_ids = await loop.run_in_executor(None, db_service.insert_news_articles, clustered, aggregate_rows)
+        if new_ids is None:
+            # Feed states stay as they were, so the next run fetches these entries again
+            raise RuntimeError("News store unavailable; articles not stored")
+        for update in feed_updates:
+            update.apply()
+        new_articles = [unique[news_id] for news_id in new_ids]
+        if news_index.ready:
+            news_index.add(new_articles)
+
+        self._runs += 1
+        self._last_run = datetime.now()
+        self._last_new_articles = len(new_articles)
+        self._total_new_articles += len(new_articles)
+        logger.info(f"News ingestion stored {len(new_articles)} new of {len(unique)} fetched articles")
+        return new_articles
+
+    async def hydrate_index(self) -> bool:
+        """Load the newest stored articles into the in-memory news index"""
+        loop = asyncio.get_running_loop()
+        filters = NewsFilter(limit=news_index.max_articles, collapse_stories=False)
+        stored = await loop.run_in_executor(None, db_service.get_news_articles, filters)
+        if stored is None:
+            return False
+        news_index.load(stored.articles, complete=stored.total <= len(stored.articles))
+        await loop.run_in_executor(None, story_clusterer.load, stored.articles)
+        return True
+
+    async def _run_forever(self):
+        while True:
+            try:
+                if not news_index.ready:
+                    await self.hydrate_index()
+                await self.run_once()
+                self._last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._last_error = str(e)
+                logger.error(f"News ingestion run failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        """Start the ingestion loop on the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run_forever())
+            logger.info(f"News ingestion started (every {self.interval_seconds:.0f}s)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": self.interval_seconds,
+            "runs": self._runs,
+            "last_run": self._last_run.isoformat() if self._last_run else None,
+            "last_new_articles": self._last_new_articles,
+            "total_new_articles": self._total_new_articles,
+            "last_error": self._last_error,
+            "sources": news_service.feed_stats(),
+            "enrichment": news_service.enrichment.stats(),
+            "clustering": story_clusterer.stats(),
+            "index": {"ready": news_index.ready, "complete": news_index.complete, "articles": len(news_index)}
+        }
+
+
+news_ingestion_service = NewsIngestionService(
+    interval_seconds=settings.NEWS_INGEST_INTERVAL_SECONDS,
+    limit_per_source=settings.NEWS_INGEST_LIMIT_PER_SOURCE
+)
@@ -0,0 +1,88 @@
+"""
+Per-symbol daily news sentiment.
+
+Ingestion adds every new story to the aggregate of each of its symbols for
+the trading session it can first move: news published before the close
+counts for that day, later, weekend or holiday news for the next session.
+Session dates use StockHistory's YYYY-MM-DD format, so the series joins price
+history on (symbol, date) without re-reading articles. Near-duplicates
+(see news_clustering) are counted once, through their story representative.
+"""
+import asyncio
+import logging
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..models import NewsArticle, NewsSentimentDay
+from .database import db_service
+from .news_service import news_service
+from .trading_calendar import MARKET_TZ, TRADING_SESSIONS, trading_calendar
+
+logger = logging.getLogger(__name__)
+
+MARKET_CLOSE = TRADING_SESSIONS[-1][1]
+
+# Position of each sentiment's counter in an aggregate row
+SENTIMENT_COLUMNS = {'positive': 1, 'negative': 2, 'neutral': 3}
+
+# Articles read per symbol when the aggregate table is unavailable
+FALLBACK_ARTICLES = 1000
+
+
+def session_date(publish_date: datetime) -> str:
+    """Trading session (YYYY-MM-DD) a story published at ``publish_date`` first affects"""
+    if publish_date.tzinfo is None:
+        # Feed times are parsed and stored as naive UTC
+        publish_date = publish_date.replace(tzinfo=timezone.utc)
+    local = publish_date.astimezone(MARKET_TZ)
+    return trading_calendar.next_session(local.date(), inclusive=local.time() < MARKET_CLOSE)
+
+
+def aggregate_rows(articles: Iterable[NewsArticle]) -> List[tuple]:
+    """(symbol, date, count, positive, negative, neutral, impact_sum) per symbol and session"""
+    totals: Dict[Tuple[str, str], list] = {}
+    for article in articles:
+        if article.cluster_id and article.cluster_id != article.id:
+            continue
+        day = session_date(article.publish_date)
+        column = SENTIMENT_COLUMNS.get(article.sentiment, SENTIMENT_COLUMNS['neutral'])
+        for symbol in {s.upper() for s in article.related_symbols}:
+            row = totals.setdefault((symbol, day), [0, 0, 0, 0, 0.0])
+            row[0] += 1
+            row[column] += 1
+            row[4] += article.impact_score or 0.0
+    return [(symbol, day, *row) for (symbol, day), row in sorted(totals.items())]
+
+
+def rows_to_days(rows: List[tuple]) -> List[NewsSentimentDay]:
+    return [
+        NewsSentimentDay(symbol=symbol, date=day, count=count, positive=positive, negative=negative,
+                         neutral=neutral, mean_impact=impact_sum / count if count else None)
+        for symbol, day, count, positive, negative, neutral, impact_sum in rows
+    ]
+
+
+class NewsSentimentService:
+    """Maintains and serves the NewsSentimentDaily aggregates"""
+
+    async def get_daily(self, symbol: str, start: Optional[date] = None,
+                        end: Optional[date] = None) -> List[NewsSentimentDay]:
+        """Daily sentiment for a symbol between two session dates, oldest first"""
+        symbol = symbol.upper()
+        start_key = start.isoformat() if start else None
+        end_key = end.isoformat() if end else None
+        loop = asyncio.get_running_loop()
+        stored = await loop.run_in_executor(None, db_service.get_news_sentiment_daily, symbol, start_key, end_key)
+        if stored is not None:
+            return stored
+
+        # Aggregate table unavailable: aggregate the indexed or live articles instead
+        response = await news_service.get_stored_news_by_symbol(symbol, limit=FALLBACK_ARTICLES)
+        rows = [
+            row for row in aggregate_rows(response.articles)
+            if row[0] == symbol and (not start_key or row[1] >= start_key) and (not end_key or row[1] <= end_key)
+        ]
+        return rows_to_days(rows)
+
+
+news_sentiment_service = NewsSentimentService()
@@ -1,41 +1,48 @@
-import feedparser
+import asyncio
+import httpx
 import requests
-import pandas as pd
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
 import logging
 import re
 import hashlib
-try:
-    from vnstock import stock
-except ImportError:
-    # Fallback if stock module not available in current vnstock version
-    stock = None
 from ..models import NewsArticle, NewsCategory, NewsFilter, NewsResponse
+from ..config import settings
+from ..utils.keywords import KeywordMatcher, load_keyword_dictionaries
+from ..utils.pagination import encode_cursor
+from ..utils.timezones import naive_utc
+from .database import db_service
+from .news_clustering import collapse_stories
+from .news_enrichment import EnrichmentPipeline
+from .news_index import NewsIndex, article_key, cursor_key, news_index
+from .news_sources import FeedUpdate, RssNewsSource, build_sources, load_rss_sources
+from .symbol_registry import symbol_registry
 
 logger = logging.getLogger(__name__)
 
+# Uppercase tokens common in financial news that are not (or not only) tickers
+COMMON_ABBREVIATIONS = frozenset({
+    'USD', 'VND', 'CEO', 'CFO', 'GDP', 'CPI', 'API', 'URL', 'HTML', 'CSS', 'PDF',
+    'IMG', 'SRC', 'COM', 'JPG', 'PNG', 'GIF', 'HTM', 'VAI', 'CHO', 'NAY', 'VOI',
+    'CUA', 'LAM', 'THI', 'VAN', 'HAY', 'MOT', 'HAI', 'BAY', 'NAM', 'SAU', 'BON',
+    'HREF', 'ZOOM', 'CROP', 'KINH', 'HANG', 'NHOM', 'DONG', 'QUAN', 'TRI', 'GIA',
+    'NOP', 'LON', 'VIX', 'SHS', 'TOP', 'NEW', 'OLD', 'ETF', 'IPO', 'CHN', 'GAN',
+    'SACH', 'NHA', 'NUOC', 'VAY', 'NGAN', 'SUNG', 'TIN', 'FED', 'HOSE', 'HNX', 'UPCOM',
+    'EUR', 'FDI', 'ODA', 'PMI', 'ROE', 'ROA', 'EPS', 'NHNN'
+})
+
 class NewsService:
     def __init__(self):
-        self.news_sources = {
-            'cafef': {
-                'rss_url': 'https://cafef.vn/thi-truong-chung-khoan.rss',
-                'name': 'CafeF',
-                'category_mapping': self._get_cafef_categories()
-            },
-            'vnexpress': {
-                'rss_url': 'https://vnexpress.net/rss/kinh-doanh.rss',
-                'name': 'VnExpress',
-                'category_mapping': self._get_vnexpress_categories()
-            },
-            'vnstock': {
-                'name': 'VNStock',
-                'api_available': True
-            }
-        }
+        # Source plugins; RSS feeds come from configuration
+        self.news_sources = build_sources(load_rss_sources(settings.NEWS_SOURCES_FILE))
         
-        # Stock symbols patterns for detection
-        self.stock_pattern = re.compile(r'\b([A-Z]{3,4})\b')
+        # Stock symbols patterns for detection; tickers are written in capitals
+        self.stock_pattern = re.compile(r'\b([A-Z][A-Z0-9]{2,7})\b')
+        self.symbol_context_before = re.compile(
+            r'(?i:mã|cổ phiếu|cp|ticker)\s*(?:ck\s*)?:?\s*(?:[A-Z][A-Z0-9]{2,7}\s*(?:,|và|&)\s*)*$'
+        )
+        self.symbol_context_after = re.compile(r'\s*[(:-]?\s*(?i:hose|hsx|hnx|upcom)\b')
+        self.symbol_registry = symbol_registry
         
         # Common categories
         self.categories = [
@@ -47,348 +54,165 @@ class NewsService:
             NewsCategory(id="corporate", name="Doanh nghiệp", description="Tin tức doanh nghiệp")
         ]
         
-        # Cache for news to avoid duplicates
-        self._news_cache = {}
-        self._cache_expiry = 3600  # 1 hour
+        self.user_agent = 'Mozilla/5.0 (compatible; VNStockNewsBot/1.0)'
         
-    def _get_cafef_categories(self) -> Dict[str, str]:
-        """Map CafeF RSS categories to our internal categories"""
-        return {
-            'chung-khoan': 'market',
-            'doanh-nghiep': 'corporate', 
-            'kinh-te': 'economy',
-            'quoc-te': 'international',
-            'bat-dong-san': 'economy',
-            'ngan-hang': 'stocks'
-        }
-    
-    def _get_vnexpress_categories(self) -> Dict[str, str]:
-        """Map VnExpress RSS categories to our internal categories"""
-        return {
-            'chung-khoan-bond': 'market',
-            'doanh-nghiep': 'corporate',
-            'kinh-te-viet-nam': 'economy',
-            'kinh-te-the-gioi': 'international',
-            'ebank': 'stocks',
-            'bat-dong-san': 'economy'
-        }
-    
-    def _extract_stock_symbols(self, text: str) -> List[str]:
-        """Extract stock symbols from text content"""
-        # Vietnamese stock symbols are typically 3 letters
-        pattern = r'\b([A-Z]{3})\b'
-        matches = re.findall(pattern, text.upper())
-        symbols = set(matches)
+        # Sentiment and category keywords compiled into one matcher
+        keywords = load_keyword_dictionaries(settings.NEWS_KEYWORDS_FILE)
+        self.category_order = list(keywords['categories'])
+        self.keyword_matcher = KeywordMatcher({**keywords['sentiment'], **keywords['categories']})
+        self.html_tag_pattern = re.compile(r'<[^>]+>')
         
-        # Filter out common non-stock words and HTML tags
-        non_stocks = {
-            'USD', 'VND', 'CEO', 'CFO', 'GDP', 'CPI', 'API', 'URL', 'HTML', 'CSS', 'PDF',
-            'IMG', 'SRC', 'COM', 'JPG', 'PNG', 'GIF', 'HTM', 'VAI', 'CHO', 'NAY', 'VOI',
-            'CUA', 'LAM', 'THI', 'VAN', 'HAY', 'MOT', 'HAI', 'BAY', 'NAM', 'SAU', 'BON',
-            'HREF', 'ZOOM', 'CROP', 'KINH', 'HANG', 'NHOM', 'DONG', 'QUAN', 'TRI', 'GIA',
-            'NOP', 'LON', 'VIX', 'SHS', 'TOP', 'NEW', 'OLD', 'ETF', 'IPO', 'CHN', 'GAN',
-            'SACH', 'NHA', 'NUOC', 'VAY', 'NGAN', 'SUNG', 'TIN', 'FED'
-        }
+        # Articles are enriched once per raw content and memoised
+        self.enrichment = EnrichmentPipeline(
+            stages=[
+                ('clean', self._clean_stage),
+                ('symbols', self._symbols_stage),
+                ('classify', self._classify_stage),
+                ('score', self._score_stage)
+            ],
+            build=self._build_article,
+            max_entries=settings.NEWS_ENRICH_CACHE_SIZE
+        )
         
-        # Only return symbols that are not in non_stocks list and exactly 3 letters
-        valid_symbols = [s for s in symbols if s not in non_stocks and len(s) == 3]
+    def _extract_stock_symbols(self, text: str) -> List[str]:
+        """Extract stock symbols from text content"""
+        known = self.symbol_registry.symbols
+        symbols = []
+        for match in self.stock_pattern.finditer(text):
+            symbol = match.group(1)
+            if symbol in symbols:
+                continue
+            if known:
+                # Listed tickers that double as common abbreviations need context
+                if symbol not in known:
+                    continue
+                if symbol in COMMON_ABBREVIATIONS and not self._has_symbol_context(text, match):
+                    continue
+            elif symbol in COMMON_ABBREVIATIONS or len(symbol) != 3:
+                # No listing loaded yet: fall back to the 3-letter heuristic
+                if not self._has_symbol_context(text, match):
+                    continue
+            symbols.append(symbol)
         
-        return list(valid_symbols)
+        return symbols
+    
+    def _has_symbol_context(self, text: str, match: re.Match) -> bool:
+        """Whether a token is introduced as a ticker ("mã VND", "cổ phiếu SHS, VIX") or tagged with an exchange"""
+        before = text[max(0, match.start() - 60):match.start()]
+        after = text[match.end():match.end() + 12]
+        return bool(self.symbol_context_before.search(before) or self.symbol_context_after.match(after))
+    
+    def _classify(self, title: str, summary: str, source_category: str = None) -> tuple[str, float, str]:
+        """Sentiment, impact score and category from a single keyword scan (the classify and score stages)"""
+        entry = {'title': title, 'summary': summary, 'source_category': source_category}
+        entry = self._score_stage(self._classify_stage(entry))
+        return entry['sentiment'], entry['impact_score'], entry['category']
+    
+    @staticmethod
+    def _score_sentiment(counts: Dict[str, int]) -> tuple[str, float]:
+        positive_score = counts.get('positive', 0)
+        negative_score = counts.get('negative', 0)
+        if positive_score > negative_score:
+            return 'positive', min(80, positive_score * 15 + 20)
+        if negative_score > positive_score:
+            return 'negative', min(80, negative_score * 15 + 20)
+        return 'neutral', 30
+    
+    # Enrichment stages: each adds fields to the working entry (see news_enrichment)
+    
+    def _clean_stage(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        entry['title'] = entry.get('title') or ''
+        entry['summary'] = self.html_tag_pattern.sub('', entry.get('summary') or '').strip()
+        return entry
+    
+    def _symbols_stage(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        symbols = list(entry.get('symbols', []))
+        for symbol in self._extract_stock_symbols(entry['title'] + ' ' + entry['summary']):
+            if symbol not in symbols:
+                symbols.append(symbol)
+        entry['symbols'] = symbols
+        return entry
+    
+    def _classify_stage(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        counts = self.keyword_matcher.count(entry['title'] + ' ' + entry['summary'])
+        entry['keyword_counts'] = counts
+        # First category (in dictionary order) with a keyword hit, else the source's
+        entry['category'] = entry.get('category') or next(
+            (c for c in self.category_order if counts.get(c)), entry.get('source_category') or 'market'
+        )
+        return entry
+    
+    def _score_stage(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        entry['sentiment'], entry['impact_score'] = self._score_sentiment(entry['keyword_counts'])
+        return entry
+    
+    def _build_article(self, entry: Dict[str, Any]) -> NewsArticle:
+        symbols = entry['symbols']
+        tags = [entry['source_key']] + list(entry.get('tags', symbols[:3]))  # Max 3 symbol tags
+        return NewsArticle(
+            id=self._create_news_id(entry['title'], entry['url'], entry['publish_date']),
+            title=entry['title'],
+            summary=entry['summary'],
+            url=entry['url'],
+            source=entry['source'],
+            publish_date=entry['publish_date'],
+            category=entry['category'],
+            related_symbols=symbols,
+            sentiment=entry['sentiment'],
+            impact_score=entry['impact_score'],
+            tags=tags
+        )
     
     def _analyze_sentiment(self, title: str, summary: str) -> tuple[str, float]:
         """Simple sentiment analysis for Vietnamese financial news"""
-        positive_keywords = [
-            'tăng', 'tích cực', 'khả quan', 'thành công', 'phát triển', 'lợi nhuận',
-            'tăng trưởng', 'cải thiện', 'ký kết', 'hợp tác', 'đầu tư', 'mở rộng',
-            'thuận lợi', 'hiệu quả', 'ưu việt', 'bứt phá', 'đột phá'
-        ]
-        
-        negative_keywords = [
-            'giảm', 'sụt', 'rớt', 'mất', 'thiệt hại', 'khó khăn', 'thách thức',
-            'suy thoái', 'lỗ', 'âm', 'giảm sút', 'cạnh tranh', 'rủi ro',
-            'bất ổn', 'lo ngại', 'căng thẳng', 'suy yếu', 'khủng hoảng'
-        ]
-        
-        text = (title + ' ' + summary).lower()
-        
-        positive_score = sum(1 for word in positive_keywords if word in text)
-        negative_score = sum(1 for word in negative_keywords if word in text)
-        
-        if positive_score > negative_score:
-            sentiment = 'positive'
-            impact_score = min(80, positive_score * 15 + 20)
-        elif negative_score > positive_score:
-            sentiment = 'negative'
-            impact_score = min(80, negative_score * 15 + 20)
-        else:
-            sentiment = 'neutral'
-            impact_score = 30
-            
+        sentiment, impact_score, _ = self._classify(title, summary)
         return sentiment, impact_score
     
     def _categorize_news(self, title: str, summary: str, source_category: str = None) -> str:
         """Categorize news based on content"""
-        text = (title + ' ' + summary).lower()
-        
-        # Check for stock-specific content
-        if any(word in text for word in ['cổ phiếu', 'mã', 'ticker', 'niêm yết']):
-            return 'stocks'
-        
-        # Check for market content
-        if any(word in text for word in ['thị trường', 'chỉ số', 'vnindex', 'hnx', 'upcom']):
-            return 'market'
-        
-        # Check for analysis content
-        if any(word in text for word in ['phân tích', 'dự báo', 'khuyến nghị', 'đánh giá']):
-            return 'analysis'
-        
-        # Check for corporate news
-        if any(word in text for word in ['doanh nghiệp', 'công ty', 'cổ đông', 'ban điều hành']):
-            return 'corporate'
-        
-        # Check for economic news
-        if any(word in text for word in ['kinh tế', 'gdp', 'lạm phát', 'lãi suất', 'ngân hàng']):
-            return 'economy'
-        
-        # Default category
-        return source_category or 'market'
+        return self._classify(title, summary, source_category)[2]
     
     def _create_news_id(self, title: str, url: str, publish_date: datetime) -> str:
         """Create unique ID for news article"""
-        content = f"{title}_{url}_{publish_date.isoformat()}"
+        # Naive UTC text, so ids match those of articles stored before dates were aware
+        content = f"{title}_{url}_{naive_utc(publish_date).isoformat()}"
         return hashlib.md5(content.encode()).hexdigest()
     
-    def get_news_from_cafef(self, limit: int = 20) -> List[NewsArticle]:
-        """Get news from CafeF RSS feed"""
+    def _enrich_entries(self, raw_entries: List[Dict[str, Any]], source_name: str) -> List[NewsArticle]:
+        """Run raw source entries through the enrichment pipeline, skipping broken ones"""
+        news_articles = []
+        for entry in raw_entries:
+            try:
+                news_articles.append(self.enrichment.enrich(entry))
+            except Exception as e:
+                logger.error(f"Error processing {source_name} entry: {e}")
+        return news_articles
+    
+    def get_news_from_source(self, source_key: str, limit: int = 20) -> List[NewsArticle]:
+        """Get news from one configured source"""
+        source = self.news_sources[source_key]
         try:
-            news_articles = []
-            feed = feedparser.parse(self.news_sources['cafef']['rss_url'])
-            
-            if feed.bozo:
-                logger.warning("CafeF RSS feed may have issues")
-            
-            for entry in feed.entries[:limit]:
-                try:
-                    # Parse publish date from pubDate tag
-                    if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                        # published_parsed is a time struct
-                        publish_date = datetime(*entry.published_parsed[:6])
-                    elif hasattr(entry, 'published') and entry.published:
-                        # Try to parse published string
-                        try:
-                            import email.utils
-                            publish_date = datetime.fromtimestamp(
-                                email.utils.mktime_tz(email.utils.parsedate_tz(entry.published))
-                            )
-                        except:
-                            publish_date = datetime.now()
-                    else:
-                        publish_date = datetime.now()
-                    
-                    title = entry.get('title', '')
-                    summary = entry.get('summary', entry.get('description', ''))
-                    url = entry.get('link', '')
-                    
-                    # Extract stock symbols
-                    related_symbols = self._extract_stock_symbols(title + ' ' + summary)
-                    
-                    # Analyze sentiment and impact
-                    sentiment, impact_score = self._analyze_sentiment(title, summary)
-                    
-                    # Categorize news
-                    category = self._categorize_news(title, summary)
-                    
-                    # Create unique ID
-                    news_id = self._create_news_id(title, url, publish_date)
-                    
-                    # Create tags
-                    tags = ['cafef']
-                    if related_symbols:
-                        tags.extend(related_symbols[:3])  # Max 3 symbol tags
-                    
-                    news_article = NewsArticle(
-                        id=news_id,
-                        title=title,
-                        summary=summary,
-                        url=url,
-                        source='CafeF',
-                        publish_date=publish_date,
-                        category=category,
-                        related_symbols=related_symbols,
-                        sentiment=sentiment,
-                        impact_score=impact_score,
-                        tags=tags
-                    )
-                    
-                    news_articles.append(news_article)
-                    
-                except Exception as e:
-                    logger.error(f"Error processing CafeF entry: {e}")
-                    continue
-                    
-            logger.info(f"Retrieved {len(news_articles)} articles from CafeF")
+            news_articles = self._enrich_entries(source.fetch_raw(limit), source.name)
+            logger.info(f"Retrieved {len(news_articles)} articles from {source.name}")
             return news_articles
             
         except Exception as e:
-            logger.error(f"Error fetching CafeF news: {e}")
+            logger.error(f"Error fetching {source.name} news: {e}")
             return []
     
+    def get_news_from_cafef(self, limit: int = 20) -> List[NewsArticle]:
+        """Get news from CafeF RSS feed"""
+        return self.get_news_from_source('cafef', limit)
+    
     def get_news_from_vnexpress(self, limit: int = 20) -> List[NewsArticle]:
         """Get news from VnExpress RSS feed"""
-        try:
-            news_articles = []
-            feed = feedparser.parse(self.news_sources['vnexpress']['rss_url'])
-            
-            if feed.bozo:
-                logger.warning("VnExpress RSS feed may have issues")
-            
-            for entry in feed.entries[:limit]:
-                try:
-                    # Parse publish date from pubDate tag
-                    if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                        # published_parsed is a time struct
-                        publish_date = datetime(*entry.published_parsed[:6])
-                    elif hasattr(entry, 'published') and entry.published:
-                        # Try to parse published string
-                        try:
-                            import email.utils
-                            publish_date = datetime.fromtimestamp(
-                                email.utils.mktime_tz(email.utils.parsedate_tz(entry.published))
-                            )
-                        except:
-                            publish_date = datetime.now()
-                    else:
-                        publish_date = datetime.now()
-                    
-                    title = entry.get('title', '')
-                    summary = entry.get('summary', entry.get('description', ''))
-                    url = entry.get('link', '')
-                    
-                    # Clean HTML tags from summary if present
-                    import re
-                    if summary:
-                        summary = re.sub(r'<[^>]+>', '', summary)
-                        summary = summary.strip()
-                    
-                    # Extract stock symbols
-                    related_symbols = self._extract_stock_symbols(title + ' ' + summary)
-                    
-                    # Analyze sentiment and impact
-                    sentiment, impact_score = self._analyze_sentiment(title, summary)
-                    
-                    # Categorize news
-                    category = self._categorize_news(title, summary)
-                    
-                    # Create unique ID
-                    news_id = self._create_news_id(title, url, publish_date)
-                    
-                    # Create tags
-                    tags = ['vnexpress']
-                    if related_symbols:
-                        tags.extend(related_symbols[:3])  # Max 3 symbol tags
-                    
-                    news_article = NewsArticle(
-                        id=news_id,
-                        title=title,
-                        summary=summary,
-                        url=url,
-                        source='VnExpress',
-                        publish_date=publish_date,
-                        category=category,
-                        related_symbols=related_symbols,
-                        sentiment=sentiment,
-                        impact_score=impact_score,
-                        tags=tags
-                    )
-                    
-                    news_articles.append(news_article)
-                    
-                except Exception as e:
-                    logger.error(f"Error processing VnExpress entry: {e}")
-                    continue
-                    
-            logger.info(f"Retrieved {len(news_articles)} articles from VnExpress")
-            return news_articles
-            
-        except Exception as e:
-            logger.error(f"Error fetching VnExpress news: {e}")
-            return []
+        return self.get_news_from_source('vnexpress', limit)
     
     def get_stock_news_from_vnstock(self, symbol: str = None) -> List[NewsArticle]:
         """Get stock-specific news from vnstock library"""
         try:
-            news_articles = []
-            
-            # Check if stock module is available
-            if stock is None:
-                logger.warning("VNStock stock module not available - returning empty list")
-                return news_articles
-            
-            # Try to get news from vnstock
-            try:
-                if symbol:
-                    # Get news for specific symbol
-                    news_data = stock.stock_news(symbol=symbol.upper())
-                else:
-                    # Get general market news
-                    news_data = stock.stock_news()
-                    
-                if news_data is not None and not news_data.empty:
-                    for _, row in news_data.iterrows():
-                        try:
-                            title = row.get('title', '')
-                            summary = row.get('content', row.get('summary', ''))
-                            url = row.get('url', '')
-                            
-                            # Parse date
-                            publish_date = datetime.now()
-                            if 'pubDate' in row and row['pubDate']:
-                                try:
-                                    publish_date = pd.to_datetime(row['pubDate'])
-                                except:
-                                    pass
-                            
-                            # Extract stock symbols
-                            related_symbols = self._extract_stock_symbols(title + ' ' + summary)
-                            if symbol and symbol.upper() not in related_symbols:
-                                related_symbols.insert(0, symbol.upper())
-                            
-                            # Analyze sentiment
-                            sentiment, impact_score = self._analyze_sentiment(title, summary)
-                            
-                            # Categorize
-                            category = 'stocks' if symbol else self._categorize_news(title, summary)
-                            
-                            # Create unique ID
-                            news_id = self._create_news_id(title, url, publish_date)
-                            
-                            tags = ['vnstock']
-                            if symbol:
-                                tags.append(symbol.upper())
-                            
-                            news_article = NewsArticle(
-                                id=news_id,
-                                title=title,
-                                summary=summary,
-                                url=url,
-                                source='VNStock',
-                                publish_date=publish_date,
-                                category=category,
-                                related_symbols=related_symbols,
-                                sentiment=sentiment,
-                                impact_score=impact_score,
-                                tags=tags
-                            )
-                            
-                            news_articles.append(news_article)
-                            
-                        except Exception as e:
-                            logger.error(f"Error processing vnstock news entry: {e}")
-                            continue
-                            
-            except Exception as e:
-                logger.warning(f"VNStock news API not available or failed: {e}")
-                
+            raw_entries = self.news_sources['vnstock'].fetch_raw(symbol=symbol)
+            news_articles = self._enrich_entries(raw_entries, 'VNStock')
             logger.info(f"Retrieved {len(news_articles)} articles from VNStock")
             return news_articles
             
@@ -396,56 +220,127 @@ class NewsService:
             logger.error(f"Error fetching VNStock news: {e}")
             return []
     
-    def get_all_news(self, filters: NewsFilter = None) -> NewsResponse:
+    async def fetch_all_articles_async(self, limit_per_source: int = 30,
+                                       client: Optional[httpx.AsyncClient] = None,
+                                       incremental: bool = False) -> List[NewsArticle]:
+        """Fetch every source concurrently; a slow or failing source only drops its own articles.
+        
+        With ``incremental`` RSS feeds are requested conditionally and only
+        entries not seen by earlier incremental polls are parsed.
+        """
+        if incremental:
+            articles, updates = await self.poll_articles_async(limit_per_source, client)
+            for update in updates:
+                update.apply()
+            return articles
+        return (await self._gather_sources(
+            lambda source, http: source.fetch_raw_async(http, limit_per_source), client
+        ))[0]
+    
+    async def poll_articles_async(self, limit_per_source: int = 30,
+                                  client: Optional[httpx.AsyncClient] = None
+                                  ) -> Tuple[List[NewsArticle], List[FeedUpdate]]:
+        """Incremental fetch whose feed updates the caller applies once the articles are stored"""
+        return await self._gather_sources(lambda source, http: source.poll_async(http, limit_per_source), client)
+    
+    async def _gather_sources(self, fetch, client: Optional[httpx.AsyncClient]
+                              ) -> Tuple[List[NewsArticle], List[FeedUpdate]]:
+        owns_client = client is None
+        if owns_client:
+            client = httpx.AsyncClient(follow_redirects=True, headers={'User-Agent': self.user_agent})
+        try:
+            sources = list(self.news_sources.values())
+            results = await asyncio.gather(*(fetch(source, client) for source in sources), return_exceptions=True)
+        finally:
+            if owns_client:
+                await client.aclose()
+        
+        # Enrichment is CPU-bound; run it off the event loop
+        loop = asyncio.get_running_loop()
+        all_articles, updates = [], []
+        for source, result in zip(sources, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Error fetching {source.key} news: {result!r}")
+                continue
+            entries, update = result if isinstance(result, tuple) else (result, None)
+            all_articles.extend(await loop.run_in_executor(None, self._enrich_entries, entries, source.name))
+            if update is not None:
+                updates.append(update)
+        return all_articles, updates
+    
+    def feed_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Incremental polling counters per RSS feed"""
+        return {key: source.state.stats() for key, source in self._rss_sources().items()}
+    
+    def reset_feed_states(self):
+        """Drop validators and seen ids so the next incremental poll is a full fetch"""
+        for source in self._rss_sources().values():
+            source.state.reset()
+    
+    def _rss_sources(self) -> Dict[str, RssNewsSource]:
+        return {key: source for key, source in self.news_sources.items() if isinstance(source, RssNewsSource)}
+    
+    async def get_all_news_async(self, filters: NewsFilter = None,
+                                 client: Optional[httpx.AsyncClient] = None) -> NewsResponse:
         """Get all news from all sources with optional filtering"""
         try:
-            all_articles = []
-            
-            # Get news from CafeF
-            cafef_news = self.get_news_from_cafef(limit=30)
-            all_articles.extend(cafef_news)
-            
-            # Get news from VnExpress
-            vnexpress_news = self.get_news_from_vnexpress(limit=30)
-            all_articles.extend(vnexpress_news)
-            
-            # Get news from VNStock  
-            vnstock_news = self.get_stock_news_from_vnstock()
-            all_articles.extend(vnstock_news)
-            
-            # Remove duplicates based on ID
-            seen_ids = set()
-            unique_articles = []
-            for article in all_articles:
-                if article.id not in seen_ids:
-                    seen_ids.add(article.id)
-                    unique_articles.append(article)
-            
-            # Apply filters
-            filtered_articles = self._apply_filters(unique_articles, filters)
-            
-            # Sort by publish date (newest first)
-            filtered_articles.sort(key=lambda x: x.publish_date, reverse=True)
-            
-            # Pagination
-            page = getattr(filters, 'page', 1) if filters else 1
-            per_page = getattr(filters, 'limit', 20) if filters else 20
-            start_idx = (page - 1) * per_page
-            end_idx = start_idx + per_page
-            
-            paginated_articles = filtered_articles[start_idx:end_idx]
-            
-            return NewsResponse(
-                articles=paginated_articles,
-                total=len(filtered_articles),
-                page=page,
-                per_page=per_page
-            )
+            all_articles = await self.fetch_all_articles_async(limit_per_source=30, client=client)
+            return self._build_news_response(all_articles, filters)
             
         except Exception as e:
             logger.error(f"Error getting all news: {e}")
             return NewsResponse(articles=[], total=0, page=1, per_page=20)
     
+    def get_all_news(self, filters: NewsFilter = None) -> NewsResponse:
+        """Blocking wrapper around get_all_news_async for non-async callers"""
+        return asyncio.run(self.get_all_news_async(filters))
+    
+    def _build_news_response(self, all_articles: List[NewsArticle], filters: NewsFilter = None) -> NewsResponse:
+        """Deduplicate, filter, sort and paginate fetched articles"""
+        # Remove duplicates based on ID
+        seen_ids = set()
+        unique_articles = []
+        for article in all_articles:
+            if article.id not in seen_ids:
+                seen_ids.add(article.id)
+                unique_articles.append(article)
+        
+        # Keep one report per story across sources
+        if not filters or filters.collapse_stories:
+            unique_articles = collapse_stories(unique_articles)
+        
+        # Apply filters
+        filtered_articles = self._apply_filters(unique_articles, filters)
+        
+        # Sort by publish date (newest first), id breaking ties for stable cursors
+        filtered_articles.sort(key=article_key, reverse=True)
+        
+        # Pagination
+        page = getattr(filters, 'page', 1) if filters else 1
+        per_page = getattr(filters, 'limit', 20) if filters else 20
+        if filters and filters.cursor:
+            after = cursor_key(filters.cursor)
+            start_idx = next(
+                (i for i, a in enumerate(filtered_articles) if article_key(a) < after), len(filtered_articles)
+            )
+        else:
+            start_idx = (page - 1) * per_page
+        end_idx = start_idx + per_page
+        
+        paginated_articles = filtered_articles[start_idx:end_idx]
+        next_cursor = None
+        if paginated_articles and end_idx < len(filtered_articles):
+            last = paginated_articles[-1]
+            next_cursor = encode_cursor(last.publish_date, last.id)
+        
+        return NewsResponse(
+            articles=paginated_articles,
+            total=len(filtered_articles),
+            page=page,
+            per_page=per_page,
+            next_cursor=next_cursor
+        )
+    
     def _apply_filters(self, articles: List[NewsArticle], filters: NewsFilter) -> List[NewsArticle]:
         """Apply filters to news articles"""
         if not filters:
@@ -459,8 +354,8 @@ class NewsService:
         
         # Filter by symbols
         if filters.symbols:
-            symbols_upper = [s.upper() for s in filters.symbols]
-            filtered = [a for a in filtered if any(s in symbols_upper for s in a.related_symbols)]
+            symbols_upper = {s.upper() for s in filters.symbols}
+            filtered = [a for a in filtered if not symbols_upper.isdisjoint(a.related_symbols)]
         
         # Filter by sentiment
         if filters.sentiment:
@@ -479,14 +374,58 @@ class NewsService:
         """Get available news categories"""
         return self.categories
     
-    def get_news_by_symbol(self, symbol: str, limit: int = 10) -> List[NewsArticle]:
-        """Get news related to specific stock symbol"""
-        # First try vnstock API for symbol-specific news
-        vnstock_news = self.get_stock_news_from_vnstock(symbol)
+    async def _query_store(self, filters: NewsFilter, source: Optional[str] = None) -> Optional[NewsResponse]:
+        """Answer from the in-memory index when it covers the store, else from the News table"""
+        if news_index.ready and news_index.complete:
+            return news_index.query(filters, source=source)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: db_service.get_news_articles(filters, source=source))
+    
+    async def get_stored_news(self, filters: NewsFilter = None) -> NewsResponse:
+        """Serve news from the ingested article store, falling back to live feeds if it is unavailable"""
+        stored = await self._query_store(filters or NewsFilter())
+        if stored is not None:
+            return stored
+        return await self.get_all_news_async(filters)
+    
+    async def get_stored_news_by_symbol(self, symbol: str, limit: int = 10,
+                                        cursor: Optional[str] = None) -> NewsResponse:
+        """Newest stored articles tagged with a symbol, falling back to live feeds"""
+        stored = await self._query_store(NewsFilter(symbols=[symbol], limit=limit, cursor=cursor))
+        if stored is not None:
+            return stored
+        articles = await self.get_news_by_symbol_async(symbol, limit)
+        return NewsResponse(articles=articles, total=len(articles), page=1, per_page=limit)
+    
+    async def get_stored_news_by_source(self, source_key: str, limit: int = 20) -> List[NewsArticle]:
+        """Newest stored articles from one source, falling back to its live feed"""
+        source_name = self.news_sources[source_key].name
+        stored = await self._query_store(NewsFilter(limit=limit, collapse_stories=False), source=source_name)
+        if stored is not None:
+            return stored.articles
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get_news_from_source, source_key, limit)
+    
+    async def search_news(self, query: str, limit: int = 20) -> NewsResponse:
+        """Full-text search over stored news, or over live feeds until the index is loaded"""
+        if news_index.ready:
+            return news_index.search(query, limit)
         
-        # Then get general news and filter by symbol
+        articles = await self.fetch_all_articles_async(limit_per_source=30)
+        live_index = NewsIndex(max_articles=len(articles) or 1)
+        live_index.add(articles)
+        return live_index.search(query, limit)
+    
+    async def get_news_by_symbol_async(self, symbol: str, limit: int = 10) -> List[NewsArticle]:
+        """Get news related to specific stock symbol"""
+        loop = asyncio.get_running_loop()
         filters = NewsFilter(symbols=[symbol], limit=limit)
-        general_news = self.get_all_news(filters)
+        
+        # Symbol-specific vnstock news and filtered general news, fetched concurrently
+        vnstock_news, general_news = await asyncio.gather(
+            loop.run_in_executor(None, self.get_stock_news_from_vnstock, symbol),
+            self.get_all_news_async(filters)
+        )
         
         # Combine and deduplicate
         all_news = vnstock_news + general_news.articles
@@ -502,6 +441,10 @@ class NewsService:
         unique_news.sort(key=lambda x: (x.impact_score or 0, x.publish_date), reverse=True)
         
         return unique_news[:limit]
+    
+    def get_news_by_symbol(self, symbol: str, limit: int = 10) -> List[NewsArticle]:
+        """Blocking wrapper around get_news_by_symbol_async for non-async callers"""
+        return asyncio.run(self.get_news_by_symbol_async(symbol, limit))
 
 # Create global instance
 news_service = NewsService()
@@ -0,0 +1,371 @@
+"""
+Pluggable news sources.
+
+A source only fetches and parses: it returns raw entries (title, summary,
+url, publish date plus optional symbol/category hints) and leaves symbol
+extraction and classification to the news service's enrichment pipeline.
+RSS feeds are configuration, so adding a Vietnamese feed means adding an
+entry to ``DEFAULT_RSS_SOURCES`` or to the JSON file in NEWS_SOURCES_FILE.
+"""
+import asyncio
+import email.utils
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import feedparser
+import httpx
+import pandas as pd
+
+try:
+    from vnstock import stock
+except ImportError:
+    # Fallback if stock module not available in current vnstock version
+    stock = None
+
+from ..config import settings
+from ..utils.timezones import as_utc
+from .resilience import guarded_async, guarded_call
+from .trading_calendar import MARKET_TZ
+
+logger = logging.getLogger(__name__)
+
+# Feed slugs (from entry tags or URL paths) mapped to internal categories
+DEFAULT_RSS_SOURCES: List[Dict[str, Any]] = [
+    {
+        'key': 'cafef',
+        'name': 'CafeF',
+        'rss_url': 'https://cafef.vn/thi-truong-chung-khoan.rss',
+        'category_mapping': {
+            'chung-khoan': 'market',
+            'doanh-nghiep': 'corporate',
+            'kinh-te': 'economy',
+            'quoc-te': 'international',
+            'bat-dong-san': 'economy',
+            'ngan-hang': 'stocks'
+        }
+    },
+    {
+        'key': 'vnexpress',
+        'name': 'VnExpress',
+        'rss_url': 'https://vnexpress.net/rss/kinh-doanh.rss',
+        'category_mapping': {
+            'chung-khoan-bond': 'market',
+            'doanh-nghiep': 'corporate',
+            'kinh-te-viet-nam': 'economy',
+            'kinh-te-the-gioi': 'international',
+            'ebank': 'stocks',
+            'bat-dong-san': 'economy'
+        }
+    }
+]
+
+# Entry ids remembered per feed; comfortably more than one feed page
+SEEN_ENTRIES_PER_FEED = 2000
+
+
+def load_rss_sources(path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """RSS source definitions from a JSON list, or the built-in ones"""
+    if not path:
+        return DEFAULT_RSS_SOURCES
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def entry_publish_date(entry) -> Optional[datetime]:
+    """Publish date (aware UTC) of a feed entry; None when missing or unparseable"""
+    if hasattr(entry, 'published_parsed') and entry.published_parsed:
+        # published_parsed is a UTC time struct
+        return datetime(*entry.published_parsed[:6], tzinfo=timezone.utc)
+    if hasattr(entry, 'published') and entry.published:
+        try:
+            timestamp = email.utils.mktime_tz(email.utils.parsedate_tz(entry.published))
+            return datetime.fromtimestamp(timestamp, timezone.utc)
+        except Exception:
+            pass
+    return None
+
+
+def server_error(response: httpx.Response) -> Optional[Exception]:
+    """The error of a 5xx response, which counts against the feed's circuit breaker"""
+    if response.status_code < 500:
+        return None
+    return httpx.HTTPStatusError(f"Server error {response.status_code} from {response.url}",
+                                 request=response.request, response=response)
+
+
+class FeedState:
+    """Conditional-request validators, seen entry ids and counters for one RSS feed"""
+
+    def __init__(self, max_seen: int = SEEN_ENTRIES_PER_FEED):
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.max_seen = max_seen
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self.requests = 0
+        self.not_modified = 0
+        self.entries = 0
+        self.new_entries = 0
+        self.errors = 0
+
+    def request_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def filter_new(self, entries: list) -> Tuple[list, List[str]]:
+        """Entries not seen before and their ids; nothing is remembered until ``remember``"""
+        new_entries, keys = [], []
+        for entry in entries:
+            key = entry.get('id') or entry.get('link') or entry.get('title')
+            if not key or key in self._seen or key in keys:
+                continue
+            keys.append(key)
+            new_entries.append(entry)
+        self.entries += len(entries)
+        self.new_entries += len(new_entries)
+        return new_entries, keys
+
+    def remember(self, keys: Iterable[str]):
+        for key in keys:
+            self._seen[key] = None
+        while len(self._seen) > self.max_seen:
+            self._seen.popitem(last=False)
+
+    def reset(self):
+        """Forget validators and seen ids so the next poll refetches everything"""
+        self.etag = None
+        self.last_modified = None
+        self._seen.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "not_modified_rate": round(self.not_modified / self.requests, 3) if self.requests else 0.0,
+            "entries": self.entries,
+            "new_entries": self.new_entries,
+            "new_entries_per_request": round(self.new_entries / self.requests, 2) if self.requests else 0.0,
+            "errors": self.errors,
+            "etag": self.etag,
+            "last_modified": self.last_modified
+        }
+
+
+class FeedUpdate:
+    """Validators and entry ids from one poll, applied once the poll's articles are stored.
+
+    Until then the feed state is untouched, so a failed store makes the next
+    poll fetch and parse the same entries again.
+    """
+
+    def __init__(self, state: FeedState, response: httpx.Response, keys: List[str]):
+        self.state = state
+        self.etag = response.headers.get('ETag', state.etag)
+        self.last_modified = response.headers.get('Last-Modified', state.last_modified)
+        self.keys = keys
+
+    def apply(self):
+        self.state.etag = self.etag
+        self.state.last_modified = self.last_modified
+        self.state.remember(self.keys)
+
+
+class NewsSource(ABC):
+    """A news source plugin: fetches raw entries for the enrichment pipeline"""
+
+    key: str
+    name: str
+
+    @abstractmethod
+    def fetch_raw(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Blocking fetch of raw entries"""
+
+    async def fetch_raw_async(self, client: httpx.AsyncClient, limit: int,
+                              incremental: bool = False) -> List[Dict[str, Any]]:
+        """Fetch without blocking the event loop; by default the blocking fetch runs in an executor"""
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(
+            loop.run_in_executor(None, self.fetch_raw, limit),
+            timeout=settings.NEWS_SOURCE_TIMEOUT_SECONDS
+        )
+
+    async def poll_async(self, client: httpx.AsyncClient,
+                         limit: int) -> Tuple[List[Dict[str, Any]], Optional[FeedUpdate]]:
+        """Entries new since the last applied poll, and the update to apply once they are stored"""
+        return await self.fetch_raw_async(client, limit), None
+
+    def _raw_entry(self, title: str, summary: str, url: str, publish_date: Optional[datetime],
+                   **hints: Any) -> Dict[str, Any]:
+        if publish_date is None:
+            # Stamped with the fetch time; flagged so the enrichment memo ignores it
+            publish_date, hints['publish_date_estimated'] = datetime.now(timezone.utc), True
+        return {
+            'source_key': self.key, 'source': self.name, 'title': title,
+            'summary': summary, 'url': url, 'publish_date': publish_date, **hints
+        }
+
+
+class RssNewsSource(NewsSource):
+    """RSS feed source, polled conditionally when incremental"""
+
+    def __init__(self, key: str, name: str, rss_url: str,
+                 category_mapping: Optional[Dict[str, str]] = None):
+        self.key = key
+        self.name = name
+        self.rss_url = rss_url
+        self.category_mapping = category_mapping or {}
+        self.state = FeedState()
+
+    def map_category(self, entry, url: str) -> Optional[str]:
+        """Internal category for an entry from its feed tags or URL path"""
+        terms = []
+        tags = entry.get('tags')
+        if isinstance(tags, list):
+            terms.extend(str(tag.get('term', '')).lower() for tag in tags if hasattr(tag, 'get'))
+        terms.append(url.lower())
+        # Longest slug first so 'kinh-te-the-gioi' wins over 'kinh-te'
+        for slug in sorted(self.category_mapping, key=len, reverse=True):
+            if any(slug in term for term in terms):
+                return self.category_mapping[slug]
+        return None
+
+    def parse(self, feed, limit: int = 20) -> List[Dict[str, Any]]:
+        """Raw entries from a parsed feed"""
+        if feed.bozo:
+            logger.warning(f"{self.name} RSS feed may have issues")
+
+        entries = []
+        for entry in feed.entries[:limit]:
+            try:
+                url = entry.get('link', '')
+                entries.append(self._raw_entry(
+                    title=entry.get('title', ''),
+                    summary=entry.get('summary', entry.get('description', '')),
+                    url=url,
+                    publish_date=entry_publish_date(entry),
+                    source_category=self.map_category(entry, url)
+                ))
+            except Exception as e:
+                logger.error(f"Error processing {self.name} entry: {e}")
+        return entries
+
+    def fetch_raw(self, limit: Optional[int] = 20) -> List[Dict[str, Any]]:
+        feed = guarded_call(f'rss.{self.key}', feedparser.parse, self.rss_url)
+        return self.parse(feed, limit or 20)
+
+    async def _download(self, client: httpx.AsyncClient, headers: Dict[str, str]) -> httpx.Response:
+        response = await guarded_async(
+            f'rss.{self.key}',
+            lambda: client.get(self.rss_url, headers=headers),
+            timeout=settings.NEWS_SOURCE_TIMEOUT_SECONDS,
+            classify=server_error
+        )
+        if response.status_code != 304:
+            response.raise_for_status()
+        return response
+
+    async def fetch_raw_async(self, client: httpx.AsyncClient, limit: int,
+                              incremental: bool = False) -> List[Dict[str, Any]]:
+        """Download the feed with async HTTP and parse it off the event loop.
+
+        With ``incremental`` the poll's validators and entry ids are applied
+        straight away; ingestion uses ``poll_async`` to apply them only after
+        storing the articles.
+        """
+        if incremental:
+            entries, update = await self.poll_async(client, limit)
+            if update is not None:
+                update.apply()
+            return entries
+        response = await self._download(client, {})
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: self.parse(feedparser.parse(response.content), limit))
+
+    async def poll_async(self, client: httpx.AsyncClient,
+                         limit: int) -> Tuple[List[Dict[str, Any]], Optional[FeedUpdate]]:
+        """Conditional request; only entries not seen by applied polls are parsed"""
+        state = self.state
+        try:
+            response = await self._download(client, state.request_headers())
+        except Exception:
+            state.errors += 1
+            raise
+        state.requests += 1
+        if response.status_code == 304:
+            state.not_modified += 1
+            return [], None
+
+        def parse():
+            feed = feedparser.parse(response.content)
+            feed['entries'], keys = state.filter_new(feed.entries[:limit])
+            return self.parse(feed, limit), FeedUpdate(state, response, keys)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, parse)
+
+
+class VnstockNewsSource(NewsSource):
+    """News from the vnstock library, optionally for one symbol"""
+
+    key = 'vnstock'
+    name = 'VNStock'
+
+    def fetch_raw(self, limit: Optional[int] = None, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        # Check if stock module is available
+        if stock is None:
+            logger.warning("VNStock stock module not available - returning empty list")
+            return []
+
+        try:
+            if symbol:
+                # Get news for specific symbol
+                news_data = guarded_call('vnstock.news', stock.stock_news, symbol=symbol.upper())
+            else:
+                # Get general market news
+                news_data = guarded_call('vnstock.news', stock.stock_news)
+        except Exception as e:
+            logger.warning(f"VNStock news API not available or failed: {e}")
+            return []
+
+        entries = []
+        if news_data is None or news_data.empty:
+            return entries
+        rows = news_data if limit is None else news_data.head(limit)
+        for _, row in rows.iterrows():
+            try:
+                publish_date = None
+                if 'pubDate' in row and row['pubDate']:
+                    try:
+                        # vnstock reports market (VN) time without an offset
+                        publish_date = as_utc(pd.to_datetime(row['pubDate']).to_pydatetime(), MARKET_TZ)
+                    except Exception:
+                        pass
+
+                # Symbol feeds are tagged with and categorised by their symbol
+                seed_symbols = [symbol.upper()] if symbol else []
+                entries.append(self._raw_entry(
+                    title=row.get('title', ''),
+                    summary=row.get('content', row.get('summary', '')),
+                    url=row.get('url', ''),
+                    publish_date=publish_date,
+                    symbols=seed_symbols,
+                    tags=seed_symbols,
+                    category='stocks' if symbol else None
+                ))
+            except Exception as e:
+                logger.error(f"Error processing vnstock news entry: {e}")
+        return entries
+
+
+def build_sources(rss_sources: List[Dict[str, Any]]) -> Dict[str, NewsSource]:
+    """Source plugins keyed by source key, RSS feeds first"""
+    sources: Dict[str, NewsSource] = {cfg['key']: RssNewsSource(**cfg) for cfg in rss_sources}
+    sources[VnstockNewsSource.key] = VnstockNewsSource()
+    return sources
@@ -0,0 +1,136 @@
+"""
+Portfolio valuation.
+
+All holdings of a portfolio are read with one join of PortfolioStock against
+the synced Stock prices and valued with vectorised NumPy math. The result is
+kept as a per-portfolio snapshot that stock syncs refresh, so dashboards read
+a precomputed valuation however many holdings a portfolio has. Snapshots are
+stamped with the portfolio's version (holding count and the latest holding,
+price and portfolio updates), so an edit made by the web app or a price
+synced by another worker is picked up on the next read.
+"""
+import logging
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..config import settings
+from ..models import HoldingValuation, PortfolioValuation
+from ..utils.cache import TTLCache
+from .database import db_service
+
+logger = logging.getLogger(__name__)
+
+
+def _optional(values: np.ndarray) -> List[Optional[float]]:
+    """Floats with NaN as None for the response models"""
+    return [None if np.isnan(v) else float(v) for v in values]
+
+
+def _ratio(numerator: float, denominator: float) -> Optional[float]:
+    return numerator / denominator * 100 if denominator else None
+
+
+def value_holdings(portfolio_id: str, holdings: pd.DataFrame) -> PortfolioValuation:
+    """Market value, unrealised P&L, weights and day change for every holding"""
+    holdings = holdings[holdings['symbol'].notna()]
+    quantity = holdings['quantity'].to_numpy(dtype=float)
+    avg_price = holdings['avg_price'].to_numpy(dtype=float)
+    # Prefer the live price; fall back to the last close before the first sync
+    price = holdings['current_price'].fillna(holdings['close']).to_numpy(dtype=float)
+    change = holdings['change'].to_numpy(dtype=float)
+
+    market_value = quantity * price
+    cost_basis = quantity * avg_price
+    pnl = market_value - cost_basis
+    day_change = quantity * change
+    previous_value = market_value - day_change
+
+    total_value = np.nansum(market_value)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pnl_percent = np.where(cost_basis != 0, pnl / cost_basis * 100, np.nan)
+        day_change_percent = np.where(previous_value != 0, day_change / previous_value * 100, np.nan)
+        weight = market_value / total_value if total_value else np.full_like(market_value, np.nan)
+
+    # Totals only cover holdings with both a price and an average cost
+    valued = ~np.isnan(pnl)
+    total_cost = float(np.sum(cost_basis[valued]))
+    total_pnl = float(np.sum(pnl[valued]))
+    changed = ~np.isnan(day_change)
+    total_day_change = float(np.sum(day_change[changed]))
+    total_previous = float(np.sum(previous_value[changed]))
+
+    columns = zip(
+        holdings['symbol'], holdings['name'], holdings['quantity'], _optional(avg_price), _optional(price),
+        _optional(market_value), _optional(cost_basis), _optional(pnl), _optional(pnl_percent),
+        _optional(weight), _optional(day_change), _optional(day_change_percent), holdings['trading_date']
+    )
+    return PortfolioValuation(
+        portfolio_id=portfolio_id,
+        holdings=[
+            HoldingValuation(
+                symbol=symbol, name=name, quantity=int(qty), avg_price=avg, price=px,
+                market_value=mv, cost_basis=cost, unrealized_pnl=p, unrealized_pnl_percent=p_pct,
+                weight=w, day_change=dc, day_change_percent=dc_pct, trading_date=trading_date
+            )
+            for symbol, name, qty, avg, px, mv, cost, p, p_pct, w, dc, dc_pct, trading_date in columns
+        ],
+        market_value=float(total_value),
+        cost_basis=total_cost,
+        unrealized_pnl=total_pnl,
+        unrealized_pnl_percent=_ratio(total_pnl, total_cost),
+        day_change=total_day_change,
+        day_change_percent=_ratio(total_day_change, total_previous),
+        as_of=datetime.now()
+    )
+
+
+class PortfolioService:
+    """Per-portfolio valuation snapshots"""
+
+    def __init__(self, snapshot_ttl_seconds: float):
+        self._snapshots = TTLCache(ttl_seconds=snapshot_ttl_seconds, max_entries=10000)
+
+    def _compute(self, portfolio_id: str, version: Optional[tuple] = None) -> Optional[PortfolioValuation]:
+        # Version before holdings: a write in between leaves the snapshot stale, never stamped as current
+        version = version or db_service.get_portfolio_version(portfolio_id)
+        holdings = db_service.get_portfolio_holdings(portfolio_id)
+        if version is None or holdings is None:
+            raise RuntimeError("Portfolio store unavailable")
+        if holdings.empty:
+            return None
+        valuation = value_holdings(portfolio_id, holdings)
+        self._snapshots.set(portfolio_id, (version, valuation))
+        return valuation
+
+    def get_valuation(self, portfolio_id: str, refresh: bool = False) -> Optional[PortfolioValuation]:
+        """Snapshot valuation of a portfolio; None if the portfolio does not exist"""
+        if refresh:
+            return self._compute(portfolio_id)
+        version = db_service.get_portfolio_version(portfolio_id)
+        snapshot = self._snapshots.get(portfolio_id)
+        if snapshot is not None and version is not None and snapshot[0] == version:
+            return snapshot[1]
+        return self._compute(portfolio_id, version)
+
+    def refresh_for_symbols(self, symbols: Iterable[str]) -> int:
+        """Recompute snapshots holding any of the synced symbols; returns how many were refreshed"""
+        symbols = set(symbols)
+        refreshed = 0
+        for portfolio_id in self._snapshots.keys():
+            snapshot = self._snapshots.get(portfolio_id)
+            if snapshot is None or symbols.isdisjoint(h.symbol for h in snapshot[1].holdings):
+                continue
+            try:
+                if self._compute(portfolio_id) is None:
+                    self._snapshots.invalidate(portfolio_id)
+                refreshed += 1
+            except Exception as e:
+                logger.error(f"Error refreshing valuation for portfolio {portfolio_id}: {e}")
+                self._snapshots.invalidate(portfolio_id)
+        return refreshed
+
+
+portfolio_service = PortfolioService(snapshot_ttl_seconds=settings.PORTFOLIO_SNAPSHOT_TTL_SECONDS)
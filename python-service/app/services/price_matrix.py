@@ -0,0 +1,393 @@
+"""
+Wide (dates x symbols) daily price matrix of the whole market.
+
+Cross-sectional work (the screener, correlations, relative strength ranks)
+needs every ticker's bars aligned on one calendar, so the stored history is
+held as a single float32 array of shape (fields x dates x symbols) instead of
+being queried per symbol. Missing bars stay NaN in the array; forward-filled
+prices and derived indicator columns are computed on demand and memoised
+until the matrix changes.
+
+The matrix is loaded once from "StockHistory" (or from the mapped bar store
+when it is enabled) and then updated in place as syncs store bars. With
+PRICE_MATRIX_MMAP_DIR set it lives in a memory-mapped .npy file described by
+a small JSON manifest, so every uvicorn worker maps the same pages instead of
+holding its own copy. Loads and syncs happen under an exclusive lock on
+prices.lock: the holder re-reads the manifest, writes into the file it points
+at (or publishes a new one) and bumps the manifest's revision, and the other
+workers pick the change up from the manifest on their next check. Superseded
+files are deleted only once the manifest no longer points at them.
+"""
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from ..config import settings
+from .bar_store import Bars, bar_store, date_string
+from .database import db_service
+from .trading_calendar import trading_calendar
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+MANIFEST = 'prices.json'
+LOCK = 'prices.lock'
+
+
+def forward_fill(values: np.ndarray) -> np.ndarray:
+    """Carry each column's last value over NaN gaps; leading NaN stays"""
+    valid = ~np.isnan(values)
+    rows = np.where(valid, np.arange(len(values))[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return values[rows, np.arange(values.shape[1])]
+
+
+class PriceMatrix:
+    """Aligned daily bars of many symbols; missing bars are NaN"""
+
+    def __init__(self, dates: List[str], symbols: List[str], data: np.ndarray, fields: Sequence[str],
+                 version: Optional[tuple] = None):
+        self.dates = dates
+        self.symbols = symbols
+        self.data = data
+        self.fields = tuple(fields)
+        self.version = version
+        self.revision = 0
+        self.file: Optional[str] = None
+        self._date_array = np.array(dates, dtype=str)
+        self._positions = {symbol: i for i, symbol in enumerate(symbols)}
+        self._derived: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_history(cls, history: pd.DataFrame, fields: Sequence[str] = ('close', 'volume'),
+                     version: Optional[tuple] = None) -> "PriceMatrix":
+        """Build from long-format rows with date, symbol and one column per field"""
+        date_rows, dates = pd.factorize(history['date'], sort=True)
+        symbol_columns, symbols = pd.factorize(history['symbol'], sort=True)
+        data = np.full((len(fields), len(dates), len(symbols)), np.nan, dtype=np.float32)
+        for k, field in enumerate(fields):
+            data[k, date_rows, symbol_columns] = pd.to_numeric(history[field], errors='coerce').to_numpy(np.float32)
+        return cls([str(d) for d in dates], [str(s) for s in symbols], data, fields, version)
+
+    @classmethod
+    def from_bars(cls, bars: Iterable[Bars], fields: Sequence[str] = ('close', 'volume'),
+                  version: Optional[tuple] = None) -> "PriceMatrix":
+        """Build from per-symbol bar store views, scattering each column straight from the mapped file"""
+        bars = list(bars)
+        keys = np.unique(np.concatenate([b['date'] for b in bars])) if bars else np.empty(0)
+        data = np.full((len(fields), len(keys), len(bars)), np.nan, dtype=np.float32)
+        for column, symbol_bars in enumerate(bars):
+            rows = np.searchsorted(keys, symbol_bars['date'])
+            for k, field in enumerate(fields):
+                data[k, rows, column] = symbol_bars[field]
+        return cls([date_string(key) for key in keys], [b.symbol for b in bars], data, fields, version)
+
+    @property
+    def as_of(self) -> Optional[str]:
+        return self.dates[-1] if self.dates else None
+
+    def raw(self, field: str) -> np.ndarray:
+        """Stored (dates x symbols) values of a field, NaN where there is no bar"""
+        return self.data[self.fields.index(field)]
+
+    def filled(self, field: str) -> np.ndarray:
+        """Field as float64 with suspended days filled: prices carried forward, volume zero"""
+        def compute(matrix: "PriceMatrix") -> np.ndarray:
+            values = matrix.raw(field).astype(float)
+            if field != 'volume':
+                return forward_fill(values)
+            listed = np.maximum.accumulate(~np.isnan(matrix.raw('close')), axis=0)
+            return np.where(np.isnan(values) & listed, 0.0, values)
+        return self.derived(f"filled:{field}", compute)
+
+    @property
+    def close(self) -> np.ndarray:
+        return self.filled('close')
+
+    @property
+    def volume(self) -> np.ndarray:
+        return self.filled('volume')
+
+    def column_indices(self, symbols: List[str]) -> np.ndarray:
+        """Column index of each symbol, -1 where the symbol has no stored history"""
+        return np.array([self._positions.get(s, -1) for s in symbols], dtype=int)
+
+    def derived(self, name: str, compute: Callable[["PriceMatrix"], np.ndarray]) -> np.ndarray:
+        """Per-matrix array ``name``, computed once until the bars change"""
+        with self._lock:
+            if name in self._derived:
+                return self._derived[name]
+        values = compute(self)
+        with self._lock:
+            return self._derived.setdefault(name, values)
+
+    def select(self, name: str, compute: Callable[["PriceMatrix"], np.ndarray],
+               symbols: List[str]) -> np.ndarray:
+        """Derived per-symbol column aligned to ``symbols``; NaN for symbols without history"""
+        values = self.derived(name, compute)
+        indices = self.column_indices(symbols)
+        if not len(values):
+            return np.full(len(symbols), np.nan)
+        return np.where(indices >= 0, values[np.maximum(indices, 0)], np.nan)
+
+    def changed(self, revision: Optional[int] = None):
+        """Drop derived arrays after the bars were written (here or by another worker)"""
+        with self._lock:
+            self._derived.clear()
+            self.revision = self.revision + 1 if revision is None else revision
+
+    def write_bars(self, symbol: str, bars: List[Dict[str, Any]]) -> bool:
+        """Write a symbol's bars in place; False if the symbol or a bar's date is not in the matrix yet.
+
+        Bars older than the first date are outside the window and ignored.
+        """
+        column = self._positions.get(symbol)
+        bars = [bar for bar in bars if self.dates and bar['date'] >= self.dates[0]]
+        if column is None:
+            return False
+        if not bars:
+            return True
+        dates = np.array([bar['date'] for bar in bars], dtype=str)
+        rows = np.searchsorted(self._date_array, dates)
+        if np.any(rows >= len(self.dates)) or np.any(self._date_array[np.minimum(rows, len(self.dates) - 1)] != dates):
+            return False
+        for k, field in enumerate(self.fields):
+            self.data[k, rows, column] = np.array([bar.get(field) for bar in bars], dtype=float)
+        self.changed()
+        return True
+
+    def extended(self, dates: Iterable[str], symbols: Iterable[str], start_date: str) -> "PriceMatrix":
+        """Copy with extra dates and symbols (new cells NaN), dropping dates before ``start_date``"""
+        new_dates = sorted(d for d in set(self.dates) | set(dates) if d >= start_date)
+        new_symbols = sorted(set(self.symbols) | set(symbols))
+        data = np.full((len(self.fields), len(new_dates), len(new_symbols)), np.nan, dtype=np.float32)
+        kept = [i for i, d in enumerate(self.dates) if d >= start_date]
+        if kept and self.symbols:
+            rows = np.searchsorted(np.array(new_dates, dtype=str), self._date_array[kept])
+            columns = np.searchsorted(np.array(new_symbols, dtype=str), np.array(self.symbols, dtype=str))
+            data[:, rows[:, None], columns] = self.data[:, kept, :]
+        return PriceMatrix(new_dates, new_symbols, data, self.fields, self.version)
+
+    def combined(self, other: "PriceMatrix", start_date: str) -> "PriceMatrix":
+        """Copy with another matrix's dates and symbols added; its bars win where both have one"""
+        matrix = self.extended(other.dates, other.symbols, start_date)
+        kept = [i for i, d in enumerate(other.dates) if d >= start_date]
+        if kept and other.symbols:
+            rows = np.searchsorted(matrix._date_array, other._date_array[kept])
+            matrix.data[:, rows[:, None], matrix.column_indices(other.symbols)] = other.data[:, kept, :]
+        return matrix
+
+
+class PriceMatrixService:
+    """Process-wide price matrix, optionally shared between workers through a memory-mapped file"""
+
+    def __init__(self, lookback_days: int, check_seconds: float, fields: Sequence[str],
+                 mmap_dir: Optional[str] = None):
+        unknown = set(fields) - set(FIELDS)
+        if unknown or 'close' not in fields:
+            raise ValueError(f"Price matrix fields must include close and come from {FIELDS}")
+        self.lookback_days = lookback_days
+        self.check_seconds = check_seconds
+        self.fields = tuple(f for f in FIELDS if f in fields)
+        self.mmap_dir = mmap_dir or None
+        self._matrix: Optional[PriceMatrix] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _start_date(self, last_date: str) -> str:
+        return (datetime.strptime(last_date, '%Y-%m-%d') - timedelta(days=self.lookback_days)).strftime('%Y-%m-%d')
+
+    @staticmethod
+    def _history_version() -> Optional[tuple]:
+        """Stored history version as strings, so it compares equal to the manifest's copy"""
+        version = db_service.get_history_version()
+        return tuple(str(part) for part in version) if version else None
+
+    @staticmethod
+    def _stored_symbols(start: str) -> List[str]:
+        """Bar store symbols whose stored bars reach back to the window start"""
+        if not bar_store.enabled:
+            return []
+        first_session = trading_calendar.next_session(start)
+        symbols = []
+        for symbol in bar_store.symbols():
+            coverage = bar_store.coverage(symbol)
+            if coverage and coverage[0] <= first_session:
+                symbols.append(symbol)
+        return symbols
+
+    def _load(self, version: tuple) -> PriceMatrix:
+        start = self._start_date(version[0])
+        stored = self._stored_symbols(start)
+        # Syncs write the bar store too; reading mapped files skips the row-per-bar query,
+        # so only symbols the store does not cover over the window come from StockHistory
+        history = db_service.get_history_matrix(start, list(self.fields), exclude=stored)
+        matrix = PriceMatrix.from_history(history, self.fields, version)
+        if stored:
+            matrix = PriceMatrix.from_bars(bar_store.scan(start, symbols=stored), self.fields, version).combined(matrix, start)
+        logger.info(f"Loaded price matrix: {len(matrix.dates)} dates x {len(matrix.symbols)} symbols")
+        return matrix
+
+    def _fold(self, matrix: PriceMatrix, symbol: str, bars: List[Dict[str, Any]]) -> PriceMatrix:
+        """Write a symbol's bars in place, or into a grown copy when they bring a new date or symbol"""
+        if not matrix.write_bars(symbol, bars):
+            # A new session or a new listing: grow the matrix once, then write in place
+            last_date = max([bar['date'] for bar in bars] + matrix.dates[-1:])
+            matrix = matrix.extended([bar['date'] for bar in bars], [symbol], self._start_date(last_date))
+            matrix.write_bars(symbol, bars)
+        # The store now matches the matrix; stamp its version so get() does not reload
+        matrix.version = self._history_version() or matrix.version
+        return matrix
+
+    # Shared memory-mapped copy
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.mmap_dir, MANIFEST)
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the cross-worker lock; only its holder publishes, writes bars or touches the manifest"""
+        os.makedirs(self.mmap_dir, exist_ok=True)
+        with open(os.path.join(self.mmap_dir, LOCK), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_manifest(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._manifest_path()) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Error reading price matrix manifest: {e}")
+            return None
+
+    @staticmethod
+    def _next_revision(manifest: Optional[Dict[str, Any]]) -> int:
+        """Revision for the next change, one past the manifest's so it only ever grows across workers"""
+        return (manifest or {}).get('revision', 0) + 1
+
+    def _write_manifest(self, matrix: PriceMatrix):
+        manifest = {
+            'file': matrix.file, 'fields': list(matrix.fields), 'dates': matrix.dates,
+            'symbols': matrix.symbols, 'version': list(matrix.version) if matrix.version else None,
+            'revision': matrix.revision
+        }
+        temporary = f"{self._manifest_path()}.{os.getpid()}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(temporary, self._manifest_path())
+
+    def _publish(self, matrix: PriceMatrix, revision: int) -> PriceMatrix:
+        """Write the matrix to a new mapped file, point the manifest at it and return the mapped copy.
+
+        Called with the lock held.
+        """
+        name = f"prices-{int(time.time() * 1000)}-{os.getpid()}.npy"
+        mapped = np.lib.format.open_memmap(os.path.join(self.mmap_dir, name), mode='w+',
+                                           dtype=np.float32, shape=matrix.data.shape)
+        mapped[:] = matrix.data
+        mapped.flush()
+        shared = PriceMatrix(matrix.dates, matrix.symbols, mapped, matrix.fields, matrix.version)
+        shared.file, shared.revision = name, revision
+        self._write_manifest(shared)
+        # The manifest has moved on, so no worker writes to the older files any more;
+        # ones still mapping them keep their pages until they switch
+        for old in os.listdir(self.mmap_dir):
+            if old.startswith('prices-') and old.endswith('.npy') and old != name:
+                try:
+                    os.remove(os.path.join(self.mmap_dir, old))
+                except OSError:
+                    pass
+        return shared
+
+    def _attach(self, manifest: Optional[Dict[str, Any]]) -> Optional[PriceMatrix]:
+        """Map the published matrix, or follow in-place updates of the one already mapped"""
+        if manifest is None:
+            return None
+        try:
+            version = tuple(manifest['version']) if manifest['version'] else None
+            current = self._matrix
+            if current is not None and current.file == manifest['file']:
+                if current.revision != manifest['revision']:
+                    current.changed(manifest['revision'])
+                current.version = version
+                return current
+            if tuple(manifest['fields']) != self.fields:
+                return None
+            data = np.load(os.path.join(self.mmap_dir, manifest['file']), mmap_mode='r+')
+            matrix = PriceMatrix(manifest['dates'], manifest['symbols'], data, self.fields, version)
+            matrix.file, matrix.revision = manifest['file'], manifest['revision']
+            return matrix
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Error attaching shared price matrix: {e}")
+            return None
+
+    def _reload_shared(self, version: tuple) -> PriceMatrix:
+        """Load and publish ``version``, unless another worker published it while we waited for the lock"""
+        with self._exclusive():
+            manifest = self._read_manifest()
+            attached = self._attach(manifest)
+            if attached is not None and attached.version == version:
+                return attached
+            return self._publish(self._load(version), self._next_revision(manifest))
+
+    def get(self) -> Optional[PriceMatrix]:
+        """Current matrix; None if no history is stored"""
+        with self._lock:
+            if self._matrix is not None and time.monotonic() - self._checked_at < self.check_seconds:
+                return self._matrix
+            self._checked_at = time.monotonic()
+            if self.mmap_dir:
+                self._matrix = self._attach(self._read_manifest()) or self._matrix
+            version = self._history_version()
+            if version is None:
+                return self._matrix
+            if self._matrix is None or self._matrix.version != version:
+                self._matrix = self._reload_shared(version) if self.mmap_dir else self._load(version)
+            return self._matrix
+
+    def apply_bars(self, symbol: str, bars: List[Dict[str, Any]]):
+        """Fold a symbol's freshly stored bars into the loaded matrix instead of reloading it"""
+        with self._lock:
+            if self._matrix is None or not bars:
+                return
+            if not self.mmap_dir:
+                self._matrix = self._fold(self._matrix, symbol, bars)
+                return
+            with self._exclusive():
+                manifest = self._read_manifest()
+                # Write into the file the manifest points at now, not one another worker replaced
+                matrix = self._attach(manifest) or self._matrix
+                folded = self._fold(matrix, symbol, bars)
+                revision = self._next_revision(manifest)
+                if folded is matrix:
+                    matrix.data.flush()
+                    matrix.changed(revision)
+                    self._write_manifest(matrix)
+                else:
+                    folded = self._publish(folded, revision)
+                self._matrix = folded
+
+
+price_matrix_service = PriceMatrixService(
+    lookback_days=settings.PRICE_MATRIX_LOOKBACK_DAYS,
+    check_seconds=settings.PRICE_MATRIX_CHECK_SECONDS,
+    fields=settings.PRICE_MATRIX_FIELDS,
+    mmap_dir=settings.PRICE_MATRIX_MMAP_DIR
+)
@@ -0,0 +1,199 @@
+"""
+Realtime quote fan-out for WebSocket and Server-Sent Events clients.
+
+A single shared poller refreshes the union of all subscribed symbols with one
+batched price board call and pushes only the fields that changed, so upstream
+load grows with distinct symbols rather than with open browser tabs. Client
+symbols are validated and capped per connection, since every one of them joins
+the shared batch.
+"""
+import asyncio
+import logging
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from ..config import settings
+from ..models import StockPrice
+from .trading_calendar import trading_calendar
+from .vnstock_service import vnstock_service
+
+logger = logging.getLogger(__name__)
+
+TICKER_PATTERN = re.compile(r'^[A-Z0-9]{1,10}$')
+
+
+def is_trading_session(now: Optional[datetime] = None) -> bool:
+    """Check whether the Vietnamese market is in a trading session"""
+    return trading_calendar.is_trading_time(now)
+
+
+def normalize_symbols(symbols: Any) -> Set[str]:
+    """Upper-cased tickers of a client's list of symbol strings; ValueError on anything else"""
+    if not isinstance(symbols, (list, tuple)):
+        raise ValueError("symbols must be a list of tickers")
+    normalized = set()
+    for symbol in symbols:
+        if not isinstance(symbol, str):
+            raise ValueError("symbols must be a list of tickers")
+        symbol = symbol.strip().upper()
+        if not symbol:
+            continue
+        if not TICKER_PATTERN.match(symbol):
+            raise ValueError(f"Invalid symbol: {symbol[:20]}")
+        normalized.add(symbol)
+    return normalized
+
+
+class Subscription:
+    """One connected client: its symbols and outgoing message queue"""
+
+    def __init__(self, symbols: Iterable[str], max_queue: int):
+        self.symbols: Set[str] = set(symbols)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+
+    async def get(self) -> Dict[str, Any]:
+        return await self.queue.get()
+
+
+class QuoteHub:
+    """Shared poller plus pub/sub registry for realtime quotes"""
+
+    def __init__(self, fetcher: Callable[[List[str]], Dict[str, StockPrice]],
+                 poll_interval: float = 3.0, market_hours_only: bool = True,
+                 max_queue: int = 100, max_symbols: int = 100):
+        self.fetcher = fetcher
+        self.poll_interval = poll_interval
+        self.market_hours_only = market_hours_only
+        self.max_queue = max_queue
+        self.max_symbols = max_symbols
+        self._subscriptions: List[Subscription] = []
+        self._refcounts: Dict[str, int] = {}
+        self._last_quotes: Dict[str, Dict[str, Any]] = {}
+        self._poller: Optional[asyncio.Task] = None
+        self._poll_count = 0
+        self._last_poll: Optional[datetime] = None
+
+    @property
+    def symbols(self) -> List[str]:
+        """Distinct symbols across all subscribers"""
+        return sorted(self._refcounts)
+
+    def subscribe(self, symbols: Iterable[str] = ()) -> Subscription:
+        """Register a client; known quotes for its symbols are sent immediately"""
+        subscription = Subscription((), self.max_queue)
+        self._subscriptions.append(subscription)
+        try:
+            self.add_symbols(subscription, symbols)
+        except ValueError:
+            self._subscriptions.remove(subscription)
+            raise
+        return subscription
+
+    def add_symbols(self, subscription: Subscription, symbols: List[str]):
+        """Add validated tickers to a client; ValueError leaves its symbols unchanged"""
+        added = normalize_symbols(symbols) - subscription.symbols
+        if not added:
+            return
+        if len(subscription.symbols) + len(added) > self.max_symbols:
+            raise ValueError(f"At most {self.max_symbols} symbols per connection")
+        subscription.symbols |= added
+        for symbol in added:
+            self._refcounts[symbol] = self._refcounts.get(symbol, 0) + 1
+
+        known = {s: self._last_quotes[s] for s in added if s in self._last_quotes}
+        if known:
+            self._send(subscription, {"type": "snapshot", "data": known})
+        self._ensure_poller()
+
+    def remove_symbols(self, subscription: Subscription, symbols: List[str]):
+        removed = normalize_symbols(symbols) & subscription.symbols
+        subscription.symbols -= removed
+        for symbol in removed:
+            self._refcounts[symbol] -= 1
+            if self._refcounts[symbol] <= 0:
+                del self._refcounts[symbol]
+                self._last_quotes.pop(symbol, None)
+
+    def unsubscribe(self, subscription: Subscription):
+        self.remove_symbols(subscription, list(subscription.symbols))
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+
+    def _send(self, subscription: Subscription, message: Dict[str, Any]):
+        try:
+            subscription.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Slow consumer: drop its backlog and resync with a full snapshot
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
+            snapshot = {s: self._last_quotes[s] for s in subscription.symbols if s in self._last_quotes}
+            subscription.queue.put_nowait({"type": "snapshot", "data": snapshot})
+
+    def _ensure_poller(self):
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while self._refcounts:
+            # Outside trading hours only fetch symbols nobody has a quote for yet
+            if not self.market_hours_only or is_trading_session():
+                symbols = self.symbols
+            else:
+                symbols = [s for s in self.symbols if s not in self._last_quotes]
+            if symbols:
+                await self.poll_once(symbols)
+            await asyncio.sleep(self.poll_interval)
+
+    async def poll_once(self, symbols: Optional[List[str]] = None):
+        """Fetch quotes for subscribed symbols and push deltas to subscribers"""
+        symbols = symbols if symbols is not None else self.symbols
+        if not symbols:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+            quotes = await loop.run_in_executor(None, self.fetcher, symbols)
+        except Exception as e:
+            logger.warning(f"Realtime poll failed for {len(symbols)} symbols: {e}")
+            return
+        self._poll_count += 1
+        self._last_poll = datetime.now()
+
+        deltas: Dict[str, Dict[str, Any]] = {}
+        for symbol, quote in quotes.items():
+            if symbol not in self._refcounts:
+                continue
+            current = quote.model_dump()
+            previous = self._last_quotes.get(symbol)
+            if previous is None:
+                changed = current
+            else:
+                changed = {k: v for k, v in current.items() if previous.get(k) != v}
+            if changed:
+                deltas[symbol] = changed
+                self._last_quotes[symbol] = current
+
+        if not deltas:
+            return
+        timestamp = self._last_poll.isoformat()
+        for subscription in list(self._subscriptions):
+            data = {s: d for s, d in deltas.items() if s in subscription.symbols}
+            if data:
+                self._send(subscription, {"type": "delta", "data": data, "timestamp": timestamp})
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self._subscriptions),
+            "symbols": len(self._refcounts),
+            "polls": self._poll_count,
+            "last_poll": self._last_poll.isoformat() if self._last_poll else None,
+            "trading_session": is_trading_session()
+        }
+
+
+quote_hub = QuoteHub(
+    fetcher=vnstock_service.get_price_board,
+    poll_interval=settings.REALTIME_POLL_SECONDS,
+    market_hours_only=settings.REALTIME_MARKET_HOURS_ONLY,
+    max_symbols=settings.REALTIME_MAX_SYMBOLS
+)
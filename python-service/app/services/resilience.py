@@ -0,0 +1,351 @@
+"""
+Resilience layer for upstream calls (vnstock providers, RSS feeds).
+
+Every blocking upstream call goes through ``guarded_call`` which:
+- runs the call on a bounded worker pool with an explicit deadline,
+- caps that deadline by the end-to-end budget of the current request,
+- trips a per-upstream circuit breaker after repeated failures so callers
+  fail fast instead of waiting on a provider that is known to be down.
+
+Only errors that say the provider is unhealthy (timeouts, transport errors,
+server errors) count as failures. A provider answering "no data" for an
+unknown ticker raises ValueError/KeyError; that call completed, so one
+client asking for bad symbols cannot open a circuit every user depends on.
+"""
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamError(Exception):
+    """Base error for guarded upstream calls"""
+
+
+class CircuitOpenError(UpstreamError):
+    """Raised when the circuit for an upstream is open and the call is rejected"""
+
+
+class DeadlineExceededError(UpstreamError):
+    """Raised when an upstream call exceeds its deadline or the request budget"""
+
+
+# Errors the provider raises for requests it answered (unknown ticker, empty range)
+DATA_ERRORS = (ValueError, KeyError)
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """Whether an error counts against the upstream's circuit breaker"""
+    if isinstance(error, json.JSONDecodeError):
+        # An error page instead of a payload is the provider failing
+        return True
+    return not isinstance(error, DATA_ERRORS)
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open trial call"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._total_calls = 0
+        self._total_failures = 0
+        self._total_rejected = 0
+        self._last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self):
+        # Caller must hold the lock
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+
+    def allow_request(self) -> bool:
+        """Return True if a call may proceed, False if it must fail fast"""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == self.OPEN:
+                self._total_rejected += 1
+                return False
+            if self._state == self.HALF_OPEN:
+                # Only one probe call at a time while half-open
+                if self._trial_in_flight:
+                    self._total_rejected += 1
+                    return False
+                self._trial_in_flight = True
+            self._total_calls += 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit {self.name} closed after successful trial call")
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """Give up a half-open trial without a verdict, e.g. when the caller was cancelled"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self, error: Optional[BaseException] = None):
+        with self._lock:
+            self._consecutive_failures += 1
+            self._total_failures += 1
+            self._last_error = str(error) if error else None
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(
+                        f"Circuit {self.name} opened after {self._consecutive_failures} consecutive failures"
+                    )
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current breaker state for health reporting"""
+        with self._lock:
+            self._maybe_half_open()
+            retry_in = None
+            if self._state == self.OPEN:
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+            return {
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "total_calls": self._total_calls,
+                "total_failures": self._total_failures,
+                "total_rejected": self._total_rejected,
+                "retry_in_seconds": round(retry_in, 1) if retry_in is not None else None,
+                "last_error": self._last_error
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+# Absolute monotonic deadline of the request currently being served, if any
+_request_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    'upstream_request_deadline', default=None
+)
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.UPSTREAM_MAX_WORKERS,
+    thread_name_prefix='upstream'
+)
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Get (or lazily create) the circuit breaker for an upstream"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+                reset_timeout=settings.CIRCUIT_RESET_SECONDS
+            )
+            _breakers[name] = breaker
+        return breaker
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    """Snapshot of all known circuit breakers keyed by upstream name"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+@contextmanager
+def request_budget(seconds: Optional[float] = None):
+    """Bound every guarded call inside the block by an end-to-end budget.
+
+    Budgets nest: an inner budget can only shrink the deadline inherited from
+    the outer one, so a nested call never outlives its caller's request.
+    """
+    seconds = settings.REQUEST_BUDGET_SECONDS if seconds is None else seconds
+    deadline = time.monotonic() + seconds
+    current = _request_deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _request_deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _request_deadline.reset(token)
+
+
+def with_request_budget(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Decorator running ``func`` inside a default ``request_budget``"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with request_budget():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def remaining_budget() -> Optional[float]:
+    """Seconds left in the current request budget, or None when unbounded"""
+    deadline = _request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def _effective_timeout(timeout: Optional[float]) -> float:
+    wait = settings.UPSTREAM_TIMEOUT_SECONDS if timeout is None else timeout
+    remaining = remaining_budget()
+    if remaining is not None:
+        if remaining <= 0:
+            raise DeadlineExceededError("Request budget exhausted before upstream call")
+        wait = min(wait, remaining)
+    return wait
+
+
+def _submit(upstream: str, func: Callable[..., Any], args, kwargs) -> Tuple[CircuitBreaker, Future]:
+    breaker = get_breaker(upstream)
+    if not breaker.allow_request():
+        raise CircuitOpenError(f"Circuit for {upstream} is open")
+    ctx = contextvars.copy_context()
+    return breaker, _executor.submit(ctx.run, func, *args, **kwargs)
+
+
+def _record_error(breaker: CircuitBreaker, error: Exception, is_failure: Callable[[BaseException], bool]):
+    if is_failure(error):
+        breaker.record_failure(error)
+    else:
+        # The upstream answered; the request was bad, not the provider
+        breaker.record_success()
+
+
+def _collect(upstream: str, breaker: CircuitBreaker, future: Future, wait: float,
+             is_failure: Callable[[BaseException], bool] = is_upstream_failure) -> Any:
+    try:
+        result = future.result(timeout=max(0.0, wait))
+    except FutureTimeoutError:
+        future.cancel()
+        error = DeadlineExceededError(f"{upstream} call timed out after {wait:.1f}s")
+        breaker.record_failure(error)
+        raise error
+    except Exception as e:
+        _record_error(breaker, e, is_failure)
+        raise
+    except BaseException:
+        breaker.release_trial()
+        raise
+
+    breaker.record_success()
+    return result
+
+
+def guarded_call(upstream: str, func: Callable[..., Any], *args,
+                 timeout: Optional[float] = None,
+                 is_failure: Callable[[BaseException], bool] = is_upstream_failure, **kwargs) -> Any:
+    """Run a blocking upstream call with a deadline and circuit breaker.
+
+    Raises CircuitOpenError without calling ``func`` while the upstream's
+    circuit is open, and DeadlineExceededError when the call does not finish
+    within ``timeout`` (default UPSTREAM_TIMEOUT_SECONDS) or the remaining
+    request budget, whichever is shorter. A timed-out call keeps running on
+    its worker thread but no longer blocks the caller. ``is_failure`` decides
+    which errors raised by ``func`` count against the breaker.
+    """
+    wait = _effective_timeout(timeout)
+    breaker, future = _submit(upstream, func, args, kwargs)
+    return _collect(upstream, breaker, future, wait, is_failure)
+
+
+def guarded_gather(*calls: Tuple[str, Callable[[], Any]],
+                   timeout: Optional[float] = None,
+                   is_failure: Callable[[BaseException], bool] = is_upstream_failure) -> List[Any]:
+    """Run several guarded upstream calls concurrently.
+
+    ``calls`` are ``(upstream, func)`` pairs. All calls share one deadline so
+    the total wait is the slowest call rather than the sum. Results come back
+    in order; a failed call yields its exception instance instead of raising,
+    so callers can merge partial results.
+    """
+    wait = _effective_timeout(timeout)
+    deadline = time.monotonic() + wait
+
+    submitted = []
+    for upstream, func in calls:
+        try:
+            submitted.append(_submit(upstream, func, (), {}))
+        except CircuitOpenError as e:
+            submitted.append(e)
+
+    results: List[Any] = []
+    for (upstream, _), pending in zip(calls, submitted):
+        if isinstance(pending, Exception):
+            results.append(pending)
+            continue
+        breaker, future = pending
+        try:
+            results.append(_collect(upstream, breaker, future, deadline - time.monotonic(), is_failure))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+async def guarded_async(upstream: str, coro_factory: Callable[[], Awaitable[Any]],
+                        timeout: Optional[float] = None,
+                        classify: Optional[Callable[[Any], Optional[Exception]]] = None,
+                        is_failure: Callable[[BaseException], bool] = is_upstream_failure) -> Any:
+    """Async counterpart of ``guarded_call`` for natively async upstream I/O.
+
+    ``coro_factory`` is only invoked when the circuit allows the call, so an
+    open circuit costs no network round trip. ``classify`` turns a result
+    that is really an upstream failure (an HTTP 5xx response) into the
+    exception to record and raise; ``is_failure`` decides which raised errors
+    count, as for ``guarded_call``. A cancelled call gives up its half-open
+    trial without counting either way.
+    """
+    wait = _effective_timeout(timeout)
+    breaker = get_breaker(upstream)
+    if not breaker.allow_request():
+        raise CircuitOpenError(f"Circuit for {upstream} is open")
+    try:
+        result = await asyncio.wait_for(coro_factory(), timeout=wait)
+        error = classify(result) if classify else None
+    except asyncio.TimeoutError:
+        error = DeadlineExceededError(f"{upstream} call timed out after {wait:.1f}s")
+        breaker.record_failure(error)
+        raise error
+    except Exception as e:
+        _record_error(breaker, e, is_failure)
+        raise
+    except BaseException:
+        breaker.release_trial()
+        raise
+
+    if error is not None:
+        breaker.record_failure(error)
+        raise error
+    breaker.record_success()
+    return result
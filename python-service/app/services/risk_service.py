@@ -0,0 +1,265 @@
+"""
+Portfolio risk analytics over stored daily history.
+
+Closes for a symbol set come from StockHistory in one query and are turned
+into an aligned returns matrix (dates x symbols) with the benchmark's returns
+alongside. Matrices are cached per (symbol set, window, history version), so
+repeated requests skip the query and the pivot until a sync stores or corrects
+bars; the annualised covariance is computed once per cached matrix and shared
+by the risk and optimisation endpoints.
+"""
+import logging
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..config import settings
+from ..models import (
+    AssetAllocation, FrontierPoint, HoldingRisk, OptimizeRequest, OptimizeResponse, PortfolioRisk
+)
+from ..utils import optimize, risk
+from ..utils.cache import TTLCache
+from .database import db_service
+from .portfolio_service import portfolio_service
+from .trading_calendar import trading_calendar
+from .vnstock_service import PERIOD_SESSIONS, vnstock_service
+
+logger = logging.getLogger(__name__)
+
+OPTIMIZATION_METHODS = ('min_variance', 'mean_variance', 'risk_parity')
+
+
+class ReturnsData:
+    """Aligned daily returns of a symbol set and the benchmark"""
+
+    def __init__(self, returns: pd.DataFrame, benchmark: Optional[pd.Series], missing: List[str]):
+        self.symbols: List[str] = list(returns.columns)
+        self.dates: List[str] = list(returns.index)
+        self.values = returns.to_numpy(dtype=float)
+        self.benchmark = benchmark.to_numpy(dtype=float) if benchmark is not None else None
+        self.missing = missing
+        self._covariance: Optional[np.ndarray] = None
+        self._expected_returns: Optional[np.ndarray] = None
+
+    @property
+    def covariance(self) -> np.ndarray:
+        """Annualised covariance, computed on first use"""
+        if self._covariance is None:
+            self._covariance = risk.covariance(self.values)
+        return self._covariance
+
+    @property
+    def expected_returns(self) -> np.ndarray:
+        """Annualised mean daily returns"""
+        if self._expected_returns is None:
+            self._expected_returns = self.values.mean(axis=0) * risk.TRADING_DAYS
+        return self._expected_returns
+
+    def column_indices(self, symbols: List[str]) -> np.ndarray:
+        """Column indices of ``symbols`` in this matrix"""
+        position = {symbol: i for i, symbol in enumerate(self.symbols)}
+        return np.array([position[s] for s in symbols], dtype=int)
+
+
+class RiskService:
+    """Cached return matrices and portfolio risk measures"""
+
+    def __init__(self, benchmark: str, cache_ttl_seconds: float):
+        self.benchmark = benchmark
+        self._returns = TTLCache(ttl_seconds=cache_ttl_seconds, max_entries=256)
+
+    def _benchmark_closes(self, stored: pd.DataFrame, window: int) -> Optional[pd.Series]:
+        """Benchmark closes on the stored dates, fetched when the index has not been synced"""
+        if self.benchmark in stored.columns:
+            return stored[self.benchmark]
+        # Shortest period holding the window's sessions plus the close before them
+        period = min((p for p, n in PERIOD_SESSIONS.items() if n > window), key=PERIOD_SESSIONS.get, default='10Y')
+        history = vnstock_service.get_stock_history(self.benchmark, period)
+        if not history or not history.data:
+            logger.warning(f"No {self.benchmark} history; betas are unavailable")
+            return None
+        position = {day: row for row, day in enumerate(stored.index)}
+        closes = np.full(len(stored), np.nan)
+        for bar in history.data:
+            row = position.get(bar.date[:10])
+            if row is not None:
+                closes[row] = bar.close
+        return pd.Series(closes, index=stored.index, name=self.benchmark)
+
+    @staticmethod
+    def _close_matrix(history: pd.DataFrame) -> pd.DataFrame:
+        """(sessions x symbols) closes from long rows, scattered onto the trading calendar"""
+        dates, rows = trading_calendar.align(history['date'].astype(str).to_numpy())
+        columns, symbols = pd.factorize(history['symbol'], sort=True)
+        values = np.full((len(dates), len(symbols)), np.nan)
+        values[rows, columns] = pd.to_numeric(history['close'], errors='coerce').to_numpy(dtype=float)
+        # A session with no stored close at all is missing data, not a flat day
+        traded = ~np.isnan(values).all(axis=1)
+        return pd.DataFrame(values[traded], index=np.asarray(dates)[traded].tolist(), columns=[str(s) for s in symbols])
+
+    def get_returns(self, symbols: Iterable[str], window: int = 250) -> Optional[ReturnsData]:
+        """Last ``window`` aligned daily returns of the symbols; None if none has stored history"""
+        symbols = sorted({s.upper() for s in symbols})
+        version = db_service.get_history_version(symbols + [self.benchmark])
+        if version is None:
+            return None
+        key = (tuple(symbols), window, version)
+        cached = self._returns.get(key)
+        if cached is not None:
+            return cached
+
+        # The window's sessions plus the close before them
+        start = trading_calendar.window_start(window + 1, version[0])
+        history = db_service.get_close_history(symbols + [self.benchmark], start)
+        closes = self._close_matrix(history)
+
+        # Returns share one window, which a short history would cut down for every
+        # symbol; symbols (and a benchmark) listed for under half of it are left out
+        min_closes = max(window // 2, 2) + 1
+        counts = closes.count()
+        available = [s for s in symbols if counts.get(s, 0) >= min_closes]
+        if not available:
+            return None
+        prices = closes[available]
+        benchmark = self._benchmark_closes(closes, window)
+        if benchmark is not None and benchmark.count() < min_closes:
+            logger.warning(f"Too little {self.benchmark} history for a {window}-session window; betas are unavailable")
+            benchmark = None
+        if benchmark is not None:
+            prices = prices.assign(__benchmark__=benchmark)
+
+        returns = risk.returns_matrix(prices).iloc[-window:]
+        bench_returns = returns.pop('__benchmark__') if benchmark is not None else None
+        if returns.empty:
+            return None
+        data = ReturnsData(returns, bench_returns, missing=[s for s in symbols if s not in available])
+        self._returns.set(key, data)
+        return data
+
+    def analyze_portfolio(self, portfolio_id: str, window: int = 250,
+                          confidence: float = 0.95) -> Optional[PortfolioRisk]:
+        """Risk of a portfolio at its current market-value weights; None if it does not exist"""
+        valuation = portfolio_service.get_valuation(portfolio_id)
+        if valuation is None:
+            return None
+        values = {h.symbol: h.market_value for h in valuation.holdings if h.market_value}
+        if not values:
+            raise ValueError("Portfolio has no priced holdings")
+        data = self.get_returns(values, window)
+        if data is None:
+            raise ValueError("No stored history for the portfolio's holdings")
+
+        symbols = [s for s in data.symbols if s in values]
+        columns = data.column_indices(symbols)
+        returns = data.values[:, columns]
+        cov = data.covariance[np.ix_(columns, columns)]
+        weights = np.array([values[s] for s in symbols], dtype=float)
+        weights /= weights.sum()
+
+        portfolio_returns = returns @ weights
+        hist_var, hist_cvar = risk.historical_var_cvar(portfolio_returns, confidence)
+        param_var, param_cvar = risk.parametric_var_cvar(portfolio_returns, confidence)
+        asset_betas = risk.betas(returns, data.benchmark) if data.benchmark is not None else None
+        contributions = risk.risk_contributions(weights, cov)
+        volatilities = np.sqrt(np.diag(cov))
+
+        return PortfolioRisk(
+            portfolio_id=portfolio_id,
+            benchmark=self.benchmark,
+            start_date=data.dates[0],
+            end_date=data.dates[-1],
+            observations=len(portfolio_returns),
+            confidence=confidence,
+            volatility=risk.portfolio_volatility(weights, cov),
+            beta=float(weights @ asset_betas) if asset_betas is not None else None,
+            var_historical=hist_var,
+            cvar_historical=hist_cvar,
+            var_parametric=param_var,
+            cvar_parametric=param_cvar,
+            max_drawdown=risk.max_drawdown(portfolio_returns),
+            holdings=[
+                HoldingRisk(
+                    symbol=symbol, weight=float(weights[i]), volatility=float(volatilities[i]),
+                    beta=float(asset_betas[i]) if asset_betas is not None else None,
+                    risk_contribution=float(contributions[i])
+                )
+                for i, symbol in enumerate(symbols)
+            ],
+            correlation=risk.correlation(cov).round(4).tolist(),
+            missing_symbols=sorted(set(values) - set(symbols))
+        )
+
+    def optimize(self, request: OptimizeRequest) -> OptimizeResponse:
+        """Suggested weights for a symbol universe, optionally with the efficient frontier"""
+        if request.method not in OPTIMIZATION_METHODS:
+            raise ValueError(f"Unknown method '{request.method}'; use one of {', '.join(OPTIMIZATION_METHODS)}")
+        data = self.get_returns(request.symbols, request.window)
+        if data is None:
+            raise ValueError("No stored history for the requested symbols")
+        symbols, mu, cov = data.symbols, data.expected_returns, data.covariance
+        missing = data.missing
+        lo, hi = request.min_weight, request.max_weight
+
+        if request.method == 'risk_parity':
+            if (lo, hi) != (0.0, 1.0):
+                raise ValueError("risk_parity is long-only and does not take min_weight/max_weight")
+            # A flat series takes no risk budget, so parity cannot give it a weight
+            flat = ~(np.diag(cov) > 0)
+            if flat.all():
+                raise ValueError("No requested symbol has varying returns in the window")
+            if flat.any():
+                keep = np.flatnonzero(~flat)
+                missing = sorted(missing + [symbols[i] for i in np.flatnonzero(flat)])
+                symbols, mu, cov = [symbols[i] for i in keep], mu[keep], cov[np.ix_(keep, keep)]
+            weights = optimize.risk_parity_weights(cov)
+        elif request.method == 'min_variance':
+            weights = optimize.min_variance_weights(cov, lo, hi)
+        else:
+            weights = optimize.mean_variance_weights(mu, cov, request.risk_aversion, lo, hi)[0]
+
+        expected, volatility, sharpe = optimize.performance(weights, mu, cov, request.risk_free_rate)
+        contributions = risk.risk_contributions(weights, cov)
+        volatilities = np.sqrt(np.diag(cov))
+
+        frontier = []
+        if request.frontier_points > 0:
+            # One batched solve for every point on the frontier
+            gammas = optimize.frontier_risk_aversions(mu, cov, request.frontier_points)
+            frontier_weights = optimize.mean_variance_weights(mu, cov, gammas, lo, hi)
+            f_expected, f_volatility, f_sharpe = optimize.performance(frontier_weights, mu, cov,
+                                                                      request.risk_free_rate)
+            frontier = [
+                FrontierPoint(
+                    risk_aversion=float(gammas[i]), expected_return=float(f_expected[i]),
+                    volatility=float(f_volatility[i]),
+                    sharpe=None if np.isnan(f_sharpe[i]) else float(f_sharpe[i]),
+                    weights={s: round(float(w), 6) for s, w in zip(symbols, frontier_weights[i])}
+                )
+                for i in range(len(gammas))
+            ]
+
+        return OptimizeResponse(
+            method=request.method,
+            allocations=[
+                AssetAllocation(
+                    symbol=symbol, weight=round(float(weights[i]), 6), expected_return=float(mu[i]),
+                    volatility=float(volatilities[i]), risk_contribution=float(contributions[i])
+                )
+                for i, symbol in enumerate(symbols)
+            ],
+            expected_return=float(expected[0]),
+            volatility=float(volatility[0]),
+            sharpe=None if np.isnan(sharpe[0]) else float(sharpe[0]),
+            frontier=frontier,
+            start_date=data.dates[0],
+            end_date=data.dates[-1],
+            observations=len(data.dates),
+            missing_symbols=missing
+        )
+
+
+risk_service = RiskService(
+    benchmark=settings.RISK_BENCHMARK,
+    cache_ttl_seconds=settings.RISK_RETURNS_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,161 @@
+"""
+Cross-sectional stock screener.
+
+An expression such as ``pe < 12 and roe > 15 and rsi14 < 30 and close > sma200``
+is split into its top-level AND terms. Terms over "Stock" columns only are
+compiled into the SQL WHERE clause, so the database returns just the
+fundamentally eligible tickers; the remaining terms are evaluated with NumPy
+over indicator columns of the cached market-wide price matrix. Matches are
+ranked by a sort expression (market cap by default).
+"""
+import logging
+import re
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..models import ScreenerRequest, ScreenerResponse, ScreenerResult
+from ..utils import expressions, indicators
+from ..utils.expressions import ExpressionError
+from .database import db_service
+from .price_matrix import PriceMatrix, price_matrix_service
+
+logger = logging.getLogger(__name__)
+
+# Screener field -> SQL over "Stock" s
+FUNDAMENTAL_COLUMNS: Dict[str, str] = {
+    'pe': 's.pe',
+    'pb': 's.pb',
+    'roe': 's.roe',
+    'roa': 's.roa',
+    'eps': 's.eps',
+    'market_cap': 's."marketCap"',
+    'listed_shares': 's."listedShares"',
+    'price': 's."currentPrice"',
+    'change_percent': 's."changePercent"',
+    'volume': 's.volume::float8',
+    'exchange': 's.exchange',
+    'sector': 's.sector',
+    'industry': 's.industry',
+}
+TEXT_FIELDS = {'exchange', 'sector', 'industry'}
+
+# Technical fields: close, and <indicator><length> such as sma200, rsi14, ret20
+TECHNICAL_PATTERN = re.compile(r'^(sma|ema|rsi|ret|high|low|avgvol)(\d+)$')
+TECHNICAL_FUNCTIONS: Dict[str, Callable[[PriceMatrix, int], np.ndarray]] = {
+    'sma': lambda m, n: indicators.sma(m.close, n),
+    'ema': lambda m, n: indicators.ema(m.close, n),
+    'rsi': lambda m, n: indicators.rsi(m.close, n),
+    'ret': lambda m, n: indicators.change_percent(m.close, n),
+    # Intraday extremes when the matrix holds OHLC, closes otherwise
+    'high': lambda m, n: indicators.highest(m.filled('high') if 'high' in m.fields else m.close, n),
+    'low': lambda m, n: indicators.lowest(m.filled('low') if 'low' in m.fields else m.close, n),
+    'avgvol': lambda m, n: indicators.sma(m.volume, n),
+}
+MAX_INDICATOR_LENGTH = 500
+
+DEFAULT_SORT = 'market_cap'
+
+
+def technical_field(name: str) -> Optional[Callable[[PriceMatrix], np.ndarray]]:
+    """Function computing a technical field for every symbol of a matrix; None if ``name`` is not one"""
+    if name == 'close':
+        return lambda m: m.close[-1] if len(m.dates) else np.full(len(m.symbols), np.nan)
+    match = TECHNICAL_PATTERN.match(name)
+    if not match:
+        return None
+    function, length = TECHNICAL_FUNCTIONS[match.group(1)], int(match.group(2))
+    if not 1 <= length <= MAX_INDICATOR_LENGTH:
+        raise ExpressionError(f"Indicator length of '{name}' must be 1 to {MAX_INDICATOR_LENGTH}")
+    return lambda m: function(m, length)
+
+
+def _column(stocks: pd.DataFrame, name: str) -> np.ndarray:
+    if name in TEXT_FIELDS:
+        return stocks[name].to_numpy(dtype=object)
+    return pd.to_numeric(stocks[name], errors='coerce').to_numpy(dtype=float)
+
+
+def _value(value):
+    if isinstance(value, str) or value is None:
+        return value
+    return None if np.isnan(value) else float(value)
+
+
+class ScreenerService:
+    """Fundamental predicates in SQL, technical ones over the price matrix"""
+
+    def screen(self, request: ScreenerRequest) -> ScreenerResponse:
+        expression = expressions.parse(request.expression)
+        sort_key = expressions.parse_value(request.sort_by or DEFAULT_SORT)
+        if expressions.check(expression, TEXT_FIELDS) != 'bool':
+            raise ExpressionError("Expression must be a condition")
+        if expressions.check(sort_key, TEXT_FIELDS) != 'number':
+            raise ExpressionError("sort_by must be a numeric expression")
+
+        referenced = expressions.fields(expression) | expressions.fields(sort_key)
+        technical = {}
+        for name in sorted(referenced - FUNDAMENTAL_COLUMNS.keys()):
+            compute = technical_field(name)
+            if compute is None:
+                raise ExpressionError(f"Unknown field '{name}'")
+            technical[name] = compute
+
+        pushed, remaining = [], []
+        for term in expressions.conjuncts(expression):
+            (pushed if expressions.fields(term) <= FUNDAMENTAL_COLUMNS.keys() else remaining).append(term)
+        params: Dict[str, object] = {}
+        condition = ' AND '.join(expressions.to_sql(term, FUNDAMENTAL_COLUMNS, params) for term in pushed)
+        stocks = db_service.screen_stocks(FUNDAMENTAL_COLUMNS, condition or 'TRUE', params)
+        if stocks is None:
+            raise RuntimeError("Stock store unavailable")
+
+        symbols = stocks['symbol'].tolist()
+        matrix = price_matrix_service.get() if technical else None
+        columns: Dict[str, np.ndarray] = {}
+
+        def resolve(name: str) -> np.ndarray:
+            if name not in columns:
+                if name in FUNDAMENTAL_COLUMNS:
+                    columns[name] = _column(stocks, name)
+                elif matrix is None:
+                    columns[name] = np.full(len(symbols), np.nan)
+                else:
+                    columns[name] = matrix.select(name, technical[name], symbols)
+            return columns[name]
+
+        selected = np.ones(len(symbols), dtype=bool)
+        if remaining and symbols:
+            node = remaining[0] if len(remaining) == 1 else ('and', remaining)
+            selected = expressions.evaluate(node, resolve, len(symbols)) == 1
+        matches = np.flatnonzero(selected)
+
+        scores = expressions.evaluate(sort_key, resolve, len(symbols))[matches] if symbols else np.empty(0)
+        keys = -scores if request.descending else scores
+        # Unknown scores rank last either way
+        ranked = matches[np.lexsort((keys, np.isnan(scores)))][:request.limit]
+
+        names = sorted(referenced)
+        values = {name: resolve(name) for name in names}
+        score_of = dict(zip(matches, scores))
+        return ScreenerResponse(
+            expression=expressions.unparse(expression),
+            total=len(matches),
+            results=[
+                ScreenerResult(
+                    symbol=symbols[i],
+                    name=stocks['name'].iat[i],
+                    exchange=stocks['exchange'].iat[i],
+                    sector=stocks['sector'].iat[i],
+                    score=_value(score_of[i]),
+                    values={name: _value(values[name][i]) for name in names}
+                )
+                for i in ranked
+            ],
+            pushed_down=[expressions.unparse(term) for term in pushed],
+            as_of=matrix.as_of if matrix is not None else None
+        )
+
+
+screener_service = ScreenerService()
@@ -0,0 +1,61 @@
+"""
+Registry of listed tickers used to validate symbols found in news text.
+
+The listing is loaded into a frozenset so lookups are a single hash probe and
+readers never need a lock; refreshes build a new set and swap the reference.
+"""
+import logging
+import threading
+import time
+from typing import Callable, FrozenSet, Iterable, Optional
+
+from ..config import settings
+from .vnstock_service import vnstock_service
+
+logger = logging.getLogger(__name__)
+
+
+class SymbolRegistry:
+    """Periodically refreshed set of listed ticker symbols"""
+
+    def __init__(self, loader: Callable[[], Iterable[str]], refresh_seconds: float):
+        self.loader = loader
+        self.refresh_seconds = refresh_seconds
+        self._symbols: FrozenSet[str] = frozenset()
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def symbols(self) -> FrozenSet[str]:
+        """Known tickers; empty until the first successful load"""
+        return self._symbols
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._symbols
+
+    def refresh(self) -> bool:
+        """Reload the listing; keeps the previous set if the load fails or is empty"""
+        with self._lock:
+            try:
+                symbols = frozenset(str(s).strip().upper() for s in self.loader() if s)
+            except Exception as e:
+                logger.error(f"Error loading symbol listing: {e}")
+                symbols = frozenset()
+            if not symbols:
+                return False
+            self._symbols = symbols
+            self._loaded_at = time.monotonic()
+            logger.info(f"Symbol registry loaded {len(symbols)} tickers")
+            return True
+
+    def refresh_if_stale(self) -> bool:
+        """Refresh when never loaded successfully or older than ``refresh_seconds``"""
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_seconds:
+            return False
+        return self.refresh()
+
+
+symbol_registry = SymbolRegistry(
+    loader=vnstock_service.get_all_symbols,
+    refresh_seconds=settings.SYMBOL_REGISTRY_REFRESH_SECONDS
+)
@@ -0,0 +1,241 @@
+"""
+HOSE/HNX trading calendar.
+
+Trading days are weekdays that are not exchange holidays. The calendar is a
+NumPy business-day calendar, so turning dates into session numbers (and
+back), counting sessions and stepping N sessions are vectorised C loops
+rather than Python date arithmetic. Session numbers give every trading day a
+fixed row, which is how multi-symbol series are aligned without reindexing
+and how gaps in synced history are found.
+
+Holidays follow the exchanges' announced closures. Tet and the Hung Kings
+festival move with the lunar calendar, so they are listed per year, back far
+enough to cover the longest history period (10Y). Years without a list only
+get the fixed solar holidays, moved off weekends; that is fine for future
+years, but sessions before the listed years are not really known, so gap
+checks skip them. Extend or correct the list with ``TRADING_HOLIDAYS_FILE``.
+"""
+import json
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from ..config import settings
+
+MARKET_TZ = ZoneInfo("Asia/Ho_Chi_Minh")
+
+# HOSE/HNX continuous sessions (morning, afternoon incl. ATC and put-through)
+TRADING_SESSIONS = [
+    (dt_time(9, 0), dt_time(11, 30)),
+    (dt_time(13, 0), dt_time(15, 0)),
+]
+
+# Weekday closures by year; override or add years with a JSON file of the same shape
+DEFAULT_HOLIDAYS: Dict[str, List[str]] = {
+    "2016": [
+        "2016-01-01", "2016-02-08", "2016-02-09", "2016-02-10", "2016-02-11", "2016-02-12",
+        "2016-04-18", "2016-05-02", "2016-05-03", "2016-09-02",
+    ],
+    "2017": [
+        "2017-01-02", "2017-01-26", "2017-01-27", "2017-01-30", "2017-01-31", "2017-02-01",
+        "2017-04-06", "2017-05-01", "2017-05-02", "2017-09-04",
+    ],
+    "2018": [
+        "2018-01-01", "2018-02-14", "2018-02-15", "2018-02-16", "2018-02-19", "2018-02-20",
+        "2018-04-25", "2018-04-30", "2018-05-01", "2018-09-03", "2018-12-31",
+    ],
+    "2019": [
+        "2019-01-01", "2019-02-04", "2019-02-05", "2019-02-06", "2019-02-07", "2019-02-08",
+        "2019-04-15", "2019-04-29", "2019-04-30", "2019-05-01", "2019-09-02",
+    ],
+    "2020": [
+        "2020-01-01", "2020-01-23", "2020-01-24", "2020-01-27", "2020-01-28", "2020-01-29",
+        "2020-04-02", "2020-04-30", "2020-05-01", "2020-09-02",
+    ],
+    "2021": [
+        "2021-01-01", "2021-02-10", "2021-02-11", "2021-02-12", "2021-02-15", "2021-02-16",
+        "2021-04-21", "2021-04-30", "2021-05-03", "2021-09-02", "2021-09-03",
+    ],
+    "2022": [
+        "2022-01-03", "2022-01-31", "2022-02-01", "2022-02-02", "2022-02-03", "2022-02-04",
+        "2022-04-11", "2022-05-02", "2022-05-03", "2022-09-01", "2022-09-02",
+    ],
+    "2023": [
+        "2023-01-02", "2023-01-20", "2023-01-23", "2023-01-24", "2023-01-25", "2023-01-26",
+        "2023-05-01", "2023-05-02", "2023-05-03", "2023-09-01", "2023-09-04",
+    ],
+    "2024": [
+        "2024-01-01", "2024-02-08", "2024-02-09", "2024-02-12", "2024-02-13", "2024-02-14",
+        "2024-04-18", "2024-04-29", "2024-04-30", "2024-05-01", "2024-09-02", "2024-09-03",
+    ],
+    "2025": [
+        "2025-01-01", "2025-01-27", "2025-01-28", "2025-01-29", "2025-01-30", "2025-01-31",
+        "2025-04-07", "2025-04-30", "2025-05-01", "2025-05-02", "2025-09-01", "2025-09-02",
+    ],
+    "2026": [
+        "2026-01-01", "2026-02-16", "2026-02-17", "2026-02-18", "2026-02-19", "2026-02-20",
+        "2026-04-27", "2026-04-30", "2026-05-01", "2026-09-01", "2026-09-02",
+    ],
+}
+
+# New Year, Reunification Day, Labour Day, National Day
+FIXED_HOLIDAYS = ((1, 1), (4, 30), (5, 1), (9, 2))
+FIRST_YEAR, LAST_YEAR = 2000, 2040
+
+DateLike = Union[str, date, datetime, np.datetime64]
+
+
+def market_now() -> datetime:
+    """Current VN market wall time, naive like the stored bar times"""
+    return datetime.now(MARKET_TZ).replace(tzinfo=None)
+
+
+def load_holidays(path: Optional[str] = None) -> Dict[str, List[str]]:
+    """Holidays by year from a JSON file (``{"2027": ["2027-02-05", ...]}``) over the built-in ones"""
+    holidays = dict(DEFAULT_HOLIDAYS)
+    if path:
+        with open(path, encoding='utf-8') as f:
+            holidays.update({str(year): list(days) for year, days in json.load(f).items()})
+    return holidays
+
+
+def fixed_holidays(year: int) -> List[str]:
+    """Solar public holidays of a year, a weekend one observed on the next free weekday"""
+    days, taken = [], set()
+    for month, day in FIXED_HOLIDAYS:
+        observed = date(year, month, day)
+        while observed.weekday() >= 5 or observed in taken:
+            observed += timedelta(days=1)
+        taken.add(observed)
+        days.append(observed.isoformat())
+    return days
+
+
+def _days(values) -> np.ndarray:
+    """Dates (strings, dates or timestamps) as datetime64[D]"""
+    if isinstance(values, (str, date, np.datetime64)):
+        values = [values]
+    values = np.asarray(values)
+    if values.dtype.kind in 'UO':
+        # Text of the first ten characters, so timestamps parse as their date
+        values = values.astype('U10')
+    return values.astype('datetime64[D]')
+
+
+class TradingCalendar:
+    """Trading days of the Vietnamese exchanges with vectorised date <-> session lookup"""
+
+    # Session numbers count from here; any date works, it only fixes the offset
+    EPOCH = np.datetime64('2000-01-03')
+
+    def __init__(self, holidays: Dict[str, List[str]]):
+        listed = {int(year) for year in holidays}
+        days = [day for year_days in holidays.values() for day in year_days]
+        days += [day for year in range(FIRST_YEAR, LAST_YEAR + 1) if year not in listed
+                 for day in fixed_holidays(year)]
+        self.holidays = np.unique(np.array(days, dtype='datetime64[D]'))
+        self._calendar = np.busdaycalendar(weekmask='1111100', holidays=self.holidays)
+        # Sessions are known from the first year of the unbroken run of listed years
+        first = max(listed, default=LAST_YEAR + 1)
+        while first - 1 in listed:
+            first -= 1
+        self.known_from = np.datetime64(f"{first:04d}-01-01")
+
+    def is_session(self, day: DateLike) -> bool:
+        return bool(np.is_busday(_days(day), busdaycal=self._calendar)[0])
+
+    def index(self, days) -> np.ndarray:
+        """Session number of each date; a non-trading date gets the number of the next session"""
+        return np.busday_count(self.EPOCH, _days(days), busdaycal=self._calendar)
+
+    def session(self, numbers) -> List[str]:
+        """Dates (YYYY-MM-DD) of session numbers"""
+        origin = np.busday_offset(self.EPOCH, 0, roll='forward', busdaycal=self._calendar)
+        return np.busday_offset(origin, np.asarray(numbers), busdaycal=self._calendar).astype(str).tolist()
+
+    def sessions(self, start: DateLike, end: DateLike) -> List[str]:
+        """Trading days from ``start`` to ``end``, both inclusive"""
+        first, last = self.index(start)[0], self.index(_days(end) + 1)[0]
+        return self.session(np.arange(first, last)) if last > first else []
+
+    def count(self, start: DateLike, end: DateLike) -> int:
+        """Number of trading days from ``start`` to ``end``, both inclusive"""
+        return max(int(self.index(_days(end) + 1)[0] - self.index(start)[0]), 0)
+
+    def previous_session(self, day: Optional[DateLike] = None, inclusive: bool = True) -> str:
+        """Last trading day on (or, if not ``inclusive``, before) ``day``; today by default"""
+        day = _days(day or self.today())
+        result = np.busday_offset(day, 0, roll='backward', busdaycal=self._calendar) if inclusive else \
+            np.busday_offset(day, -1, roll='forward', busdaycal=self._calendar)
+        return str(result[0])
+
+    def next_session(self, day: Optional[DateLike] = None, inclusive: bool = True) -> str:
+        """First trading day on (or, if not ``inclusive``, after) ``day``; today by default"""
+        day = _days(day or self.today())
+        result = np.busday_offset(day, 0, roll='forward', busdaycal=self._calendar) if inclusive else \
+            np.busday_offset(day, 1, roll='backward', busdaycal=self._calendar)
+        return str(result[0])
+
+    def window_start(self, sessions: int, end: Optional[DateLike] = None) -> str:
+        """First day of the last ``sessions`` trading days up to ``end`` (today by default)"""
+        end = _days(end or self.today())
+        return str(np.busday_offset(end, -(max(sessions, 1) - 1), roll='backward', busdaycal=self._calendar)[0])
+
+    def missing_sessions(self, dates: Iterable[str], start: Optional[DateLike] = None,
+                         end: Optional[DateLike] = None) -> List[str]:
+        """Trading days in [start, end] (the span of ``dates`` by default) without a date in ``dates``.
+
+        Days before ``known_from`` are skipped: without that year's lunar
+        holidays a closure would be reported as a gap.
+        """
+        have = np.unique(_days(list(dates)))
+        if not len(have) and (start is None or end is None):
+            return []
+        first = max(self.index(start if start is not None else have[0])[0], self.index(self.known_from)[0])
+        last = self.index(_days(end if end is not None else have[-1]) + 1)[0]
+        seen = np.zeros(max(last - first, 0), dtype=bool)
+        rows = self.index(have[np.is_busday(have, busdaycal=self._calendar)]) - first
+        seen[rows[(rows >= 0) & (rows < len(seen))]] = True
+        return self.session(first + np.flatnonzero(~seen))
+
+    def align(self, dates: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+        """Row of each date on a grid of every trading day they span.
+
+        Returns the grid (YYYY-MM-DD) and the rows. Dates the calendar does not
+        know as trading days (an unlisted make-up session) get rows of their own
+        instead of colliding with a neighbour.
+        """
+        days = _days(dates)
+        if not len(days):
+            return [], np.empty(0, dtype=int)
+        first, last = days.min(), days.max()
+        grid = np.arange(first, last + 1, dtype='datetime64[D]')
+        grid = grid[np.is_busday(grid, busdaycal=self._calendar)]
+        extra = days[~np.is_busday(days, busdaycal=self._calendar)]
+        if len(extra):
+            grid = np.union1d(grid, extra)
+        return grid.astype(str).tolist(), np.searchsorted(grid, days)
+
+    def is_trading_time(self, now: Optional[datetime] = None) -> bool:
+        """Whether the market is in a continuous session at ``now`` (market time by default)"""
+        now = now.astimezone(MARKET_TZ) if now else datetime.now(MARKET_TZ)
+        if not self.is_session(now.date()):
+            return False
+        current = now.time()
+        return any(start <= current <= end for start, end in TRADING_SESSIONS)
+
+    def session_closed(self, day: DateLike, now: Optional[datetime] = None) -> bool:
+        """Whether the session of ``day`` has ended, so its bar is final"""
+        now = now.astimezone(MARKET_TZ) if now else datetime.now(MARKET_TZ)
+        day = _days(day)[0]
+        today = np.datetime64(now.date())
+        return bool(day < today or (day == today and now.time() >= TRADING_SESSIONS[-1][1]))
+
+    @staticmethod
+    def today() -> date:
+        return datetime.now(MARKET_TZ).date()
+
+
+trading_calendar = TradingCalendar(load_holidays(settings.TRADING_HOLIDAYS_FILE))
@@ -6,26 +6,45 @@ import logging
 import requests
 import feedparser
 from ..models import StockPrice, StockInfo, StockHistory, StockHistoryData, MarketIndex
+from ..config import settings
+from ..utils.cache import TTLCache
+from ..utils.resample import (
+    BAR_COLUMNS, INTRADAY_MINUTES, SUPPORTED_INTERVALS, can_derive, is_intraday, resample_bars
+)
+from .bar_store import bar_store
+from .database import db_service
+from .resilience import guarded_call, guarded_gather, with_request_budget
+from .trading_calendar import market_now, trading_calendar
 
 logger = logging.getLogger(__name__)
 
+# Trading sessions per history period (HOSE/HNX trade about 250 days a year)
+PERIOD_SESSIONS = {
+    "1D": 1, "1W": 5, "1M": 21, "3M": 63, "6M": 126, "1Y": 250, "2Y": 500, "5Y": 1250, "10Y": 2500
+}
+
 class VNStockService:
     def __init__(self):
         # Initialize vnstock components according to new API
         self.listing = Listing()
         # Default to VCI source as it's most comprehensive
         self.default_source = 'VCI'
+        # Quarterly ratios change rarely; cache them apart from the overview
+        self._ratio_cache = TTLCache(ttl_seconds=settings.RATIO_CACHE_TTL_SECONDS)
         
+    @with_request_budget
     def get_stock_price(self, symbol: str) -> Optional[StockPrice]:
         """Get current stock price using vnstock unified interface"""
         try:
             # Prioritize Quote history method as it's more reliable
             try:
-                end_date = datetime.now()
-                start_date = end_date - timedelta(days=7)  # Last week to ensure data
+                end_date = market_now()
+                # Enough sessions for the previous close even before today's open
+                start_date = datetime.strptime(trading_calendar.window_start(3), '%Y-%m-%d')
                 
                 quote = Quote(symbol=symbol, source=self.default_source)
-                hist_data = quote.history(
+                hist_data = guarded_call(
+                    'vnstock.quote', quote.history,
                     start=start_date.strftime('%Y-%m-%d'),
                     end=end_date.strftime('%Y-%m-%d'),
                     interval='1D'
@@ -54,7 +73,7 @@ class VNStockService:
                         low=float(latest['low']),
                         open=float(latest['open']),
                         close=float(latest['close']),
-                        trading_date=str(latest['time'])[:10] if 'time' in latest else datetime.now().strftime('%Y-%m-%d')
+                        trading_date=str(latest['time'])[:10] if 'time' in latest else market_now().strftime('%Y-%m-%d')
                     )
                     
             except Exception as e1:
@@ -63,7 +82,7 @@ class VNStockService:
                 # Fallback method: Try Trading.price_board
                 try:
                     trading = Trading(source=self.default_source)
-                    price_data = trading.price_board([symbol])
+                    price_data = guarded_call('vnstock.trading', trading.price_board, [symbol])
                     
                     if not price_data.empty and len(price_data) > 0:
                         data = price_data.iloc[0]
@@ -78,7 +97,7 @@ class VNStockService:
                             low=float(data.get('low', 0)),
                             open=float(data.get('open', 0)),
                             close=float(data.get('close', data.get('price', 0))),
-                            trading_date=str(data.get('trading_date', datetime.now().strftime('%Y-%m-%d')))
+                            trading_date=str(data.get('trading_date', market_now().strftime('%Y-%m-%d')))
                         )
                 except Exception as e2:
                     logger.error(f"Price board method also failed for {symbol}: {e2}")
@@ -90,13 +109,54 @@ class VNStockService:
             logger.error(f"Error getting stock price for {symbol}: {e}")
             return None
     
+    def get_price_board(self, symbols: List[str]) -> Dict[str, StockPrice]:
+        """Get current quotes for many symbols with one price board request"""
+        try:
+            trading = Trading(source=self.default_source)
+            board = guarded_call('vnstock.trading', trading.price_board, list(symbols))
+            
+            prices = {}
+            for symbol, data in self._price_board_rows(board).items():
+                close = float(self._board_value(data, 'close', 'price', 'match_price'))
+                prices[symbol] = StockPrice(
+                    symbol=symbol,
+                    price=close,
+                    change=float(self._board_value(data, 'change', 'price_change')),
+                    change_percent=float(self._board_value(data, 'change_percent', 'change_pc')),
+                    volume=int(self._board_value(data, 'volume', 'accumulated_volume')),
+                    high=float(self._board_value(data, 'high', 'highest')),
+                    low=float(self._board_value(data, 'low', 'lowest')),
+                    open=float(self._board_value(data, 'open', 'open_price')),
+                    close=close,
+                    trading_date=str(data.get('trading_date', market_now().strftime('%Y-%m-%d')))
+                )
+            return prices
+            
+        except Exception as e:
+            logger.error(f"Error getting price board for {len(symbols)} symbols: {e}")
+            return {}
+    
+    @with_request_budget
     def get_stock_info(self, symbol: str) -> Optional[StockInfo]:
         """Get stock company information using unified interface"""
         try:
-            # Get company profile/overview
+            # Get company profile/overview and financial ratios concurrently.
+            # Ratios only change quarterly, so they are usually served from cache.
             try:
-                company = Company(symbol=symbol, source=self.default_source)
-                profile = company.overview()
+                latest_ratio = self._ratio_cache.get(symbol)
+                
+                # Company() fetches its data on construction, so guard both steps
+                calls = [(
+                    'vnstock.company',
+                    lambda: Company(symbol=symbol, source=self.default_source).overview()
+                )]
+                if latest_ratio is None:
+                    calls.append(('vnstock.finance', lambda: self._fetch_latest_ratio(symbol)))
+                
+                results = guarded_gather(*calls)
+                profile = results[0]
+                if isinstance(profile, Exception):
+                    raise profile
                 
                 if profile.empty:
                     logger.warning(f"No company info found for symbol: {symbol}")
@@ -104,14 +164,13 @@ class VNStockService:
                 
                 data = profile.iloc[0]
                 
-                # Get financial ratios separately
-                try:
-                    finance = Finance(symbol=symbol, source=self.default_source)
-                    ratios = finance.ratio(period='quarter', lang='en', dropna=True)
-                    latest_ratio = ratios.iloc[0] if not ratios.empty else {}
-                except Exception as e:
-                    logger.warning(f"Could not get financial ratios for {symbol}: {e}")
-                    latest_ratio = {}
+                if latest_ratio is None:
+                    latest_ratio = results[1]
+                    if isinstance(latest_ratio, Exception):
+                        logger.warning(f"Could not get financial ratios for {symbol}: {latest_ratio}")
+                        latest_ratio = {}
+                    elif len(latest_ratio) > 0:
+                        self._ratio_cache.set(symbol, latest_ratio)
                 
                 return StockInfo(
                     symbol=symbol,
@@ -136,29 +195,46 @@ class VNStockService:
             logger.error(f"Error in get_stock_info for {symbol}: {e}")
             return None
     
-    def get_stock_history(self, symbol: str, period: str = "1Y") -> Optional[StockHistory]:
-        """Get historical stock data using unified interface"""
+    @with_request_budget
+    def get_company_events(self, symbol: str) -> Optional[pd.DataFrame]:
+        """Corporate events (dividends, share issues, meetings) as published by the data source"""
+        try:
+            # Company() fetches its data on construction, so guard it with the call
+            return guarded_call(
+                'vnstock.company', lambda: Company(symbol=symbol, source=self.default_source).events()
+            )
+        except Exception as e:
+            logger.error(f"Error getting company events for {symbol}: {e}")
+            return None
+    
+    def _fetch_latest_ratio(self, symbol: str):
+        """Fetch the most recent quarterly financial ratios row"""
+        finance = Finance(symbol=symbol, source=self.default_source)
+        ratios = finance.ratio(period='quarter', lang='en', dropna=True)
+        return ratios.iloc[0] if not ratios.empty else {}
+    
+    def get_stock_history(self, symbol: str, period: str = "1Y", use_store: bool = True) -> Optional[StockHistory]:
+        """Get historical stock data using unified interface.
+        
+        ``use_store=False`` always downloads the whole period, so syncs pick up
+        upstream corrections to bars already in the bar store.
+        """
         try:
             # Calculate start and end dates based on period
-            end_date = datetime.now()
+            end_date = market_now()
             
-            period_map = {
-                "1D": 1,
-                "1W": 7, 
-                "1M": 30,
-                "3M": 90,
-                "6M": 180,
-                "1Y": 365,
-                "2Y": 730,
-                "5Y": 1825
-            }
+            # Start of the period's last N sessions, so holidays never shorten the series
+            sessions = PERIOD_SESSIONS.get(period, PERIOD_SESSIONS["1Y"])
+            start_date = datetime.strptime(trading_calendar.window_start(sessions), '%Y-%m-%d')
             
-            days = period_map.get(period, 365)
-            start_date = end_date - timedelta(days=days)
+            stored = self._stored_history(symbol, start_date) if use_store else None
+            if stored is not None:
+                return stored
             
             # Use unified interface for historical data
             quote = Quote(symbol=symbol, source=self.default_source)
-            hist_data = quote.history(
+            hist_data = guarded_call(
+                'vnstock.quote', quote.history,
                 start=start_date.strftime('%Y-%m-%d'),
                 end=end_date.strftime('%Y-%m-%d'),
                 interval='1D'
@@ -200,79 +276,266 @@ class VNStockService:
             logger.error(f"Error getting stock history for {symbol}: {e}")
             return None
     
-    def get_market_indices(self) -> List[MarketIndex]:
-        """Get market indices data"""
+    def _stored_history(self, symbol: str, start: datetime) -> Optional[StockHistory]:
+        """Daily history from the local bar store when it reaches back to ``start``.
+        
+        Only bars after the last stored date are fetched, and they are written
+        back, so long periods are read from disk rather than re-downloaded. A
+        bar of a session still trading is served but not stored, so the store
+        never keeps an intraday close as final.
+        """
+        if not bar_store.enabled:
+            return None
+        coverage = bar_store.coverage(symbol)
+        if coverage is None or coverage[0] > trading_calendar.next_session(start):
+            return None
+        
+        last = datetime.strptime(coverage[1], '%Y-%m-%d')
+        live = []
+        # Only fetch when a session has traded since the last stored bar
+        if trading_calendar.previous_session() > coverage[1]:
+            try:
+                tail = self._fetch_bars(symbol, '1D', last + timedelta(days=1))
+                fetched = [
+                    {'date': t.strftime('%Y-%m-%d'), 'open': o, 'high': h, 'low': l, 'close': c,
+                     'volume': v, 'value': v * c}
+                    for t, o, h, l, c, v in zip(
+                        tail['time'], tail['open'], tail['high'], tail['low'], tail['close'], tail['volume']
+                    )
+                ]
+                bar_store.write(symbol, [bar for bar in fetched if trading_calendar.session_closed(bar['date'])])
+                live = [bar for bar in fetched if not trading_calendar.session_closed(bar['date'])]
+            except Exception as e:
+                logger.warning(f"Serving stored history for {symbol} without the latest bars: {e}")
+        
+        bars = bar_store.read(symbol, start=start.strftime('%Y-%m-%d'))
+        if bars is None or not len(bars):
+            return None
+        return StockHistory(
+            symbol=symbol,
+            data=[
+                StockHistoryData(
+                    date=d, open=float(o), high=float(h), low=float(l), close=float(c),
+                    volume=int(v), value=float(val)
+                )
+                for d, o, h, l, c, v, val in zip(
+                    bars.dates, bars['open'], bars['high'], bars['low'], bars['close'], bars['volume'], bars['value']
+                )
+            ] + [
+                StockHistoryData(
+                    date=bar['date'], open=float(bar['open']), high=float(bar['high']), low=float(bar['low']),
+                    close=float(bar['close']), volume=int(bar['volume']), value=float(bar['value'])
+                )
+                for bar in live
+            ]
+        )
+    
+    @with_request_budget
+    def get_stock_bars(self, symbol: str, interval: str = '1D', days: Optional[int] = None) -> Optional[StockHistory]:
+        """Get OHLCV bars at any supported interval.
+        
+        Intraday bars are fetched once at the finest useful granularity, stored
+        in StockIntraday and resampled on request; later requests for coarser
+        intervals reuse the stored bars and only fetch the missing tail.
+        """
+        if interval not in SUPPORTED_INTERVALS:
+            raise ValueError(f"Unsupported interval {interval}. Use one of {SUPPORTED_INTERVALS}")
         try:
-            indices_data = []
+            if days is None:
+                days = settings.INTRADAY_DEFAULT_DAYS if is_intraday(interval) else 365
+            start = market_now() - timedelta(days=days)
             
-            # Use Trading class to get indices data
-            trading = Trading(source=self.default_source)
+            # Finest stored granularity that can build the target and reaches back far enough
+            coverage = db_service.get_intraday_coverage(symbol)
+            source = next((
+                candidate for candidate in sorted(coverage, key=lambda i: INTRADAY_MINUTES.get(i, 0))
+                if candidate in INTRADAY_MINUTES and can_derive(candidate, interval)
+                and coverage[candidate][0] <= start + timedelta(days=1)
+            ), None)
+            if source is None and is_intraday(interval):
+                base = settings.INTRADAY_BASE_INTERVAL
+                source = base if can_derive(base, interval) else interval
             
-            # Try to get indices data
-            for index_symbol in ['VNINDEX', 'HNXINDEX', 'UPCOM']:
-                try:
-                    # Method 1: Try using price_board for indices
-                    index_data = trading.price_board([index_symbol])
-                    
-                    if not index_data.empty:
-                        data = index_data.iloc[0]
-                        indices_data.append(MarketIndex(
-                            index_name=index_symbol,
-                            index_value=float(data.get('close', data.get('price', 0))),
-                            change=float(data.get('change', 0)),
-                            change_percent=float(data.get('change_percent', data.get('change_pc', 0))),
-                            volume=int(data.get('volume', 0)),
-                            trading_date=str(data.get('trading_date', datetime.now().strftime('%Y-%m-%d')))
-                        ))
+            if source:
+                bars = self._load_intraday_bars(symbol, source, start, coverage.get(source))
+            else:
+                source = '1D'
+                bars = self._fetch_bars(symbol, '1D', start)
+            
+            if bars.empty:
+                logger.warning(f"No {interval} bars found for symbol: {symbol}")
+                return None
+            
+            if interval != source:
+                bars = resample_bars(bars, interval, source_interval=source)
+            
+            time_format = '%Y-%m-%d %H:%M:%S' if is_intraday(interval) else '%Y-%m-%d'
+            times = pd.to_datetime(bars['time']).dt.strftime(time_format)
+            return StockHistory(
+                symbol=symbol,
+                data=[
+                    StockHistoryData(
+                        date=t, open=float(o), high=float(h), low=float(l), close=float(c),
+                        volume=int(v), value=float(v) * float(c)
+                    )
+                    for t, o, h, l, c, v in zip(
+                        times, bars['open'], bars['high'], bars['low'], bars['close'], bars['volume']
+                    )
+                ]
+            )
+            
+        except Exception as e:
+            logger.error(f"Error getting {interval} bars for {symbol}: {e}")
+            return None
+    
+    def _load_intraday_bars(self, symbol: str, interval: str, start: datetime,
+                            coverage: Optional[tuple]) -> pd.DataFrame:
+        """Bring stored intraday bars up to date and return them from ``start``"""
+        fetch_from = start
+        if coverage and coverage[0] <= start + timedelta(days=1):
+            # Only the tail after the last stored bar is missing
+            fetch_from = coverage[1]
+        
+        fresh = pd.DataFrame(columns=BAR_COLUMNS)
+        if market_now() - fetch_from > timedelta(minutes=INTRADAY_MINUTES[interval]):
+            fresh = self._fetch_bars(symbol, interval, fetch_from)
+            if not fresh.empty:
+                db_service.insert_intraday_bars(symbol, interval, fresh.to_dict('records'))
+        
+        stored = db_service.get_intraday_bars(symbol, interval, start)
+        if stored.empty:
+            # Database unavailable: serve what was just fetched
+            return fresh[pd.to_datetime(fresh['time']) >= start] if not fresh.empty else fresh
+        return stored
+    
+    def _fetch_bars(self, symbol: str, interval: str, start: datetime) -> pd.DataFrame:
+        """Fetch bars from vnstock normalised to BAR_COLUMNS"""
+        quote = Quote(symbol=symbol, source=self.default_source)
+        hist_data = guarded_call(
+            'vnstock.quote', quote.history,
+            start=start.strftime('%Y-%m-%d'),
+            end=market_now().strftime('%Y-%m-%d'),
+            interval=interval
+        )
+        if hist_data is None or hist_data.empty:
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        
+        time_col = next((c for c in ('time', 'date', 'trading_date') if c in hist_data.columns), None)
+        bars = pd.DataFrame({
+            'time': pd.to_datetime(hist_data[time_col]).dt.to_pydatetime(),
+            'open': hist_data['open'].astype(float),
+            'high': hist_data['high'].astype(float),
+            'low': hist_data['low'].astype(float),
+            'close': hist_data['close'].astype(float),
+            'volume': hist_data['volume'].fillna(0).astype(int)
+        })
+        return bars
+    
+    @with_request_budget
+    def get_market_indices(self, indices: Optional[List[str]] = None) -> List[MarketIndex]:
+        """Get market indices data (defaults to settings.MARKET_INDICES)"""
+        try:
+            index_symbols = [s.strip().upper() for s in (indices or settings.MARKET_INDICES) if s.strip()]
+            indices_data: Dict[str, MarketIndex] = {}
+            
+            # Method 1: one batched price_board request for all indices
+            try:
+                trading = Trading(source=self.default_source)
+                board = guarded_call('vnstock.trading', trading.price_board, index_symbols)
+                for index_symbol, data in self._price_board_rows(board).items():
+                    if index_symbol not in index_symbols:
+                        continue
+                    indices_data[index_symbol] = MarketIndex(
+                        index_name=index_symbol,
+                        index_value=float(self._board_value(data, 'close', 'price', 'match_price')),
+                        change=float(self._board_value(data, 'change', 'price_change')),
+                        change_percent=float(self._board_value(data, 'change_percent', 'change_pc')),
+                        volume=int(self._board_value(data, 'volume', 'accumulated_volume')),
+                        trading_date=str(data.get('trading_date', market_now().strftime('%Y-%m-%d')))
+                    )
+            except Exception as e:
+                logger.warning(f"Price board failed for indices {index_symbols}: {e}")
+            
+            # Method 2: concurrent Quote fallback for indices missing from the board
+            missing = [s for s in index_symbols if s not in indices_data]
+            if missing:
+                histories = guarded_gather(*[
+                    ('vnstock.quote', lambda s=s: self._fetch_recent_history(s, sessions=2))
+                    for s in missing
+                ])
+                for index_symbol, hist_data in zip(missing, histories):
+                    if isinstance(hist_data, Exception):
+                        logger.error(f"Error getting index {index_symbol}: {hist_data}")
+                        continue
+                    if hist_data.empty:
                         continue
                     
-                    # Method 2: Fallback to Quote for indices
-                    quote = Quote(symbol=index_symbol, source=self.default_source)
-                    end_date = datetime.now()
-                    start_date = end_date - timedelta(days=2)
+                    latest = hist_data.iloc[-1]
                     
-                    hist_data = quote.history(
-                        start=start_date.strftime('%Y-%m-%d'),
-                        end=end_date.strftime('%Y-%m-%d'),
-                        interval='1D'
-                    )
+                    # Calculate change
+                    change = 0
+                    change_percent = 0
+                    if len(hist_data) > 1:
+                        prev_close = hist_data.iloc[-2]['close']
+                        current_close = latest['close']
+                        change = current_close - prev_close
+                        change_percent = (change / prev_close) * 100 if prev_close != 0 else 0
                     
-                    if not hist_data.empty:
-                        latest = hist_data.iloc[-1]
-                        
-                        # Calculate change
-                        change = 0
-                        change_percent = 0
-                        if len(hist_data) > 1:
-                            prev_close = hist_data.iloc[-2]['close']
-                            current_close = latest['close']
-                            change = current_close - prev_close
-                            change_percent = (change / prev_close) * 100 if prev_close != 0 else 0
-                        
-                        indices_data.append(MarketIndex(
-                            index_name=index_symbol,
-                            index_value=float(latest['close']),
-                            change=float(change),
-                            change_percent=float(change_percent),
-                            volume=int(latest.get('volume', 0)),
-                            trading_date=str(latest.get('time', datetime.now().strftime('%Y-%m-%d')))[:10]
-                        ))
-                        
-                except Exception as e:
-                    logger.error(f"Error getting index {index_symbol}: {e}")
-                    continue
+                    indices_data[index_symbol] = MarketIndex(
+                        index_name=index_symbol,
+                        index_value=float(latest['close']),
+                        change=float(change),
+                        change_percent=float(change_percent),
+                        volume=int(latest.get('volume', 0)),
+                        trading_date=str(latest.get('time', market_now().strftime('%Y-%m-%d')))[:10]
+                    )
             
-            return indices_data
+            # Keep the requested order
+            return [indices_data[s] for s in index_symbols if s in indices_data]
             
         except Exception as e:
             logger.error(f"Error getting market indices: {e}")
             return []
     
+    def _fetch_recent_history(self, symbol: str, sessions: int) -> pd.DataFrame:
+        """Fetch daily bars of the last few sessions (unguarded; callers guard it)"""
+        end_date = market_now()
+        start_date = datetime.strptime(trading_calendar.window_start(sessions), '%Y-%m-%d')
+        quote = Quote(symbol=symbol, source=self.default_source)
+        return quote.history(
+            start=start_date.strftime('%Y-%m-%d'),
+            end=end_date.strftime('%Y-%m-%d'),
+            interval='1D'
+        )
+    
+    @staticmethod
+    def _price_board_rows(board: pd.DataFrame) -> Dict[str, pd.Series]:
+        """Index price board rows by symbol, flattening multi-level columns"""
+        if board is None or board.empty:
+            return {}
+        if isinstance(board.columns, pd.MultiIndex):
+            board = board.copy()
+            board.columns = [col[-1] for col in board.columns]
+            board = board.loc[:, ~board.columns.duplicated()]
+        symbol_col = next((c for c in ('symbol', 'ticker', 'code') if c in board.columns), None)
+        if symbol_col is None:
+            return {}
+        return {str(row[symbol_col]).upper(): row for _, row in board.iterrows()}
+    
+    @staticmethod
+    def _board_value(row: pd.Series, *keys: str, default: float = 0) -> Any:
+        """First non-null value among alternative price board column names"""
+        for key in keys:
+            value = row.get(key)
+            if value is not None and not pd.isna(value):
+                return value
+        return default
+    
     def search_stocks(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Search for stocks by company name or symbol using new listing API"""
         try:
             # Use Listing class to get all symbols
-            all_symbols = self.listing.all_symbols()
+            all_symbols = guarded_call('vnstock.listing', self.listing.all_symbols)
             
             if all_symbols.empty:
                 logger.warning("No symbols data available")
@@ -323,7 +586,7 @@ class VNStockService:
     def get_all_symbols(self) -> List[str]:
         """Get list of all available stock symbols"""
         try:
-            all_symbols = self.listing.all_symbols()
+            all_symbols = guarded_call('vnstock.listing', self.listing.all_symbols)
             if not all_symbols.empty:
                 # Handle different column names
                 symbol_col = 'symbol' if 'symbol' in all_symbols.columns else 'ticker'
@@ -338,7 +601,7 @@ class VNStockService:
         """Health check to verify vnstock is working"""
         try:
             # Try to get a simple listing to verify API works
-            symbols = self.listing.all_symbols()
+            symbols = guarded_call('vnstock.listing', self.listing.all_symbols)
             symbol_count = len(symbols) if not symbols.empty else 0
             
             return {
@@ -0,0 +1,51 @@
+"""
+Corporate-action price adjustment factors.
+
+An event with ex-date d changes the price level from d on, so every bar
+before d is multiplied by the event's factor to make the series continuous.
+The exchanges' reference-price rule gives
+
+    P_ref = (P_prev - cash + rights_ratio * rights_price) / (1 + share_ratio + rights_ratio)
+
+and the price factor is P_ref / P_prev, with P_prev the last close before the
+ex-date. Volumes before d are scaled by 1 + share_ratio + rights_ratio so
+share counts stay comparable. The factors of all events compound backwards
+into one vector per series, so adjusting is a single multiplication.
+"""
+from typing import Tuple
+
+import numpy as np
+
+
+def event_factors(prev_close: np.ndarray, cash: np.ndarray, share_ratio: np.ndarray,
+                  rights_ratio: np.ndarray, rights_price: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Price and volume factors of each event; amounts in the same unit as prices, NaN treated as 0"""
+    cash, share_ratio, rights_ratio, rights_price = (
+        np.nan_to_num(np.asarray(values, dtype=float)) for values in (cash, share_ratio, rights_ratio, rights_price)
+    )
+    shares = 1 + share_ratio + rights_ratio
+    with np.errstate(divide='ignore', invalid='ignore'):
+        price = (prev_close - cash + rights_ratio * rights_price) / (shares * prev_close)
+    # A bad event (unknown close, dividend above the price) must not distort the series
+    price = np.where(np.isfinite(price) & (price > 0), price, 1.0)
+    return price, shares
+
+
+def cumulative_factors(dates: np.ndarray, ex_dates: np.ndarray, factors: np.ndarray) -> np.ndarray:
+    """Per-bar product of the factors of all events after that bar.
+
+    ``dates`` must be sorted; events on or before the first bar or after the
+    last one change nothing.
+    """
+    rows = np.searchsorted(dates, ex_dates, side='left')
+    inside = (rows > 0) & (rows < len(dates)) if len(dates) else np.zeros(len(rows), dtype=bool)
+    per_row = np.ones(len(dates) + 1)
+    np.multiply.at(per_row, rows[inside], np.asarray(factors, dtype=float)[inside])
+    return np.cumprod(per_row[::-1])[::-1][1:]
+
+
+def previous_closes(dates: np.ndarray, closes: np.ndarray, ex_dates: np.ndarray) -> np.ndarray:
+    """Close of the last bar before each ex-date; NaN if there is none"""
+    rows = np.searchsorted(dates, ex_dates, side='left')
+    return np.where(rows > 0, closes[np.maximum(rows - 1, 0)], np.nan) if len(closes) else \
+        np.full(len(ex_dates), np.nan)
@@ -0,0 +1,302 @@
+"""
+Small boolean expression language for the stock screener.
+
+    pe < 12 and roe > 15 and (rsi14 < 30 or close > 1.05 * sma200)
+    exchange == 'HOSE' and not sector == 'Ngân hàng'
+
+Expressions are parsed into a tree of tuples once and then either rendered as
+a parameterised SQL predicate (when every field maps to a column) or
+evaluated with NumPy over aligned arrays. Both follow SQL's three-valued
+logic, so a missing value makes a comparison unknown rather than false and a
+row is selected only when the whole expression is true either way.
+"""
+import operator
+import re
+from typing import Callable, Dict, List, Set, Tuple
+
+import numpy as np
+
+# Node kinds: ('num', value), ('str', value), ('field', name), ('arith', op, left, right),
+# ('neg', operand), ('cmp', op, left, right), ('and', [items]), ('or', [items]), ('not', item)
+Node = tuple
+
+TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<num>\d+(?:\.\d*)?|\.\d+)
+      | (?P<str>'[^']*'|"[^"]*")
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<op><=|>=|==|!=|<|>|=|[-+*/()])
+    )""", re.VERBOSE)
+
+KEYWORDS = {'and', 'or', 'not'}
+COMPARISONS = {'<', '<=', '>', '>=', '==', '!=', '='}
+
+ARITHMETIC: Dict[str, Callable] = {'+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.truediv}
+COMPARE: Dict[str, Callable] = {
+    '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge, '==': operator.eq, '!=': operator.ne
+}
+
+
+class ExpressionError(ValueError):
+    """Malformed expression or unknown field"""
+
+
+def _tokenize(text: str) -> List[Tuple[str, str, int]]:
+    tokens, position = [], 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        if not match or match.end() == position:
+            raise ExpressionError(f"Unexpected character at position {position}: {text[position]!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        start = match.start(kind)
+        if kind == 'name' and value.lower() in KEYWORDS:
+            kind, value = 'kw', value.lower()
+        tokens.append((kind, value, start))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive descent: or > and > not > comparison > sum > product > unary > atom"""
+
+    def __init__(self, text: str):
+        self.tokens = _tokenize(text)
+        self.index = 0
+
+    def peek(self, *values: str) -> bool:
+        return self.index < len(self.tokens) and self.tokens[self.index][1] in values
+
+    def take(self) -> Tuple[str, str, int]:
+        if self.index >= len(self.tokens):
+            raise ExpressionError("Unexpected end of expression")
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def expect(self, value: str):
+        kind, found, position = self.take()
+        if found != value:
+            raise ExpressionError(f"Expected {value!r} at position {position}, found {found!r}")
+
+    def parse(self) -> Node:
+        node = self.disjunction()
+        if self.index < len(self.tokens):
+            _, value, position = self.tokens[self.index]
+            raise ExpressionError(f"Unexpected {value!r} at position {position}")
+        return node
+
+    def disjunction(self) -> Node:
+        items = [self.conjunction()]
+        while self.peek('or'):
+            self.take()
+            items.append(self.conjunction())
+        return items[0] if len(items) == 1 else ('or', items)
+
+    def conjunction(self) -> Node:
+        items = [self.negation()]
+        while self.peek('and'):
+            self.take()
+            items.append(self.negation())
+        return items[0] if len(items) == 1 else ('and', items)
+
+    def negation(self) -> Node:
+        if self.peek('not'):
+            self.take()
+            return ('not', self.negation())
+        return self.comparison()
+
+    def comparison(self) -> Node:
+        left = self.sum()
+        if not self.peek(*COMPARISONS):
+            # A bare value; check() rejects it where a condition is needed
+            return left
+        op = self.take()[1]
+        return ('cmp', '==' if op == '=' else op, left, self.sum())
+
+    def sum(self) -> Node:
+        node = self.product()
+        while self.peek('+', '-'):
+            node = ('arith', self.take()[1], node, self.product())
+        return node
+
+    def product(self) -> Node:
+        node = self.unary()
+        while self.peek('*', '/'):
+            node = ('arith', self.take()[1], node, self.unary())
+        return node
+
+    def unary(self) -> Node:
+        if self.peek('-'):
+            self.take()
+            return ('neg', self.unary())
+        return self.atom()
+
+    def atom(self) -> Node:
+        kind, value, position = self.take()
+        if value == '(':
+            node = self.disjunction()
+            self.expect(')')
+            return node
+        if kind == 'num':
+            return ('num', float(value))
+        if kind == 'str':
+            return ('str', value[1:-1])
+        if kind == 'name':
+            return ('field', value.lower())
+        raise ExpressionError(f"Unexpected {value!r} at position {position}")
+
+
+def parse(text: str) -> Node:
+    """Parse a screener expression or value; raises ExpressionError (see check() for types)"""
+    return _Parser(text).parse()
+
+
+def parse_value(text: str) -> Node:
+    """Parse an arithmetic expression (e.g. a sort key) without comparisons"""
+    node = parse(text)
+    if node[0] in ('cmp', 'and', 'or', 'not'):
+        raise ExpressionError("Expected a value expression, not a condition")
+    return node
+
+
+def fields(node: Node) -> Set[str]:
+    """Names of all fields referenced by an expression"""
+    kind = node[0]
+    if kind == 'field':
+        return {node[1]}
+    if kind in ('and', 'or'):
+        return set().union(*(fields(item) for item in node[1]))
+    if kind in ('not', 'neg'):
+        return fields(node[1])
+    if kind in ('arith', 'cmp'):
+        return fields(node[2]) | fields(node[3])
+    return set()
+
+
+def check(node: Node, text_fields: Set[str]) -> str:
+    """Type of an expression ('bool', 'number' or 'text'); raises ExpressionError on a mismatch.
+
+    Text (string literals and ``text_fields``) only supports == and != against text.
+    """
+    kind = node[0]
+    if kind == 'num':
+        return 'number'
+    if kind == 'str':
+        return 'text'
+    if kind == 'field':
+        return 'text' if node[1] in text_fields else 'number'
+    if kind in ('and', 'or', 'not'):
+        for item in (node[1] if kind != 'not' else [node[1]]):
+            if check(item, text_fields) != 'bool':
+                raise ExpressionError(f"'{kind}' needs conditions, got {unparse(item)!r}")
+        return 'bool'
+    operands = [node[1]] if kind == 'neg' else [node[2], node[3]]
+    types = [check(item, text_fields) for item in operands]
+    if 'bool' in types:
+        raise ExpressionError(f"Cannot use a condition as a value in {unparse(node)!r}")
+    if kind == 'cmp':
+        if 'text' in types and (types[0] != types[1] or node[1] not in ('==', '!=')):
+            raise ExpressionError(f"Text can only be compared with == or != against text: {unparse(node)!r}")
+        return 'bool'
+    if 'text' in types:
+        raise ExpressionError(f"Arithmetic on text in {unparse(node)!r}")
+    return 'number'
+
+
+def conjuncts(node: Node) -> List[Node]:
+    """Top-level AND terms; each can be pushed down or evaluated on its own"""
+    return list(node[1]) if node[0] == 'and' else [node]
+
+
+def unparse(node: Node) -> str:
+    kind = node[0]
+    if kind == 'num':
+        return f"{node[1]:g}"
+    if kind == 'str':
+        return repr(node[1])
+    if kind == 'field':
+        return node[1]
+    if kind == 'neg':
+        return f"-{unparse(node[1])}"
+    if kind == 'not':
+        return f"not ({unparse(node[1])})"
+    if kind in ('and', 'or'):
+        return f" {kind} ".join(f"({unparse(item)})" if item[0] in ('and', 'or') else unparse(item)
+                                for item in node[1])
+    return f"({unparse(node[2])} {node[1]} {unparse(node[3])})" if kind == 'arith' else \
+        f"{unparse(node[2])} {node[1]} {unparse(node[3])}"
+
+
+def to_sql(node: Node, columns: Dict[str, str], params: Dict[str, object]) -> str:
+    """SQL predicate for an expression whose fields are all in ``columns``; values go into ``params``"""
+    kind = node[0]
+    if kind in ('num', 'str'):
+        name = f"p{len(params)}"
+        params[name] = node[1]
+        return f"%({name})s"
+    if kind == 'field':
+        return columns[node[1]]
+    if kind == 'neg':
+        return f"(-{to_sql(node[1], columns, params)})"
+    if kind == 'not':
+        return f"(NOT {to_sql(node[1], columns, params)})"
+    if kind in ('and', 'or'):
+        return '(' + f" {kind.upper()} ".join(to_sql(item, columns, params) for item in node[1]) + ')'
+    left, right = to_sql(node[2], columns, params), to_sql(node[3], columns, params)
+    if kind == 'arith' and node[1] == '/':
+        # Division by zero is unknown, as NaN is in NumPy
+        return f"({left} / NULLIF({right}, 0))"
+    op = '<>' if node[1] == '!=' else '=' if node[1] == '==' else node[1]
+    return f"({left} {op} {right})"
+
+
+def _truth(mask: np.ndarray, known: np.ndarray) -> np.ndarray:
+    """Three-valued truth as float: 1 true, 0 false, NaN unknown"""
+    return np.where(known, mask.astype(float), np.nan)
+
+
+def _known(values: np.ndarray) -> np.ndarray:
+    if values.dtype == object:
+        return np.array([v is not None and v == v for v in values], dtype=bool)
+    return ~np.isnan(values)
+
+
+def evaluate(node: Node, resolve: Callable[[str], np.ndarray], size: int) -> np.ndarray:
+    """Evaluate over aligned arrays of length ``size``.
+
+    Conditions return three-valued truth arrays (1.0, 0.0 or NaN); value
+    expressions return float arrays (or object arrays for text fields).
+    """
+    kind = node[0]
+    if kind == 'num':
+        return np.full(size, node[1])
+    if kind == 'str':
+        return np.full(size, node[1], dtype=object)
+    if kind == 'field':
+        return resolve(node[1])
+    if kind == 'neg':
+        return -evaluate(node[1], resolve, size)
+    if kind == 'arith':
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = ARITHMETIC[node[1]](evaluate(node[2], resolve, size), evaluate(node[3], resolve, size))
+        return np.where(np.isinf(result), np.nan, result)
+    if kind == 'cmp':
+        left, right = evaluate(node[2], resolve, size), evaluate(node[3], resolve, size)
+        known = _known(left) & _known(right)
+        if left.dtype == object or right.dtype == object:
+            mask = np.array([bool(COMPARE[node[1]](a, b)) if k else False
+                             for a, b, k in zip(left, right, known)], dtype=bool)
+        else:
+            with np.errstate(invalid='ignore'):
+                mask = COMPARE[node[1]](left, right)
+        return _truth(mask, known)
+    if kind == 'not':
+        return 1 - evaluate(node[1], resolve, size)
+    values = [evaluate(item, resolve, size) for item in node[1]]
+    stacked = np.vstack(values)
+    if kind == 'and':
+        # False wins over unknown, unknown over true
+        return np.where((stacked == 0).any(axis=0), 0.0, np.where(np.isnan(stacked).any(axis=0), np.nan, 1.0))
+    return np.where((stacked == 1).any(axis=0), 1.0, np.where(np.isnan(stacked).any(axis=0), np.nan, 0.0))
@@ -0,0 +1,68 @@
+"""
+Technical indicators across many symbols at once.
+
+Inputs are (dates x symbols) arrays with NaN before a symbol's first bar;
+each function returns the indicator's latest value per symbol, NaN where the
+symbol has too little history. Recursive indicators (EMA, RSI) step through
+the dates once with every symbol updated in the same vector operation.
+"""
+import numpy as np
+
+
+def _last_window(values: np.ndarray, length: int) -> np.ndarray:
+    if length < 1 or len(values) < length:
+        return np.full((1, values.shape[1]), np.nan)
+    return values[-length:]
+
+
+def sma(values: np.ndarray, length: int) -> np.ndarray:
+    """Mean of the last ``length`` values"""
+    return _last_window(values, length).mean(axis=0)
+
+
+def highest(values: np.ndarray, length: int) -> np.ndarray:
+    return _last_window(values, length).max(axis=0)
+
+
+def lowest(values: np.ndarray, length: int) -> np.ndarray:
+    return _last_window(values, length).min(axis=0)
+
+
+def change_percent(values: np.ndarray, length: int) -> np.ndarray:
+    """Percent change over the last ``length`` bars"""
+    window = _last_window(values, length + 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = (window[-1] / window[0] - 1) * 100
+    return np.where(np.isfinite(result), result, np.nan)
+
+
+def _smoothed(values: np.ndarray, length: int, alpha: float) -> np.ndarray:
+    """Exponential smoothing seeded with the mean of each symbol's first ``length`` values"""
+    result = np.full(values.shape[1], np.nan)
+    seen = np.zeros(values.shape[1], dtype=int)
+    for row in values:
+        valid = ~np.isnan(row)
+        seen += valid
+        seeding = valid & (seen <= length)
+        result = np.where(seeding & (seen == 1), row, result)
+        result = np.where(seeding & (seen > 1), result + (row - result) / seen, result)
+        result = np.where(valid & (seen > length), result + alpha * (row - result), result)
+    return np.where(seen >= length, result, np.nan)
+
+
+def ema(values: np.ndarray, length: int) -> np.ndarray:
+    return _smoothed(values, length, 2 / (length + 1))
+
+
+def rsi(close: np.ndarray, length: int = 14) -> np.ndarray:
+    """Wilder's relative strength index"""
+    deltas = np.diff(close, axis=0)
+    average_gain = _smoothed(np.where(deltas > 0, deltas, np.where(np.isnan(deltas), np.nan, 0.0)),
+                             length, 1 / length)
+    average_loss = _smoothed(np.where(deltas < 0, -deltas, np.where(np.isnan(deltas), np.nan, 0.0)),
+                             length, 1 / length)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = 100 - 100 / (1 + average_gain / average_loss)
+    # No losses: 100 if the price rose, 50 if it never moved
+    flat = average_loss == 0
+    return np.where(flat, np.where(average_gain > 0, 100.0, 50.0), result)
@@ -0,0 +1,111 @@
+"""
+Multi-pattern keyword matching for news classification.
+
+Every keyword list is compiled into one trie-shaped regex wrapped in a
+lookahead, so a single scan over the text finds the longest keyword starting
+at each position. Keywords contained in a matched keyword are credited too,
+which keeps the result identical to running ``keyword in text`` per keyword.
+
+Small dictionaries are cheaper to check with per-keyword substring scans
+(C-level ``in``) than with the regex. Below SCAN_THRESHOLD keywords, roughly
+where the two cross over in tests/scripts/benchmark_keywords.py, the
+matcher scans instead.
+"""
+import json
+import re
+from typing import Dict, List, Optional, Set
+
+SCAN_THRESHOLD = 80
+
+# Built-in dictionaries; override with a JSON file of the same shape
+DEFAULT_KEYWORDS: Dict[str, Dict[str, List[str]]] = {
+    "sentiment": {
+        "positive": [
+            'tăng', 'tích cực', 'khả quan', 'thành công', 'phát triển', 'lợi nhuận',
+            'tăng trưởng', 'cải thiện', 'ký kết', 'hợp tác', 'đầu tư', 'mở rộng',
+            'thuận lợi', 'hiệu quả', 'ưu việt', 'bứt phá', 'đột phá'
+        ],
+        "negative": [
+            'giảm', 'sụt', 'rớt', 'mất', 'thiệt hại', 'khó khăn', 'thách thức',
+            'suy thoái', 'lỗ', 'âm', 'giảm sút', 'cạnh tranh', 'rủi ro',
+            'bất ổn', 'lo ngại', 'căng thẳng', 'suy yếu', 'khủng hoảng'
+        ]
+    },
+    # Checked in order; the first category with a hit wins
+    "categories": {
+        "stocks": ['cổ phiếu', 'mã', 'ticker', 'niêm yết'],
+        "market": ['thị trường', 'chỉ số', 'vnindex', 'hnx', 'upcom'],
+        "analysis": ['phân tích', 'dự báo', 'khuyến nghị', 'đánh giá'],
+        "corporate": ['doanh nghiệp', 'công ty', 'cổ đông', 'ban điều hành'],
+        "economy": ['kinh tế', 'gdp', 'lạm phát', 'lãi suất', 'ngân hàng']
+    }
+}
+
+
+def load_keyword_dictionaries(path: Optional[str] = None) -> Dict[str, Dict[str, List[str]]]:
+    """Read keyword dictionaries from a JSON file, or return the built-in ones"""
+    if not path:
+        return DEFAULT_KEYWORDS
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return {
+        "sentiment": data.get("sentiment", DEFAULT_KEYWORDS["sentiment"]),
+        "categories": data.get("categories", DEFAULT_KEYWORDS["categories"])
+    }
+
+
+def _trie_pattern(words: List[str]) -> str:
+    """Regex alternation factored by shared prefixes, longest match first"""
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict) -> str:
+        end = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if end else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Counts distinct keyword hits per group in one pass over the text"""
+
+    def __init__(self, groups: Dict[str, List[str]], scan_threshold: int = SCAN_THRESHOLD):
+        self.groups = {name: [w.lower() for w in words if w] for name, words in groups.items()}
+        keywords = sorted({w for words in self.groups.values() for w in words})
+        self._keywords = keywords
+        self._group_of: Dict[str, Set[str]] = {}
+        for name, words in self.groups.items():
+            for word in words:
+                self._group_of.setdefault(word, set()).add(name)
+        # Keywords credited when a given keyword is matched (itself plus any it contains)
+        self._contained: Dict[str, List[str]] = {
+            word: [other for other in keywords if other in word] for word in keywords
+        }
+        compiled = keywords and len(keywords) >= scan_threshold
+        self._pattern = re.compile(f'(?=({_trie_pattern(keywords)}))') if compiled else None
+
+    def matches(self, text: str) -> Set[str]:
+        """Every keyword that occurs in ``text`` (case-insensitive)"""
+        text = text.lower()
+        if self._pattern is None:
+            return {word for word in self._keywords if word in text}
+        found: Set[str] = set()
+        for word in set(self._pattern.findall(text)):
+            found.update(self._contained[word])
+        return found
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Number of distinct keywords found per group"""
+        counts = {name: 0 for name in self.groups}
+        for word in self.matches(text):
+            for name in self._group_of[word]:
+                counts[name] += 1
+        return counts
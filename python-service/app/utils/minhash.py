@@ -0,0 +1,59 @@
+"""
+MinHash signatures and LSH banding for near-duplicate text detection.
+
+Text is folded (see text_search.fold) and split into word shingles; a
+signature is the minimum of ``num_perm`` universal hashes over the shingle
+hashes, so the fraction of equal signature slots estimates Jaccard
+similarity. Banding the signature gives the buckets used to find candidate
+pairs without comparing every document with every other.
+"""
+import zlib
+from typing import List, Optional, Set
+
+import numpy as np
+
+from .text_search import tokenize
+
+# Largest prime below 2**32; multipliers stay below 2**31 so a * h + b fits in uint64
+HASH_PRIME = 4294967291
+MAX_MULTIPLIER = 1 << 31
+
+
+def shingles(text: str, size: int = 2) -> Set[str]:
+    """Word n-grams of the folded text; short texts fall back to their tokens"""
+    tokens = tokenize(text)
+    if len(tokens) < size:
+        return set(tokens)
+    return {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+class MinHasher:
+    """Fixed family of ``num_perm`` hash permutations, split into ``bands`` for LSH"""
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, shingle_size: int = 2, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, MAX_MULTIPLIER, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, HASH_PRIME, size=(num_perm, 1), dtype=np.uint64)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """uint32 signature; None when the text has no tokens"""
+        grams = shingles(text, self.shingle_size)
+        if not grams:
+            return None
+        hashes = np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64, count=len(grams))
+        return ((self._a * hashes + self._b) % HASH_PRIME).min(axis=1).astype(np.uint32)
+
+    def band_keys(self, signature: np.ndarray) -> List[bytes]:
+        """One bucket key per band; documents sharing any key are candidate duplicates"""
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    @staticmethod
+    def similarity(left: np.ndarray, right: np.ndarray) -> float:
+        """Estimated Jaccard similarity of the documents behind two signatures"""
+        return float(np.count_nonzero(left == right)) / len(left)
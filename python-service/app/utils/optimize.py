@@ -0,0 +1,145 @@
+"""
+Portfolio weight optimisers in plain NumPy.
+
+Mean-variance problems (maximise mu'w - gamma/2 w'Sigma w subject to
+sum(w) = 1 and lo <= w <= hi) are solved with a primal-dual interior-point
+method. Each iteration works on the stacked (K x N x N) systems of a batch of
+risk aversions at once, so a whole efficient frontier costs little more than
+a single solve, and convergence does not depend on how ill-conditioned the
+covariance is. Risk parity uses Newton's method on the convex log-barrier
+formulation of equal risk contributions.
+"""
+from typing import Tuple
+
+import numpy as np
+
+MAX_ITERATIONS = 100
+TOLERANCE = 1e-10
+STEP_FRACTION = 0.995
+
+
+def check_bounds(n_assets: int, lo: float, hi: float):
+    if n_assets == 0 or lo > hi or n_assets * lo > 1 + 1e-12 or n_assets * hi < 1 - 1e-12:
+        raise ValueError(f"Weight bounds [{lo}, {hi}] cannot sum to 1 over {n_assets} assets")
+
+
+def _max_step(x: np.ndarray, dx: np.ndarray) -> np.ndarray:
+    """Per-row step length keeping ``x + step * dx`` strictly positive"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = np.where(dx < 0, -x / dx, np.inf)
+    return np.minimum(1.0, STEP_FRACTION * ratios.min(axis=1))
+
+
+def mean_variance_weights(mu: np.ndarray, cov: np.ndarray, risk_aversion, lo: float = 0.0,
+                          hi: float = 1.0) -> np.ndarray:
+    """Optimal weights for each risk aversion (one row per value); mu = 0 gives minimum variance.
+
+    Mehrotra predictor-corrector on the KKT conditions of
+    min gamma/2 w'Sigma w - mu'w  s.t.  sum(w) = 1, lo <= w <= hi,
+    with duals z (lower bounds), v (upper bounds) and y (budget). Rows
+    leave the batch as they converge, typically after 10-20 iterations.
+    """
+    n = len(mu)
+    check_bounds(n, lo, hi)
+    gammas = np.atleast_1d(np.asarray(risk_aversion, dtype=float))
+    k = len(gammas)
+    weights = np.full((k, n), 1 / n)
+    if n * lo > 1 - 1e-12 or n * hi < 1 + 1e-12:
+        # Bounds leave a single feasible point
+        return weights
+
+    lower_dual, upper_dual, budget_dual = np.ones((k, n)), np.ones((k, n)), np.zeros(k)
+    diagonal = np.arange(n)
+    active = np.arange(k)
+    for _ in range(MAX_ITERATIONS):
+        gamma, w = gammas[active], weights[active]
+        z, v, y = lower_dual[active], upper_dual[active], budget_dual[active]
+        s, u = w - lo, hi - w
+        residual = gamma[:, None] * (w @ cov) - mu - y[:, None] - z + v
+        gap = ((s * z).sum(axis=1) + (u * v).sum(axis=1)) / (2 * n)
+        running = (gap >= TOLERANCE) | (np.abs(residual).max(axis=1) >= TOLERANCE)
+        if not running.all():
+            active = active[running]
+            if not len(active):
+                break
+            gamma, w, z, v, y = gamma[running], w[running], z[running], v[running], y[running]
+            s, u, residual, gap = s[running], u[running], residual[running], gap[running]
+
+        # Reduced Newton system (gamma Sigma + Z/S + V/U) dw = rhs + dy 1 with sum(dw) = 0;
+        # one inverse serves both the predictor and the corrector
+        hessian = gamma[:, None, None] * cov
+        hessian[:, diagonal, diagonal] += z / s + v / u
+        inverse = np.linalg.inv(hessian)
+        h_ones = inverse.sum(axis=2)
+
+        def direction(lower_target, upper_target):
+            rhs = -residual + (lower_target - s * z) / s - (upper_target - u * v) / u
+            h_rhs = (inverse @ rhs[..., None])[..., 0]
+            dy = -h_rhs.sum(axis=1) / h_ones.sum(axis=1)
+            dw = h_rhs + dy[:, None] * h_ones
+            return dw, dy, (lower_target - s * z - z * dw) / s, (upper_target - u * v + v * dw) / u
+
+        # Predictor: pure Newton step towards zero complementarity
+        dw, dy, dz, dv = direction(0.0, 0.0)
+        primal = np.minimum(_max_step(s, dw), _max_step(u, -dw))
+        dual = np.minimum(_max_step(z, dz), _max_step(v, dv))
+        predicted_gap = (((s + primal[:, None] * dw) * (z + dual[:, None] * dz)).sum(axis=1)
+                         + ((u - primal[:, None] * dw) * (v + dual[:, None] * dv)).sum(axis=1)) / (2 * n)
+
+        # Corrector: centre with sigma = (predicted / current)^3 and the second-order term
+        target = ((predicted_gap / gap) ** 3 * gap)[:, None]
+        dw, dy, dz, dv = direction(target - dw * dz, target + dw * dv)
+        primal = np.minimum(_max_step(s, dw), _max_step(u, -dw))
+        dual = np.minimum(_max_step(z, dz), _max_step(v, dv))
+
+        weights[active] = w + primal[:, None] * dw
+        budget_dual[active] = y + dual * dy
+        lower_dual[active] = z + dual[:, None] * dz
+        upper_dual[active] = v + dual[:, None] * dv
+    return weights
+
+
+def min_variance_weights(cov: np.ndarray, lo: float = 0.0, hi: float = 1.0) -> np.ndarray:
+    return mean_variance_weights(np.zeros(len(cov)), cov, 1.0, lo, hi)[0]
+
+
+def risk_parity_weights(cov: np.ndarray, max_iterations: int = 100, tol: float = 1e-12) -> np.ndarray:
+    """Long-only weights with equal risk contributions.
+
+    Minimises 1/2 y'Sigma y - sum(log y) / n over y > 0; at the optimum
+    y_i (Sigma y)_i is the same for every asset, so y / sum(y) is risk parity.
+    """
+    n = len(cov)
+    variances = np.diag(cov)
+    if not np.all(variances > 0):
+        raise ValueError("Risk parity needs every asset to have positive variance")
+    budget = np.full(n, 1 / n)
+    y = 1 / np.sqrt(variances)
+    y /= y.sum()
+    for _ in range(max_iterations):
+        gradient = cov @ y - budget / y
+        if np.max(np.abs(gradient)) < tol:
+            break
+        newton_step = np.linalg.solve(cov + np.diag(budget / y ** 2), gradient)
+        scale = 1.0
+        while np.any(y - scale * newton_step <= 0):
+            scale /= 2
+        y = y - scale * newton_step
+    return y / y.sum()
+
+
+def frontier_risk_aversions(mu: np.ndarray, cov: np.ndarray, points: int) -> np.ndarray:
+    """Risk aversions from near minimum variance down to near maximum return"""
+    scale = np.max(np.abs(mu)) / np.linalg.eigvalsh(cov)[-1] if np.any(mu) else 1.0
+    return scale * np.geomspace(1e4, 1e-2, points)
+
+
+def performance(weights: np.ndarray, mu: np.ndarray, cov: np.ndarray,
+                risk_free_rate: float = 0.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Expected return, volatility and Sharpe ratio of each weight row"""
+    weights = np.atleast_2d(weights)
+    expected = weights @ mu
+    volatility = np.sqrt(np.maximum(((weights @ cov) * weights).sum(axis=1), 0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(volatility > 0, (expected - risk_free_rate) / volatility, np.nan)
+    return expected, volatility, sharpe
@@ -0,0 +1,25 @@
+"""
+Opaque keyset cursors for newest-first feeds ordered by (publish date, id)
+"""
+import base64
+import binascii
+from datetime import datetime
+from typing import Tuple
+
+from .timezones import as_utc
+
+
+def encode_cursor(publish_date: datetime, item_id: str) -> str:
+    """Cursor pointing just past the given item"""
+    raw = f"{publish_date.isoformat()}|{item_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        date_part, item_id = raw.split('|', 1)
+        return as_utc(datetime.fromisoformat(date_part)), item_id
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
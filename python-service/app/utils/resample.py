@@ -0,0 +1,94 @@
+"""
+Vectorised OHLCV resampling.
+
+Bars are bucketed by integer keys computed from their timestamps and reduced
+with NumPy ``reduceat``, so coarser bars (5m -> 1H -> 1D, weekly, monthly)
+can be derived from the finest stored granularity without per-row Python.
+"""
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Intraday intervals in minutes; all divide a day so buckets align to midnight
+INTRADAY_MINUTES: Dict[str, int] = {'1m': 1, '5m': 5, '15m': 15, '30m': 30, '1H': 60}
+DAILY_INTERVALS = ['1D', '1W', '1M']
+SUPPORTED_INTERVALS = list(INTRADAY_MINUTES) + DAILY_INTERVALS
+
+BAR_COLUMNS = ['time', 'open', 'high', 'low', 'close', 'volume']
+
+
+def is_intraday(interval: str) -> bool:
+    return interval in INTRADAY_MINUTES
+
+
+def can_derive(source: str, target: str) -> bool:
+    """Whether bars at ``target`` can be built exactly from ``source`` bars"""
+    if source == target:
+        return True
+    if is_intraday(source):
+        if is_intraday(target):
+            return INTRADAY_MINUTES[target] % INTRADAY_MINUTES[source] == 0
+        return target in DAILY_INTERVALS
+    return source == '1D' and target in ('1W', '1M')
+
+
+def _bucket_keys(times: np.ndarray, interval: str) -> np.ndarray:
+    """Integer bucket key per bar; equal keys form one output bar"""
+    if is_intraday(interval):
+        minutes = times.astype('datetime64[m]').astype(np.int64)
+        return minutes // INTRADAY_MINUTES[interval]
+    days = times.astype('datetime64[D]').astype(np.int64)
+    if interval == '1D':
+        return days
+    if interval == '1W':
+        # 1970-01-01 was a Thursday; shift so weeks start on Monday
+        return (days + 3) // 7
+    if interval == '1M':
+        return times.astype('datetime64[M]').astype(np.int64)
+    raise ValueError(f"Unsupported interval: {interval}")
+
+
+def _bucket_labels(keys: np.ndarray, interval: str) -> np.ndarray:
+    """Start timestamp of each bucket"""
+    if is_intraday(interval):
+        return (keys * INTRADAY_MINUTES[interval]).astype('datetime64[m]')
+    if interval == '1D':
+        return keys.astype('datetime64[D]')
+    if interval == '1W':
+        return (keys * 7 - 3).astype('datetime64[D]')
+    return keys.astype('datetime64[M]').astype('datetime64[D]')
+
+
+def resample_bars(bars: pd.DataFrame, interval: str, source_interval: Optional[str] = None) -> pd.DataFrame:
+    """Aggregate OHLCV bars to a coarser interval.
+
+    ``bars`` needs ``time, open, high, low, close, volume`` columns. Raises
+    ValueError when ``source_interval`` is given and cannot produce ``interval``.
+    """
+    if source_interval and not can_derive(source_interval, interval):
+        raise ValueError(f"Cannot derive {interval} bars from {source_interval} bars")
+    if bars.empty:
+        return pd.DataFrame(columns=BAR_COLUMNS)
+
+    times = pd.to_datetime(bars['time']).to_numpy(dtype='datetime64[ns]')
+    order = np.argsort(times, kind='stable')
+    times = times[order]
+    opens = bars['open'].to_numpy(dtype=np.float64)[order]
+    highs = bars['high'].to_numpy(dtype=np.float64)[order]
+    lows = bars['low'].to_numpy(dtype=np.float64)[order]
+    closes = bars['close'].to_numpy(dtype=np.float64)[order]
+    volumes = bars['volume'].to_numpy(dtype=np.int64)[order]
+
+    keys = _bucket_keys(times, interval)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)] - 1
+
+    return pd.DataFrame({
+        'time': _bucket_labels(keys[starts], interval).astype('datetime64[ns]'),
+        'open': opens[starts],
+        'high': np.maximum.reduceat(highs, starts),
+        'low': np.minimum.reduceat(lows, starts),
+        'close': closes[ends],
+        'volume': np.add.reduceat(volumes, starts)
+    })
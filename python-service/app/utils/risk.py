@@ -0,0 +1,80 @@
+"""
+Vectorised portfolio risk measures.
+
+Inputs are NumPy arrays of daily simple returns (dates x assets). Volatility
+and covariance are annualised with TRADING_DAYS; VaR and CVaR are one-day
+losses expressed as positive fractions of portfolio value.
+"""
+from statistics import NormalDist
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+
+def returns_matrix(prices: pd.DataFrame) -> pd.DataFrame:
+    """Daily simple returns from a dates x symbols close matrix.
+
+    Missing closes (suspended days) are carried forward, and dates before
+    every symbol has a price are dropped so all columns share one window.
+    """
+    prices = prices.sort_index().ffill().dropna()
+    return prices.pct_change().iloc[1:]
+
+
+def covariance(returns: np.ndarray) -> np.ndarray:
+    """Annualised sample covariance of the return columns"""
+    return np.atleast_2d(np.cov(returns, rowvar=False)) * TRADING_DAYS
+
+
+def correlation(cov: np.ndarray) -> np.ndarray:
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = cov / np.outer(std, std)
+    return np.nan_to_num(corr)
+
+
+def portfolio_volatility(weights: np.ndarray, cov: np.ndarray) -> float:
+    return float(np.sqrt(weights @ cov @ weights))
+
+
+def risk_contributions(weights: np.ndarray, cov: np.ndarray) -> np.ndarray:
+    """Share of portfolio variance contributed by each asset; sums to 1"""
+    variance = weights @ cov @ weights
+    return weights * (cov @ weights) / variance if variance else np.zeros_like(weights)
+
+
+def betas(returns: np.ndarray, benchmark: np.ndarray) -> np.ndarray:
+    """Beta of each return column (or a single series) against the benchmark"""
+    bench = benchmark - benchmark.mean()
+    variance = bench @ bench
+    if not variance:
+        return np.full(returns.shape[1:] or (), np.nan)
+    return (returns - returns.mean(axis=0)).T @ bench / variance
+
+
+def historical_var_cvar(portfolio_returns: np.ndarray, confidence: float = 0.95) -> Tuple[float, float]:
+    """Empirical VaR and CVaR (expected shortfall) at ``confidence``"""
+    cutoff = np.quantile(portfolio_returns, 1 - confidence)
+    tail = portfolio_returns[portfolio_returns <= cutoff]
+    return float(-cutoff), float(-tail.mean())
+
+
+def parametric_var_cvar(portfolio_returns: np.ndarray, confidence: float = 0.95) -> Tuple[float, float]:
+    """Gaussian VaR and CVaR from the sample mean and standard deviation"""
+    normal = NormalDist()
+    mean = float(portfolio_returns.mean())
+    std = float(portfolio_returns.std(ddof=1))
+    z = normal.inv_cdf(1 - confidence)
+    var = -(mean + z * std)
+    cvar = -(mean - std * normal.pdf(z) / (1 - confidence))
+    return var, cvar
+
+
+def max_drawdown(portfolio_returns: np.ndarray) -> float:
+    """Largest peak-to-trough fall of the compounded value, as a positive fraction"""
+    value = np.cumprod(1 + portfolio_returns)
+    peak = np.maximum.accumulate(np.concatenate(([1.0], value)))[1:]
+    return float(np.max(1 - value / peak)) if len(value) else 0.0
@@ -0,0 +1,157 @@
+"""
+Embedded full-text search with Vietnamese diacritic folding.
+
+Documents are folded (NFD, combining marks dropped, đ -> d, lower-cased) and
+tokenised into a positional inverted index. Queries are ANDed terms and
+"quoted phrases"; matches are ranked with BM25, title hits weighted higher.
+"""
+import heapq
+import math
+import re
+import unicodedata
+from typing import Dict, Hashable, List, Tuple
+
+TOKEN_PATTERN = re.compile(r'\w+')
+QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+TITLE_WEIGHT = 2.0
+
+
+def _fold_table() -> Dict[int, object]:
+    """str.translate table mapping accented Latin letters to their base letter"""
+    table: Dict[int, object] = {ord('đ'): 'd', ord('Đ'): 'D'}
+    for code in list(range(0x00C0, 0x0250)) + list(range(0x1E00, 0x1F00)):
+        char = chr(code)
+        base = ''.join(c for c in unicodedata.normalize('NFD', char) if not unicodedata.combining(c))
+        if base and base != char:
+            table[code] = base
+    # Combining marks from already-decomposed input
+    for code in range(0x0300, 0x0370):
+        table[code] = None
+    return table
+
+
+FOLD_TABLE = _fold_table()
+
+
+def fold(text: str) -> str:
+    """Lower-case and strip Vietnamese diacritics: 'Lãi suất Đà Nẵng' -> 'lai suat da nang'"""
+    return text.translate(FOLD_TABLE).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(fold(text))
+
+
+def parse_query(query: str) -> List[List[str]]:
+    """Query clauses; each clause is a token sequence (one token for plain terms)"""
+    clauses = []
+    for phrase, term in QUERY_PATTERN.findall(query):
+        tokens = tokenize(phrase if phrase else term)
+        if tokens:
+            clauses.append(tokens)
+    return clauses
+
+
+class TextIndex:
+    """Positional inverted index with BM25 ranking; not thread-safe on its own"""
+
+    def __init__(self):
+        # token -> {doc_id: positions}; title tokens come first in each document
+        self._postings: Dict[str, Dict[Hashable, Tuple[int, ...]]] = {}
+        self._doc_terms: Dict[Hashable, Tuple[str, ...]] = {}
+        self._doc_len: Dict[Hashable, int] = {}
+        self._title_len: Dict[Hashable, int] = {}
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def add(self, doc_id: Hashable, title: str, body: str = ''):
+        if doc_id in self._doc_len:
+            self.remove(doc_id)
+        title_tokens = tokenize(title)
+        tokens = title_tokens + tokenize(body)
+        positions: Dict[str, List[int]] = {}
+        for position, token in enumerate(tokens):
+            positions.setdefault(token, []).append(position)
+        for token, token_positions in positions.items():
+            self._postings.setdefault(token, {})[doc_id] = tuple(token_positions)
+        self._doc_terms[doc_id] = tuple(positions)
+        self._doc_len[doc_id] = len(tokens)
+        self._title_len[doc_id] = len(title_tokens)
+        self._total_len += len(tokens)
+
+    def remove(self, doc_id: Hashable):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for token in terms:
+            posting = self._postings.get(token)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self._postings[token]
+        self._total_len -= self._doc_len.pop(doc_id)
+        del self._title_len[doc_id]
+
+    def clear(self):
+        self._postings.clear()
+        self._doc_terms.clear()
+        self._doc_len.clear()
+        self._title_len.clear()
+        self._total_len = 0
+
+    def _phrase_positions(self, doc_id: Hashable, tokens: List[str]) -> List[int]:
+        """Start positions where the token sequence occurs in the document"""
+        starts = set(self._postings[tokens[0]][doc_id])
+        for offset, token in enumerate(tokens[1:], 1):
+            starts &= {p - offset for p in self._postings[token][doc_id]}
+            if not starts:
+                break
+        return sorted(starts)
+
+    def search(self, query: str, limit: int = 20) -> Tuple[List[Tuple[Hashable, float]], int]:
+        """Top ``limit`` (doc_id, score) pairs for documents matching every clause, and the match count"""
+        clauses = parse_query(query)
+        tokens = {token for clause in clauses for token in clause}
+        if not clauses or any(token not in self._postings for token in tokens):
+            return [], 0
+
+        # Candidates hold every token; intersect from the rarest posting list
+        ordered = sorted(tokens, key=lambda t: len(self._postings[t]))
+        candidates = set(self._postings[ordered[0]])
+        for token in ordered[1:]:
+            candidates &= self._postings[token].keys()
+            if not candidates:
+                return [], 0
+
+        doc_count = len(self._doc_len)
+        avg_len = self._total_len / doc_count or 1.0
+        # Phrase document frequency is approximated by its rarest token
+        idf = []
+        for clause in clauses:
+            df = min(len(self._postings[token]) for token in clause)
+            idf.append(math.log(1 + (doc_count - df + 0.5) / (df + 0.5)))
+
+        scored = []
+        for doc_id in candidates:
+            title_len = self._title_len[doc_id]
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_len[doc_id] / avg_len)
+            score = 0.0
+            for clause, clause_idf in zip(clauses, idf):
+                if len(clause) == 1:
+                    positions = self._postings[clause[0]][doc_id]
+                else:
+                    positions = self._phrase_positions(doc_id, clause)
+                    if not positions:
+                        break
+                tf = sum(TITLE_WEIGHT if p < title_len else 1.0 for p in positions)
+                score += clause_idf * tf * (BM25_K1 + 1) / (tf + norm)
+            else:
+                scored.append((score, doc_id))
+
+        top = heapq.nlargest(limit, scored, key=lambda item: item[0])
+        return [(doc_id, score) for score, doc_id in top], len(scored)
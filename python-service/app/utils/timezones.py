@@ -0,0 +1,20 @@
+"""
+Timezone normalisation for news timestamps.
+
+Publish dates are aware UTC in memory and naive UTC in the database's
+"timestamp without time zone" columns; sources that report local (VN) times
+are converted when they are parsed.
+"""
+from datetime import datetime, timezone, tzinfo
+
+
+def as_utc(value: datetime, naive_tz: tzinfo = timezone.utc) -> datetime:
+    """Aware UTC datetime; a naive value is read as ``naive_tz`` time"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=naive_tz)
+    return value.astimezone(timezone.utc)
+
+
+def naive_utc(value: datetime) -> datetime:
+    """UTC wall time without tzinfo, as stored in the database"""
+    return as_utc(value).replace(tzinfo=None)
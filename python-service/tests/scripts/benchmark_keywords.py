@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark news classification: compiled keyword regex vs per-keyword scans
+
+Usage: python tests/scripts/benchmark_keywords.py [articles] [extra_keywords]
+
+Articles are synthetic ~80-word texts where about 5% of words are keywords.
+``extra_keywords`` adds random keywords to show how both approaches scale
+with larger dictionaries loaded from NEWS_KEYWORDS_FILE. The last line times
+KeywordMatcher as configured, which scans below SCAN_THRESHOLD keywords.
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.utils.keywords import DEFAULT_KEYWORDS, SCAN_THRESHOLD, KeywordMatcher
+
+FILLER = (
+    'ngày phiên giao dịch nhà đầu tư khối ngoại quý năm cuối tháng sáng chiều báo cáo '
+    'kết quả kinh doanh mạnh nhẹ hôm nay theo đó cho biết trong khi với các những được từ này'
+).split()
+
+def make_groups(extra, rng):
+    groups = {**DEFAULT_KEYWORDS['sentiment'], **DEFAULT_KEYWORDS['categories']}
+    if extra:
+        letters = 'abcdeghiklmnopqrstuvxy'
+        groups['extra'] = [''.join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(extra)]
+    return groups
+
+def make_articles(count, keywords, rng):
+    return [
+        ' '.join(rng.choice(keywords) if rng.random() < 0.05 else rng.choice(FILLER) for _ in range(80))
+        for _ in range(count)
+    ]
+
+def count_naive(groups, text):
+    text = text.lower()
+    return {name: sum(1 for word in words if word in text) for name, words in groups.items()}
+
+def timed(label, func, articles):
+    started = time.perf_counter()
+    results = [func(text) for text in articles]
+    seconds = time.perf_counter() - started
+    print(f"   {label:<18} {seconds:6.2f}s ({len(articles) / seconds:>9,.0f} articles/s)")
+    return results
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    extra = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    rng = random.Random(42)
+    groups = make_groups(extra, rng)
+    keywords = [w for words in groups.values() for w in words]
+    articles = make_articles(count, keywords, rng)
+
+    started = time.perf_counter()
+    regex = KeywordMatcher(groups, scan_threshold=0)
+    print(f"Classifying {count:,} articles against {len(keywords)} keywords "
+          f"(regex built in {time.perf_counter() - started:.3f}s, scan threshold {SCAN_THRESHOLD})")
+
+    naive = timed("Per-keyword scans:", lambda text: count_naive(groups, text), articles)
+    compiled = timed("Compiled regex:", regex.count, articles)
+    configured = timed("KeywordMatcher:", KeywordMatcher(groups).count, articles)
+    print(f"   Results identical: {naive == compiled == configured}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Test module for corporate-action price adjustment
+"""
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import pytest
+from app.models import CorporateEvent, StockHistory, StockHistoryData
+from app.services.adjustment_service import AdjustmentService, parse_events
+from app.utils import adjustments
+
+def _history(closes, start_day=2):
+    return StockHistory(symbol='HPG', data=[
+        StockHistoryData(date=f'2024-01-{start_day + i:02d}', open=c, high=c, low=c, close=c, volume=1000, value=c * 1000)
+        for i, c in enumerate(closes)
+    ])
+
+def test_cumulative_factors_compound_backwards():
+    """Test each event scales only the bars before its ex-date"""
+    dates = np.array(['2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05'])
+    factors = adjustments.cumulative_factors(
+        dates, np.array(['2024-01-03', '2024-01-05', '2024-01-09', '2024-01-02']), np.array([0.5, 0.8, 0.1, 0.1])
+    )
+    # Events after the last bar or on the first one change nothing
+    np.testing.assert_allclose(factors, [0.4, 0.8, 0.8, 1.0])
+
+    price, volume = adjustments.event_factors(
+        np.array([30.0, 30.0, np.nan]), np.array([1.0, 0, 0]), np.array([0, 0.2, 0.2]),
+        np.array([0, 0, 0]), np.array([0, 0, 0])
+    )
+    np.testing.assert_allclose(price, [29 / 30, 1 / 1.2, 1.0])
+    np.testing.assert_allclose(volume, [1.0, 1.2, 1.2])
+
+def test_adjusted_history_removes_gaps_and_caches_factors():
+    """Test a 20% stock dividend and a cash dividend leave no artificial gap"""
+    service = AdjustmentService(price_unit_vnd=1000, cache_ttl_seconds=60)
+    events = [
+        CorporateEvent(symbol='HPG', type='STOCK_DIVIDEND', title='Co tuc 20%', ex_date='2024-01-04', share_ratio=0.2),
+        CorporateEvent(symbol='HPG', type='DIVIDEND', title='Co tuc tien', ex_date='2024-01-06', cash_dividend=500),
+    ]
+    history = _history([30.0, 30.0, 25.0, 25.0, 24.5])
+    with patch('app.services.adjustment_service.db_service.get_corporate_events', return_value=events) as stored:
+        adjusted = service.adjust(history)
+        assert service.adjust(history).data[0].close == adjusted.data[0].close
+        assert stored.call_count == 1
+
+    closes = [bar.close for bar in adjusted.data]
+    assert closes[1] == pytest.approx(25 * 24.5 / 25) and closes[2] == pytest.approx(24.5)
+    assert closes[-1] == 24.5 and adjusted.data[0].volume == 1200 and adjusted.data[2].volume == 1000
+    # Raw series untouched
+    assert history.data[0].close == 30.0
+
+    # A corrected close before an ex-date changes the factors despite the same dates
+    corrected = _history([30.0, 31.0, 25.0, 25.0, 24.5])
+    with patch('app.services.adjustment_service.db_service.get_corporate_events', return_value=events):
+        assert service.adjust(corrected).data[0].close != adjusted.data[0].close
+
+def test_parse_vnstock_events():
+    """Test source rows map to typed events and unrelated events are skipped"""
+    frame = pd.DataFrame([
+        {'id': 1, 'event_list_code': 'DIV', 'event_title': 'Trả cổ tức bằng tiền mặt', 'ratio': 0.1,
+         'value': None, 'exright_date': '2024-06-03'},
+        {'id': 2, 'event_list_code': 'ISS', 'event_title': 'Phát hành cổ phiếu thưởng', 'ratio': '15%',
+         'value': None, 'exright_date': '2024-07-01'},
+        {'id': 3, 'event_list_code': 'ISS', 'event_title': 'Phát hành quyền mua', 'ratio': 0.5,
+         'value': 12000, 'exright_date': '2024-08-01'},
+        {'id': 4, 'event_list_code': 'AGME', 'event_title': 'Đại hội cổ đông', 'ratio': None,
+         'value': None, 'exright_date': '2024-04-01'},
+        {'id': 5, 'event_list_code': 'ISS', 'event_title': 'Chia tách cổ phiếu', 'ratio': 2,
+         'value': None, 'exright_date': '2024-09-02'},
+        {'id': 6, 'event_list_code': 'ISS', 'event_title': 'Trả cổ tức bằng cổ phiếu', 'ratio': '10:3',
+         'value': None, 'exright_date': '2024-10-01'},
+    ])
+    dividend, bonus, rights, split, stock_dividend = parse_events('FPT', frame)
+    assert dividend.type == 'DIVIDEND' and dividend.cash_dividend == 1000 and dividend.external_id == '1'
+    assert bonus.type == 'BONUS_SHARES' and bonus.share_ratio == pytest.approx(0.15)
+    assert rights.type == 'RIGHTS_ISSUE' and rights.rights_ratio == 0.5 and rights.rights_price == 12000
+    # Units come from the field, not the size: a 2-for-1 split adds one share per share
+    assert split.type == 'SPLIT' and split.share_ratio == 1.0
+    assert stock_dividend.type == 'STOCK_DIVIDEND' and stock_dividend.share_ratio == pytest.approx(0.3)
@@ -15,6 +15,11 @@ def test_root():
     assert "message" in data
     assert "timestamp" in data
 
+def test_cors_exposes_news_cursor():
+    """Test browsers may read the next-page cursor header cross-origin"""
+    response = client.get("/", headers={"Origin": "http://localhost:3000"})
+    assert "X-Next-Cursor" in response.headers.get("access-control-expose-headers", "")
+
 def test_health_check():
     """Test health check endpoint"""
     response = client.get("/health")
@@ -38,6 +43,30 @@ def test_stock_history():
     response = client.get("/stocks/VCB/history?period=1M")
     assert response.status_code in [200, 404, 500]  # Depends on service availability
 
+def test_stock_bars_rejects_bad_lookback():
+    """Test the bars lookback is validated before reaching the store or upstream"""
+    for days in (0, -5, 100000):
+        response = client.get(f"/stocks/VCB/bars?interval=15m&days={days}")
+        assert response.status_code == 422
+
+def test_quote_streams_reject_bad_symbols():
+    """Test realtime clients cannot push malformed or unbounded symbol lists into the shared poll"""
+    with client.websocket_connect("/ws/quotes") as websocket:
+        for symbols in ("FPT", [1], ["../X"], [f"S{i}" for i in range(101)]):
+            websocket.send_json({"action": "subscribe", "symbols": symbols})
+            assert websocket.receive_json()["type"] == "error"
+        websocket.send_json(["FPT"])
+        assert websocket.receive_json()["type"] == "error"
+
+    response = client.get("/stream/quotes?symbols=VCB,fpt;drop")
+    assert response.status_code == 400
+
+def test_optimize_rejects_bad_window_and_risk_aversion():
+    """Test optimisation inputs are bounded like the portfolio risk endpoint before any query runs"""
+    for body in ({"window": 5000}, {"window": 10}, {"risk_aversion": 0}, {"risk_aversion": -2}):
+        response = client.post("/portfolios/optimize", json={"symbols": ["VCB", "FPT"], **body})
+        assert response.status_code == 400
+
 def test_search_stocks():
     """Test stock search endpoint"""
     response = client.get("/stocks/search?q=VCB&limit=5")
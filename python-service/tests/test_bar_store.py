@@ -0,0 +1,111 @@
+"""
+Test module for the memory-mapped bar store
+"""
+import json
+import multiprocessing
+from datetime import datetime
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import pytest
+from app.services.bar_store import BarStore
+from app.services.price_matrix import PriceMatrix, PriceMatrixService
+from app.services.trading_calendar import MARKET_TZ, trading_calendar
+from app.services.vnstock_service import vnstock_service
+
+def _bar(date, close, volume=100):
+    return {'date': date, 'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+            'volume': volume, 'value': close * volume}
+
+def test_write_merge_and_mapped_reads(tmp_path):
+    """Test syncs merge into one sorted file and reads are slices of the mapping"""
+    store = BarStore(str(tmp_path))
+    assert store.write('VCB', [_bar('2024-01-03', 11.0), _bar('2024-01-02', 10.0)])
+    # A later sync overlaps: the new bar wins and the history keeps growing
+    assert store.write('VCB', [_bar('2024-01-03', 11.5), _bar('2024-01-04', 12.0)])
+
+    bars = store.read('VCB', start='2024-01-03')
+    assert bars.dates == ['2024-01-03', '2024-01-04']
+    np.testing.assert_array_equal(bars['close'], [11.5, 12.0])
+    assert isinstance(bars.data, np.memmap) and bars['close'].flags['C_CONTIGUOUS']
+    assert store.coverage('VCB') == ('2024-01-02', '2024-01-04')
+    assert store.read('FPT') is None
+
+    (tmp_path / 'index.json').unlink()
+    assert store.rebuild_index() == 1 and store.symbols() == ['VCB']
+    with pytest.raises(ValueError):
+        store.read('../etc/passwd')
+
+def test_price_matrix_from_bar_store(tmp_path):
+    """Test a matrix built from mapped files equals one built from history rows"""
+    store = BarStore(str(tmp_path))
+    store.write('AAA', [_bar('2024-01-02', 10.0), _bar('2024-01-03', 11.0), _bar('2024-01-04', 12.0)])
+    store.write('BBB', [_bar('2024-01-03', 50.0, 10)])
+
+    from_bars = PriceMatrix.from_bars(store.scan(start='2024-01-02'), ('close', 'volume'))
+    history = pd.concat([b.to_frame().assign(symbol=b.symbol) for b in store.scan()])
+    from_rows = PriceMatrix.from_history(history, ('close', 'volume'))
+    assert from_bars.dates == from_rows.dates and from_bars.symbols == from_rows.symbols
+    np.testing.assert_array_equal(from_bars.data, from_rows.data)
+
+def test_partial_store_keeps_history_only_symbols(tmp_path):
+    """Test symbols the store lacks (or holds only part of the window of) still load from StockHistory"""
+    store = BarStore(str(tmp_path))
+    store.write('FPT', [_bar('2024-01-02', 90.0), _bar('2024-01-03', 91.0)])
+    store.write('HPG', [_bar('2024-01-03', 25.0)])
+    history = pd.DataFrame([
+        ('2024-01-02', 'VCB', 80.0, 10), ('2024-01-03', 'VCB', 81.0, 20), ('2024-01-02', 'HPG', 24.0, 30),
+        ('2024-01-03', 'HPG', 25.0, 40),
+    ], columns=['date', 'symbol', 'close', 'volume'])
+    service = PriceMatrixService(1, 0, ['close', 'volume'])
+    with patch('app.services.price_matrix.bar_store', store), \
+            patch('app.services.price_matrix.db_service.get_history_version', return_value=('2024-01-03', 5)), \
+            patch('app.services.price_matrix.db_service.get_history_matrix', return_value=history) as load:
+        matrix = service.get()
+
+    assert load.call_args.kwargs['exclude'] == ['FPT']
+    assert matrix.symbols == ['FPT', 'HPG', 'VCB'] and matrix.dates == ['2024-01-02', '2024-01-03']
+    np.testing.assert_array_equal(matrix.raw('close'), [[90, 24, 80], [91, 25, 81]])
+
+def _write_symbol(root, symbol):
+    BarStore(root).write(symbol, [_bar('2024-01-02', 10.0)])
+
+def test_concurrent_workers_keep_every_symbol(tmp_path):
+    """Test writers in separate processes do not lose each other's symbols or index entries"""
+    symbols = [f"S{i:02d}" for i in range(12)]
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=_write_symbol, args=(str(tmp_path), s)) for s in symbols]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    store = BarStore(str(tmp_path))
+    assert store.symbols() == symbols
+    assert sorted(json.loads((tmp_path / 'index.json').read_text())) == symbols
+    # Temporary files of an interrupted write are not symbols
+    (tmp_path / 'VCB.npy.123.tmp.npy').write_bytes(b'')
+    assert store.symbols() == symbols
+
+def test_open_session_bar_is_served_but_not_stored(tmp_path):
+    """Test today's bar before the close is returned without becoming a stored final bar"""
+    store = BarStore(str(tmp_path))
+    store.write('VCB', [_bar('2024-01-02', 10.0), _bar('2024-01-03', 11.0)])
+    tail = pd.DataFrame({
+        'time': pd.to_datetime(['2024-01-04', '2024-01-05']), 'open': [12.0, 13.0], 'high': [13.0, 14.0],
+        'low': [11.0, 12.0], 'close': [12.0, 13.0], 'volume': [100, 40]
+    })
+    with patch('app.services.vnstock_service.bar_store', store), \
+         patch.object(trading_calendar, 'previous_session', return_value='2024-01-05'), \
+         patch.object(trading_calendar, 'session_closed', side_effect=lambda day: day < '2024-01-05'), \
+         patch.object(vnstock_service, '_fetch_bars', return_value=tail) as fetch:
+        history = vnstock_service._stored_history('VCB', datetime(2024, 1, 2))
+        again = vnstock_service._stored_history('VCB', datetime(2024, 1, 2))
+
+    assert [bar.close for bar in history.data] == [10.0, 11.0, 12.0, 13.0]
+    assert store.coverage('VCB') == ('2024-01-02', '2024-01-04')
+    # The open session is fetched again until it closes
+    assert fetch.call_count == 2 and again.data[-1].date == '2024-01-05'
+
+    assert not trading_calendar.session_closed('2024-08-12', now=datetime(2024, 8, 12, 14, 0, tzinfo=MARKET_TZ))
+    assert trading_calendar.session_closed('2024-08-12', now=datetime(2024, 8, 12, 15, 0, tzinfo=MARKET_TZ))
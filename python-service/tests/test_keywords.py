@@ -0,0 +1,39 @@
+"""
+Test module for the compiled keyword matcher
+"""
+import json
+import random
+from app.utils.keywords import DEFAULT_KEYWORDS, KeywordMatcher, load_keyword_dictionaries
+
+GROUPS = {**DEFAULT_KEYWORDS['sentiment'], **DEFAULT_KEYWORDS['categories']}
+
+def _naive_counts(text):
+    text = text.lower()
+    return {name: sum(1 for word in words if word in text) for name, words in GROUPS.items()}
+
+def test_matches_substring_semantics():
+    """Test one pass gives the same counts as per-keyword substring checks"""
+    text = "Lợi nhuận TĂNG TRƯỞNG mạnh, giảm sút rủi ro; cổ phiếu VNM tăng"
+    # The built-in dictionary is small enough to scan; forcing the regex must agree
+    for matcher in (KeywordMatcher(GROUPS), KeywordMatcher(GROUPS, scan_threshold=0)):
+        assert matcher.count(text) == _naive_counts(text)
+        # Overlapping keywords are all credited
+        assert {'tăng', 'tăng trưởng', 'giảm', 'giảm sút'} <= matcher.matches(text)
+
+def test_matches_random_texts():
+    """Test equivalence on texts stitched from keywords and filler"""
+    matcher = KeywordMatcher(GROUPS, scan_threshold=0)
+    vocabulary = [w for words in GROUPS.values() for w in words] + ['và', 'mạnh', 'x', 'ngày', 'quý']
+    rng = random.Random(7)
+    for _ in range(200):
+        text = ''.join(rng.choice(vocabulary) + rng.choice(['', ' ']) for _ in range(12))
+        assert matcher.count(text) == _naive_counts(text)
+
+def test_load_keyword_dictionaries(tmp_path):
+    """Test dictionaries load from a JSON file, keeping defaults for missing sections"""
+    path = tmp_path / 'keywords.json'
+    path.write_text(json.dumps({'sentiment': {'positive': ['lãi'], 'negative': ['lỗ']}}), encoding='utf-8')
+
+    keywords = load_keyword_dictionaries(str(path))
+    assert keywords['sentiment']['positive'] == ['lãi']
+    assert keywords['categories'] == DEFAULT_KEYWORDS['categories']
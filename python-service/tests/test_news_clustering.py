@@ -0,0 +1,59 @@
+"""
+Test module for near-duplicate story clustering
+"""
+from datetime import datetime, timedelta
+from app.models import NewsArticle, NewsFilter
+from app.services.news_clustering import StoryClusterer, collapse_stories
+from app.services.news_index import NewsIndex
+
+BASE = datetime(2024, 8, 12, 9, 0)
+
+STORY = ("VCB báo lãi kỷ lục 10.000 tỷ đồng trong quý 3 năm 2024",
+         "Ngân hàng Vietcombank công bố kết quả kinh doanh quý 3 với lợi nhuận trước thuế tăng 20%")
+REWRITE = ("Vietcombank (VCB) báo lãi kỷ lục 10.000 tỷ đồng trong quý 3 năm 2024",
+           "Vietcombank công bố kết quả kinh doanh quý 3 với lợi nhuận trước thuế tăng 20% so với cùng kỳ")
+OTHER = ("HPG khởi công dự án thép Dung Quất 2",
+         "Hòa Phát khởi công khu liên hợp gang thép với tổng vốn đầu tư 85.000 tỷ đồng")
+
+def _article(news_id, text, minutes=0, source='CafeF', cluster_id=None):
+    return NewsArticle(
+        id=news_id, title=text[0], summary=text[1], url=f'https://example.com/{news_id}',
+        source=source, publish_date=BASE + timedelta(minutes=minutes), category='stocks',
+        related_symbols=['VCB'], sentiment='positive', impact_score=70, tags=[], cluster_id=cluster_id
+    )
+
+def test_rewrites_join_the_earliest_report():
+    """Test a rewritten story from another source joins the first report's cluster"""
+    clusterer = StoryClusterer(threshold=0.5, max_articles=100)
+    clustered = clusterer.assign([
+        _article('late', REWRITE, minutes=30, source='VnExpress'),
+        _article('first', STORY),
+        _article('other', OTHER, minutes=10),
+    ])
+    clusters = {a.id: a.cluster_id for a in clustered}
+    assert clusters == {'first': 'first', 'late': 'first', 'other': 'other'}
+    assert clusterer.stats()['duplicates'] == 1
+
+    # Later polls match against the remembered signatures
+    again = clusterer.assign([_article('third', STORY, minutes=60, source='VNStock')])
+    assert again[0].cluster_id == 'first'
+
+def test_window_eviction_forgets_old_signatures():
+    """Test signatures beyond the window no longer attract duplicates"""
+    clusterer = StoryClusterer(threshold=0.5, max_articles=1)
+    clusterer.assign([_article('first', STORY), _article('other', OTHER, minutes=1)])
+    assert len(clusterer) == 1
+    assert clusterer.assign([_article('late', REWRITE, minutes=2)])[0].cluster_id == 'late'
+
+def test_collapsed_feeds_return_representatives():
+    """Test live and indexed feeds keep one article per story unless asked not to"""
+    articles = [_article('first', STORY), _article('late', REWRITE, minutes=30),
+                _article('other', OTHER, minutes=10)]
+    assert [a.id for a in collapse_stories(articles)] == ['first', 'other']
+
+    index = NewsIndex(max_articles=2)
+    index.load(StoryClusterer().assign(articles), complete=True)
+    # 'first' was evicted; its duplicate stays hidden from collapsed feeds
+    assert [a.id for a in index.query(NewsFilter()).articles] == ['other']
+    assert [a.id for a in index.query(NewsFilter(collapse_stories=False)).articles] == ['late', 'other']
+    assert [a.id for a in index.query(NewsFilter(symbols=['VCB'])).articles] == ['other']
@@ -0,0 +1,107 @@
+"""
+Test module for the in-memory news index
+"""
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.models import NewsArticle, NewsFilter
+from app.services.news_index import NewsIndex
+from app.utils.pagination import decode_cursor, encode_cursor
+
+BASE = datetime(2024, 8, 12, 9, 0)
+
+def _article(n, symbols, category='stocks', sentiment='neutral', source='CafeF'):
+    return NewsArticle(
+        id=f'id{n:03d}', title=f'News {n}', summary='', url=f'https://example.com/{n}',
+        source=source, publish_date=BASE + timedelta(minutes=n), category=category,
+        related_symbols=symbols, sentiment=sentiment, impact_score=30, tags=[]
+    )
+
+def _index():
+    index = NewsIndex(max_articles=100)
+    index.load([
+        _article(0, ['VCB'], category='market'),
+        _article(1, ['VCB', 'FPT'], sentiment='positive'),
+        _article(2, ['FPT']),
+        _article(3, ['HPG'], source='VnExpress'),
+        _article(4, ['VCB'], sentiment='positive'),
+        _article(5, []),
+    ], complete=True)
+    return index
+
+def test_intersection_queries():
+    """Test symbol, category and sentiment filters intersect"""
+    index = _index()
+
+    response = index.query(NewsFilter(symbols=['vcb'], category='stocks'))
+    assert [a.id for a in response.articles] == ['id004', 'id001']
+    assert response.total == 2
+
+    response = index.query(NewsFilter(symbols=['VCB', 'HPG'], sentiment='neutral'))
+    assert [a.id for a in response.articles] == ['id003', 'id000']
+
+    assert index.query(NewsFilter(), source='VnExpress').total == 1
+    assert index.query(NewsFilter(symbols=['XYZ'])).total == 0
+
+def test_date_range_and_pagination():
+    """Test date bounds are inclusive and pages walk newest first"""
+    index = _index()
+    filters = NewsFilter(from_date=BASE + timedelta(minutes=1), to_date=BASE + timedelta(minutes=4), limit=3)
+
+    first = index.query(filters)
+    assert [a.id for a in first.articles] == ['id004', 'id003', 'id002']
+    assert first.total == 4
+
+    second = index.query(filters.model_copy(update={'page': 2}))
+    assert [a.id for a in second.articles] == ['id001']
+
+    assert first.next_cursor
+    after = index.query(filters.model_copy(update={'cursor': first.next_cursor}))
+    assert [a.id for a in after.articles] == ['id001']
+    assert after.next_cursor is None
+
+    # Cursors do not shift when newer articles arrive
+    index.add([_article(9, ['VCB'])])
+    assert [a.id for a in index.query(filters.model_copy(update={'cursor': first.next_cursor})).articles] == ['id001']
+
+def test_new_articles_and_eviction():
+    """Test added articles are queryable and eviction marks the index incomplete"""
+    index = NewsIndex(max_articles=3)
+    index.load([_article(n, ['VCB']) for n in range(3)], complete=True)
+    assert index.complete
+
+    assert index.add([_article(10, ['VCB']), _article(2, ['VCB'])]) == 1
+    assert len(index) == 3
+    assert not index.complete
+    assert [a.id for a in index.query(NewsFilter(symbols=['VCB'])).articles] == ['id010', 'id002', 'id001']
+
+def test_cursor_round_trip():
+    """Test cursors survive encoding and reject garbage"""
+    when = datetime(2024, 8, 12, 9, 30, 15, 123456, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor(when, 'abc|def')) == (when, 'abc|def')
+    # Cursors issued before dates were aware hold naive UTC
+    assert decode_cursor(encode_cursor(when.replace(tzinfo=None), 'x')) == (when, 'x')
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor')
+
+def test_filtered_pages_match_a_full_sort():
+    """Test filtered pages and cursors walk the same order as sorting every match"""
+    index = NewsIndex(max_articles=500)
+    index.load([_article(n, ['VCB'] if n % 3 else ['FPT'], sentiment='positive' if n % 2 else 'neutral')
+                for n in range(300)], complete=True)
+    expected = [f'id{n:03d}' for n in range(299, -1, -1) if n % 3 and n % 2]
+    since = BASE + timedelta(minutes=50)
+
+    by_page = [a.id for page in range(1, 5)
+               for a in index.query(NewsFilter(symbols=['VCB'], sentiment='positive', limit=30, page=page)).articles]
+    assert by_page == expected[:120]
+
+    walked, cursor = [], None
+    while True:
+        response = index.query(NewsFilter(symbols=['VCB'], sentiment='positive', from_date=since,
+                                          limit=25, cursor=cursor))
+        walked += [a.id for a in response.articles]
+        cursor = response.next_cursor
+        if cursor is None:
+            break
+    assert walked == [i for i in expected if int(i[2:]) >= 50]
+    assert response.total == len(walked)
@@ -0,0 +1,102 @@
+"""
+Test module for background news ingestion
+"""
+import asyncio
+from datetime import datetime
+from unittest.mock import patch, AsyncMock
+import httpx
+import pytest
+from app.models import NewsArticle
+from app.services.news_ingestion import NewsIngestionService
+from app.services.news_service import news_service
+from app.services.news_sources import NewsSource, RssNewsSource
+
+FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>Feed</title>
+<item><title>VN-Index tăng điểm</title><link>https://feed.test/a</link><guid>a</guid>
+<description>Thị trường khởi sắc</description><pubDate>Mon, 12 Aug 2024 02:00:00 GMT</pubDate></item>
+</channel></rss>"""
+
+def _article(news_id, title='News'):
+    return NewsArticle(
+        id=news_id, title=title, summary='Summary', url=f'https://example.com/{news_id}',
+        source='Test', publish_date=datetime(2024, 8, 12, 9, 0), category='market',
+        related_symbols=['VCB'], sentiment='neutral', impact_score=30, tags=[]
+    )
+
+def test_run_once_dedupes_and_persists_new_articles():
+    """Test one ingestion pass stores each article id once"""
+    service = NewsIngestionService(interval_seconds=60, limit_per_source=10)
+    fetched = [_article('a'), _article('b', 'Ngân hàng công bố lợi nhuận quý'), _article('a')]
+    stored_batches = []
+
+    aggregated = []
+
+    def insert(articles, aggregate):
+        stored_batches.append([a.id for a in articles])
+        aggregated.extend(aggregate([a for a in articles if a.id == 'b']))
+        return ['b']  # 'a' was already in the store
+
+    with patch('app.services.news_ingestion.symbol_registry.refresh_if_stale', return_value=False), \
+         patch('app.services.news_ingestion.news_service.poll_articles_async',
+               AsyncMock(return_value=(fetched, []))), \
+         patch('app.services.news_ingestion.db_service.insert_news_articles', side_effect=insert):
+        new_articles = asyncio.run(service.run_once())
+
+    assert stored_batches == [['a', 'b']]
+    assert [a.id for a in new_articles] == ['b']
+    # Only the newly stored article feeds the sentiment aggregates, in the same insert
+    assert aggregated == [('VCB', '2024-08-13', 1, 0, 0, 1, 30.0)]  # 16:00 ICT, after the close
+    status = service.status()
+    assert status['runs'] == 1
+    assert status['last_new_articles'] == 1
+
+def test_failed_insert_keeps_feed_entries_for_the_next_run():
+    """Test a store failure leaves validators and seen ids unapplied, so the retry stores the articles"""
+    service = NewsIngestionService(interval_seconds=60, limit_per_source=10)
+    source = RssNewsSource('feed', 'Feed', 'https://feed.test/rss')
+    conditional = []
+
+    async def handler(request):
+        conditional.append(request.headers.get('If-None-Match'))
+        if request.headers.get('If-None-Match') == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=FEED.encode('utf-8'), headers={'ETag': '"v1"'})
+
+    poll = news_service.poll_articles_async
+
+    async def poll_feed(limit_per_source):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await poll(limit_per_source, client)
+
+    async def scenario():
+        try:
+            await service.run_once()
+        except RuntimeError:
+            pass
+        return await service.run_once(), await service.run_once()
+
+    calls = []
+
+    def insert(articles, aggregate):
+        calls.append(len(articles))
+        return None if len(calls) == 1 else [a.id for a in articles]
+
+    with patch.object(news_service, 'news_sources', {'feed': source}), \
+         patch.object(news_service, 'poll_articles_async', poll_feed), \
+         patch('app.services.news_ingestion.symbol_registry.refresh_if_stale', return_value=False), \
+         patch('app.services.news_ingestion.db_service.insert_news_articles',
+               side_effect=insert):
+        retried, after = asyncio.run(scenario())
+
+    assert conditional == [None, None, '"v1"']
+    assert [a.title for a in retried] == ['VN-Index tăng điểm']
+    assert after == [] and calls == [1, 1, 0]
+
+def test_sources_must_implement_fetch_raw():
+    """Test a source plugin without a blocking fetch cannot be instantiated"""
+    class Incomplete(NewsSource):
+        key, name = 'incomplete', 'Incomplete'
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,54 @@
+"""
+Test module for daily news sentiment aggregates
+"""
+from datetime import datetime, timezone
+import feedparser
+from app.models import NewsArticle
+from app.services.news_sentiment import aggregate_rows, rows_to_days, session_date
+from app.services.news_sources import entry_publish_date
+from app.services.trading_calendar import MARKET_TZ
+from app.utils.timezones import as_utc
+
+def _article(news_id, published, symbols, sentiment, impact, cluster_id=None):
+    return NewsArticle(
+        id=news_id, title='News', summary='', url=f'https://example.com/{news_id}', source='CafeF',
+        publish_date=published, category='stocks', related_symbols=symbols, sentiment=sentiment,
+        impact_score=impact, tags=[], cluster_id=cluster_id
+    )
+
+def test_session_date_follows_the_market_close():
+    """Test news counts for the session it can first affect (times are naive UTC)"""
+    assert session_date(datetime(2024, 8, 12, 1, 30)) == '2024-08-12'   # Mon 08:30 ICT
+    assert session_date(datetime(2024, 8, 12, 8, 30)) == '2024-08-13'   # Mon 15:30 ICT, after close
+    assert session_date(datetime(2024, 8, 9, 9, 0)) == '2024-08-12'     # Fri 16:00 ICT -> Monday
+    assert session_date(datetime(2024, 8, 10, 20, 0)) == '2024-08-12'   # Sun 03:00 ICT -> Monday
+
+def test_aggregate_rows_count_each_story_once():
+    """Test per-symbol session aggregates skip near-duplicates"""
+    morning = datetime(2024, 8, 12, 2, 0)
+    rows = aggregate_rows([
+        _article('a', morning, ['VCB', 'fpt'], 'positive', 70),
+        _article('b', morning, ['VCB'], 'negative', 50),
+        _article('c', morning, ['VCB'], 'positive', 90, cluster_id='a'),
+        _article('d', datetime(2024, 8, 12, 9, 0), ['VCB'], 'neutral', 30),
+    ])
+    assert rows == [
+        ('FPT', '2024-08-12', 1, 1, 0, 0, 70.0),
+        ('VCB', '2024-08-12', 2, 1, 1, 0, 120.0),
+        ('VCB', '2024-08-13', 1, 0, 0, 1, 30.0),
+    ]
+    days = rows_to_days(rows)
+    assert days[1].mean_impact == 60.0
+
+def test_publish_dates_are_utc_whatever_the_source_zone():
+    """Test feed offsets and VN-local vnstock times land on the right side of the 15:00 close"""
+    feed = feedparser.parse(
+        '<rss><channel><item><title>T</title><pubDate>Mon, 12 Aug 2024 14:30:00 +0700</pubDate></item></channel></rss>'
+    )
+    published = entry_publish_date(feed.entries[0])
+    assert published == datetime(2024, 8, 12, 7, 30, tzinfo=timezone.utc)
+    assert session_date(published) == '2024-08-12'
+
+    # vnstock's naive 15:30 is market time, i.e. after the close
+    vnstock_time = as_utc(datetime(2024, 8, 12, 15, 30), MARKET_TZ)
+    assert vnstock_time.hour == 8 and session_date(vnstock_time) == '2024-08-13'
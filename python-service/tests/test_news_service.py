@@ -1,9 +1,14 @@
 import pytest
 import asyncio
+import json
+import time
 from datetime import datetime
 from unittest.mock import Mock, patch, MagicMock
 import feedparser
+import httpx
+from app.config import settings
 from app.services.news_service import NewsService, news_service
+from app.services.symbol_registry import SymbolRegistry
 from app.models import NewsArticle, NewsFilter, NewsResponse
 
 class TestNewsService:
@@ -32,6 +37,54 @@ class TestNewsService:
         symbols = self.news_service._extract_stock_symbols(text_with_false_positives)
         assert len(symbols) == 0
         
+    def test_extract_stock_symbols_with_listing(self):
+        """Test extraction validates tickers against the listing and uses context"""
+        self.news_service.symbol_registry = SymbolRegistry(
+            lambda: ['VCB', 'HPG', 'VND', 'SHS', 'FUEVFVND'], refresh_seconds=3600
+        )
+        assert self.news_service.symbol_registry.refresh()
+        
+        text = "Cổ phiếu SHS, VND tăng; tỷ giá USD/VND ổn định. ABC và FUEVFVND (HOSE) hút tiền, HPG giảm"
+        symbols = self.news_service._extract_stock_symbols(text)
+        assert symbols == ['SHS', 'VND', 'FUEVFVND', 'HPG']
+        
+        # Unlisted 3-letter words and ambiguous tickers without context are dropped
+        assert self.news_service._extract_stock_symbols("Giá USD và VND, ABC biến động") == []
+        
+    def test_enrichment_is_memoised(self):
+        """Test each raw entry runs through the stages once"""
+        calls = []
+        original = self.news_service._symbols_stage
+        self.news_service.enrichment.stages[1] = ('symbols', lambda e: calls.append(e['url']) or original(e))
+        entry = {
+            'source_key': 'cafef', 'source': 'CafeF', 'title': 'VCB tăng trưởng',
+            'summary': '<p>Ngân hàng VCB lợi nhuận tăng</p>', 'url': 'https://cafef.vn/1',
+            'publish_date': datetime(2024, 8, 12, 9, 0)
+        }
+        
+        first = self.news_service.enrichment.enrich(entry)
+        second = self.news_service.enrichment.enrich(dict(entry))
+        changed = self.news_service.enrichment.enrich({**entry, 'summary': 'Khác'})
+        
+        assert first is second
+        assert first.summary == 'Ngân hàng VCB lợi nhuận tăng'
+        assert first.related_symbols == ['VCB']
+        assert first.sentiment == 'positive'
+        assert first.tags == ['cafef', 'VCB']
+        assert changed is not first
+        assert len(calls) == 2
+        assert self.news_service.enrichment.stats()['memo_hits'] == 1
+
+    def test_undated_entries_hit_the_memo(self):
+        """Test an entry without a feed date is enriched once although each poll stamps a new time"""
+        source = self.news_service.news_sources['vnstock']
+        undated = [source._raw_entry('VCB tăng trưởng', 'Tóm tắt', 'https://cafef.vn/2', None) for _ in range(2)]
+        assert undated[0]['publish_date_estimated'] and undated[0]['publish_date'].tzinfo is not None
+
+        first = self.news_service.enrichment.enrich(undated[0])
+        second = self.news_service.enrichment.enrich({**undated[1], 'publish_date': datetime(2030, 1, 1)})
+        assert second is first
+        
     def test_analyze_sentiment_positive(self):
         """Test positive sentiment analysis"""
         title = "VCB tăng mạnh sau kết quả kinh doanh tích cực"
@@ -221,6 +274,138 @@ class TestNewsService:
         assert 'analysis' in category_ids
 
 
+CAFEF_FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>CafeF</title>
+<item><title>VCB tăng mạnh</title><link>https://cafef.vn/news/1</link>
+<description>Ngân hàng VCB có kết quả kinh doanh tích cực</description>
+<pubDate>Mon, 12 Aug 2024 09:00:00 +0700</pubDate></item>
+</channel></rss>"""
+
+EXTRA_FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>NDH</title>
+<item><title>Phố Wall khởi sắc</title><link>https://ndh.vn/quoc-te/pho-wall-3</link>
+<description>Dow Jones hồi phục</description>
+<pubDate>Mon, 12 Aug 2024 11:00:00 +0700</pubDate></item>
+</channel></rss>"""
+
+VNEXPRESS_FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>VnExpress</title>
+<item><title>HPG mở rộng đầu tư</title><link>https://vnexpress.net/news/2</link>
+<description><![CDATA[<a href="#"><img src="x.jpg"></a>Hòa Phát HPG tăng trưởng]]></description>
+<pubDate>Mon, 12 Aug 2024 10:00:00 +0700</pubDate></item>
+</channel></rss>"""
+
+
+class TestNewsServiceAsync:
+    """Concurrent fetching against local stand-in feeds"""
+    
+    def setup_method(self):
+        self.news_service = NewsService()
+        
+    def _client(self, delays):
+        async def handler(request):
+            host = request.url.host
+            await asyncio.sleep(delays.get(host, 0))
+            body = CAFEF_FEED if 'cafef' in host else VNEXPRESS_FEED
+            return httpx.Response(200, content=body.encode('utf-8'))
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        
+    def test_get_all_news_fetches_sources_concurrently(self):
+        """Test /news latency is the slowest source, not the sum"""
+        async def scenario():
+            client = self._client({'cafef.vn': 0.3, 'vnexpress.net': 0.3})
+            started = time.monotonic()
+            response = await self.news_service.get_all_news_async(NewsFilter(limit=10), client=client)
+            await client.aclose()
+            return response, time.monotonic() - started
+            
+        response, elapsed = asyncio.run(scenario())
+        
+        assert elapsed < 0.55
+        assert response.total == 2
+        sources = {a.source for a in response.articles}
+        assert sources == {'CafeF', 'VnExpress'}
+        vnexpress = next(a for a in response.articles if a.source == 'VnExpress')
+        assert '<' not in vnexpress.summary
+        assert 'HPG' in vnexpress.related_symbols
+        
+    def test_slow_source_times_out_without_blocking_others(self):
+        """Test a source exceeding its timeout is dropped"""
+        async def scenario():
+            client = self._client({'cafef.vn': 0.05, 'vnexpress.net': 5})
+            with patch.object(settings, 'NEWS_SOURCE_TIMEOUT_SECONDS', 0.3):
+                started = time.monotonic()
+                articles = await self.news_service.fetch_all_articles_async(client=client)
+            await client.aclose()
+            return articles, time.monotonic() - started
+            
+        articles, elapsed = asyncio.run(scenario())
+        
+        assert elapsed < 1
+        assert [a.source for a in articles] == ['CafeF']
+
+    def test_configured_sources_are_fetched_together(self, tmp_path):
+        """Test a feed added through configuration is fetched concurrently and mapped"""
+        config = tmp_path / 'sources.json'
+        config.write_text(json.dumps([
+            {'key': 'cafef', 'name': 'CafeF', 'rss_url': 'https://cafef.vn/rss'},
+            {'key': 'ndh', 'name': 'NDH', 'rss_url': 'https://ndh.vn/rss',
+             'category_mapping': {'quoc-te': 'international'}}
+        ]), encoding='utf-8')
+        with patch.object(settings, 'NEWS_SOURCES_FILE', str(config)):
+            service = NewsService()
+        
+        async def handler(request):
+            await asyncio.sleep(0.3)
+            body = CAFEF_FEED if 'cafef' in request.url.host else EXTRA_FEED
+            return httpx.Response(200, content=body.encode('utf-8'))
+        
+        async def scenario():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            started = time.monotonic()
+            articles = await service.fetch_all_articles_async(client=client)
+            await client.aclose()
+            return articles, time.monotonic() - started
+        
+        articles, elapsed = asyncio.run(scenario())
+        
+        assert elapsed < 0.55
+        assert sorted(service.news_sources) == ['cafef', 'ndh', 'vnstock']
+        ndh = next(a for a in articles if a.source == 'NDH')
+        assert ndh.category == 'international'
+        assert ndh.tags == ['ndh']
+        
+    def test_incremental_polling_uses_conditional_requests(self):
+        """Test unchanged feeds return 304 and repeated entries are not reparsed"""
+        seen_headers = []
+
+        async def handler(request):
+            if 'cafef' not in request.url.host:
+                return httpx.Response(200, content=VNEXPRESS_FEED.encode('utf-8'))
+            seen_headers.append(request.headers.get('If-None-Match'))
+            if request.headers.get('If-None-Match') == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, content=CAFEF_FEED.encode('utf-8'), headers={'ETag': '"v1"'})
+
+        async def scenario():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            first = await self.news_service.fetch_all_articles_async(client=client, incremental=True)
+            second = await self.news_service.fetch_all_articles_async(client=client, incremental=True)
+            await client.aclose()
+            return first, second
+
+        first, second = asyncio.run(scenario())
+
+        assert seen_headers == [None, '"v1"']
+        assert {a.source for a in first} == {'CafeF', 'VnExpress'}
+        assert second == []
+        stats = self.news_service.feed_stats()
+        assert stats['cafef']['requests'] == 2
+        assert stats['cafef']['not_modified'] == 1
+        assert stats['vnexpress']['not_modified'] == 0
+        assert stats['vnexpress']['new_entries'] == stats['vnexpress']['entries'] / 2
+
+
 # Integration tests
 class TestNewsServiceIntegration:
     
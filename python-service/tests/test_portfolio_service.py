@@ -0,0 +1,78 @@
+"""
+Test module for portfolio valuation
+"""
+from datetime import datetime
+from unittest.mock import patch
+import pandas as pd
+import pytest
+from app.services.portfolio_service import PortfolioService, value_holdings
+
+COLUMNS = ['symbol', 'name', 'quantity', 'avg_price', 'current_price', 'close', 'change', 'trading_date']
+VERSION = (3, datetime(2024, 8, 12, 9, 0), datetime(2024, 8, 12, 15, 0), datetime(2024, 8, 1))
+
+def _holdings(current_price=26.0):
+    return pd.DataFrame([
+        ('FPT', 'FPT Corp', 100, 20.0, current_price, 25.0, 1.0, '2024-08-12'),
+        ('VCB', 'Vietcombank', 200, 90.0, None, 95.0, -1.0, '2024-08-12'),
+        ('HPG', 'Hoa Phat', 50, None, 10.0, 10.0, 0.0, '2024-08-12'),
+    ], columns=COLUMNS)
+
+def test_value_holdings():
+    """Test per-holding and total valuation math"""
+    valuation = value_holdings('p1', _holdings())
+    fpt, vcb, hpg = valuation.holdings
+
+    assert fpt.market_value == 2600 and fpt.unrealized_pnl == 600
+    assert fpt.unrealized_pnl_percent == pytest.approx(30.0)
+    assert fpt.day_change == 100 and fpt.day_change_percent == pytest.approx(100 / 2500 * 100)
+    # No live price yet: valued at the last close
+    assert vcb.price == 95.0 and vcb.unrealized_pnl == 1000
+    # No average cost: priced and weighted but left out of P&L
+    assert hpg.unrealized_pnl is None and hpg.market_value == 500
+
+    assert valuation.market_value == 2600 + 19000 + 500
+    assert sum(h.weight for h in valuation.holdings) == pytest.approx(1.0)
+    assert valuation.cost_basis == 2000 + 18000
+    assert valuation.unrealized_pnl == 1600
+    assert valuation.day_change == 100 - 200
+
+def test_empty_and_missing_portfolios():
+    """Test an empty portfolio values to zero and an unknown one is None"""
+    service = PortfolioService(snapshot_ttl_seconds=60)
+    empty = pd.DataFrame([(None,) * len(COLUMNS)], columns=COLUMNS)
+    with patch('app.services.portfolio_service.db_service.get_portfolio_version', return_value=VERSION), \
+         patch('app.services.portfolio_service.db_service.get_portfolio_holdings', return_value=empty):
+        valuation = service.get_valuation('empty')
+    assert valuation.holdings == [] and valuation.market_value == 0
+
+    with patch('app.services.portfolio_service.db_service.get_portfolio_version', return_value=(0, None, None, None)), \
+         patch('app.services.portfolio_service.db_service.get_portfolio_holdings',
+               return_value=pd.DataFrame(columns=COLUMNS)):
+        assert service.get_valuation('missing') is None
+
+def test_snapshots_refresh_after_sync():
+    """Test snapshots are served until a sync of one of their symbols recomputes them"""
+    service = PortfolioService(snapshot_ttl_seconds=60)
+    with patch('app.services.portfolio_service.db_service.get_portfolio_version', return_value=VERSION), \
+         patch('app.services.portfolio_service.db_service.get_portfolio_holdings',
+               side_effect=[_holdings(26.0), _holdings(30.0)]) as get_holdings:
+        assert service.get_valuation('p1').holdings[0].price == 26.0
+        assert service.get_valuation('p1').holdings[0].price == 26.0
+        assert service.refresh_for_symbols(['MWG']) == 0
+        assert service.refresh_for_symbols(['FPT']) == 1
+        assert service.get_valuation('p1').holdings[0].price == 30.0
+    assert get_holdings.call_count == 2
+
+def test_holding_edits_invalidate_the_snapshot():
+    """Test a holding edited outside this process is valued on the next read"""
+    service = PortfolioService(snapshot_ttl_seconds=60)
+    edited = _holdings()
+    edited.loc[0, 'quantity'] = 300
+    versions = [VERSION, VERSION, VERSION[:1] + (datetime(2024, 8, 12, 10, 0),) + VERSION[2:]]
+    with patch('app.services.portfolio_service.db_service.get_portfolio_version', side_effect=versions), \
+         patch('app.services.portfolio_service.db_service.get_portfolio_holdings',
+               side_effect=[_holdings(), edited]) as get_holdings:
+        assert service.get_valuation('p1').holdings[0].quantity == 100
+        assert service.get_valuation('p1').holdings[0].quantity == 100
+        assert service.get_valuation('p1').holdings[0].quantity == 300
+    assert get_holdings.call_count == 2
@@ -0,0 +1,76 @@
+"""
+Test module for the market-wide price matrix
+"""
+import json
+import os
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from app.services.price_matrix import PriceMatrix, PriceMatrixService
+
+def _history():
+    return pd.DataFrame([
+        ('2024-01-02', 'AAA', 10.0, 100), ('2024-01-03', 'AAA', 11.0, 200), ('2024-01-04', 'AAA', 12.0, 300),
+        ('2024-01-03', 'BBB', 50.0, 10),
+    ], columns=['date', 'symbol', 'close', 'volume'])
+
+def test_matrix_fill_and_in_place_updates():
+    """Test suspended days are filled and syncs write bars without a reload"""
+    matrix = PriceMatrix.from_history(_history(), version=('2024-01-04', 4))
+    assert matrix.data.dtype == np.float32 and matrix.data.shape == (2, 3, 2)
+    np.testing.assert_array_equal(matrix.close[:, 1], [np.nan, 50, 50])
+    np.testing.assert_array_equal(matrix.volume[:, 1], [np.nan, 10, 0])
+
+    # Existing date and symbol: written in place and derived arrays recomputed
+    assert matrix.write_bars('BBB', [{'date': '2024-01-04', 'close': 55.0, 'volume': 20}])
+    assert matrix.close[2, 1] == 55 and matrix.revision == 1
+    # A new session needs the matrix to grow first
+    assert not matrix.write_bars('AAA', [{'date': '2024-01-05', 'close': 13.0, 'volume': 1}])
+    grown = matrix.extended(['2024-01-05'], ['CCC'], start_date='2024-01-03')
+    assert grown.dates == ['2024-01-03', '2024-01-04', '2024-01-05'] and grown.symbols == ['AAA', 'BBB', 'CCC']
+    assert grown.write_bars('AAA', [{'date': '2024-01-05', 'close': 13.0, 'volume': 1}])
+    np.testing.assert_array_equal(grown.close[:, 0], [11, 12, 13])
+    np.testing.assert_array_equal(grown.close[:, 1], [50, 55, 55])
+
+def test_workers_share_memory_mapped_matrix(tmp_path):
+    """Test a second worker maps the published matrix and follows in-place syncs"""
+    writer = PriceMatrixService(400, 0, ['close', 'volume'], mmap_dir=str(tmp_path))
+    reader = PriceMatrixService(400, 0, ['close', 'volume'], mmap_dir=str(tmp_path))
+    with patch('app.services.price_matrix.db_service.get_history_version', return_value=('2024-01-04', 4)), \
+            patch('app.services.price_matrix.db_service.get_history_matrix', return_value=_history()) as load:
+        assert writer.get().symbols == ['AAA', 'BBB']
+        shared = reader.get()
+        assert load.call_count == 1 and isinstance(shared.data, np.memmap)
+        assert shared.close[2, 0] == 12
+
+    with patch('app.services.price_matrix.db_service.get_history_version', return_value=('2024-01-04', 5)):
+        writer.apply_bars('AAA', [{'date': '2024-01-04', 'close': 12.5, 'volume': 400}])
+        # Same pages, new revision: the reader drops its derived arrays without reloading
+        assert reader.get() is shared and shared.close[2, 0] == 12.5
+
+        writer.apply_bars('CCC', [{'date': '2024-01-05', 'close': 7.0, 'volume': 1}])
+        moved = reader.get()
+        assert moved is not shared and moved.symbols == ['AAA', 'BBB', 'CCC'] and moved.close[-1, 2] == 7
+
+def test_stale_worker_writes_into_the_published_file(tmp_path):
+    """Test a worker still mapping a replaced file syncs into the current one with a later revision"""
+    first = PriceMatrixService(400, 0, ['close', 'volume'], mmap_dir=str(tmp_path))
+    second = PriceMatrixService(400, 0, ['close', 'volume'], mmap_dir=str(tmp_path))
+    with patch('app.services.price_matrix.db_service.get_history_version', return_value=('2024-01-04', 4)), \
+            patch('app.services.price_matrix.db_service.get_history_matrix', return_value=_history()) as load:
+        first.get()
+        stale = second.get()
+        assert load.call_count == 1
+
+    with patch('app.services.price_matrix.db_service.get_history_version', return_value=('2024-01-05', 5)):
+        # The first worker grows the matrix into a new file; the second has not checked since
+        first.apply_bars('AAA', [{'date': '2024-01-05', 'close': 13.0, 'volume': 1}])
+        published = first.get()
+        second.apply_bars('BBB', [{'date': '2024-01-05', 'close': 52.0, 'volume': 5}])
+
+    files = [name for name in os.listdir(tmp_path) if name.endswith('.npy')]
+    with open(tmp_path / 'prices.json') as f:
+        manifest = json.load(f)
+    assert files == [published.file] == [manifest['file']] and stale.file != published.file
+    assert manifest['revision'] == published.revision + 1
+    assert published.close[-1].tolist() == [13, 52]
@@ -0,0 +1,97 @@
+"""
+Test module for the realtime quote hub
+"""
+import asyncio
+import pytest
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from app.models import StockPrice
+from app.services.realtime_service import QuoteHub, is_trading_session
+
+def _quote(symbol, price, volume=1000):
+    return StockPrice(
+        symbol=symbol, price=price, change=0, change_percent=0, volume=volume,
+        high=price, low=price, open=price, close=price, trading_date='2024-08-12'
+    )
+
+class FakeBoard:
+    def __init__(self):
+        self.prices = {'VCB': 90.0, 'FPT': 120.0}
+        self.calls = []
+
+    def __call__(self, symbols):
+        self.calls.append(sorted(symbols))
+        return {s: _quote(s, self.prices[s]) for s in symbols if s in self.prices}
+
+def test_is_trading_session():
+    """Test HOSE session detection in market time"""
+    tz = ZoneInfo("Asia/Ho_Chi_Minh")
+    assert is_trading_session(datetime(2024, 8, 12, 10, 0, tzinfo=tz))
+    assert not is_trading_session(datetime(2024, 8, 12, 12, 0, tzinfo=tz))
+    assert not is_trading_session(datetime(2024, 8, 10, 10, 0, tzinfo=tz))  # Saturday
+
+def test_one_batched_poll_for_many_clients():
+    """Test distinct symbols are polled once regardless of client count"""
+    async def scenario():
+        board = FakeBoard()
+        hub = QuoteHub(board, poll_interval=60, market_hours_only=False)
+        hub._ensure_poller = lambda: None  # drive polls explicitly
+        first = hub.subscribe(['vcb', 'FPT'])
+        second = hub.subscribe(['VCB'])
+        await hub.poll_once()
+
+        assert board.calls[-1] == ['FPT', 'VCB']
+        message = await first.get()
+        assert set(message['data']) == {'FPT', 'VCB'}
+        message = await second.get()
+        assert set(message['data']) == {'VCB'}
+
+        # Unchanged quotes are not pushed; changed ones push only the delta
+        board.prices['VCB'] = 91.0
+        await hub.poll_once()
+        message = await second.get()
+        assert message['type'] == 'delta'
+        assert set(message['data']['VCB']) == {'price', 'close', 'high', 'low', 'open'}
+        assert first.queue.qsize() == 1
+        assert second.queue.empty()
+
+        hub.unsubscribe(first)
+        hub.unsubscribe(second)
+        assert hub.symbols == []
+
+    asyncio.run(scenario())
+
+def test_late_subscriber_gets_snapshot():
+    """Test a new client receives cached quotes without another upstream call"""
+    async def scenario():
+        board = FakeBoard()
+        hub = QuoteHub(board, poll_interval=60, market_hours_only=False)
+        hub._ensure_poller = lambda: None  # drive polls explicitly
+        hub.subscribe(['VCB'])
+        await hub.poll_once()
+        calls = len(board.calls)
+
+        late = hub.subscribe(['VCB'])
+        message = await late.get()
+        assert message['type'] == 'snapshot'
+        assert message['data']['VCB']['price'] == 90.0
+        assert len(board.calls) == calls
+
+    asyncio.run(scenario())
+
+def test_symbols_are_validated_and_capped():
+    """Test non-ticker input and lists over the per-connection cap leave a client unchanged"""
+    async def scenario():
+        hub = QuoteHub(FakeBoard(), poll_interval=60, market_hours_only=False, max_symbols=2)
+        hub._ensure_poller = lambda: None
+        client = hub.subscribe([' vcb', ''])
+        for symbols in ('FPT', [None], ['VCB;FPT'], ['FPT', 'HPG']):
+            with pytest.raises(ValueError):
+                hub.add_symbols(client, symbols)
+        assert client.symbols == {'VCB'} and hub.symbols == ['VCB']
+
+        with pytest.raises(ValueError):
+            hub.subscribe(['A', 'B', 'C'])
+        assert hub.stats()['subscribers'] == 1
+
+    asyncio.run(scenario())
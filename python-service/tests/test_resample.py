@@ -0,0 +1,66 @@
+"""
+Test module for OHLCV resampling
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from app.utils.resample import can_derive, resample_bars
+
+def _minute_bars(start, periods):
+    times = pd.date_range(start, periods=periods, freq='1min')
+    prices = np.arange(periods, dtype=float) + 100
+    return pd.DataFrame({
+        'time': times,
+        'open': prices,
+        'high': prices + 0.5,
+        'low': prices - 0.5,
+        'close': prices + 0.25,
+        'volume': np.full(periods, 10)
+    })
+
+def test_can_derive():
+    """Test which intervals can be built from which"""
+    assert can_derive('1m', '15m')
+    assert can_derive('5m', '1H')
+    assert not can_derive('15m', '5m')
+    assert can_derive('15m', '1H')
+    assert not can_derive('30m', '15m')
+    assert can_derive('1m', '1D')
+    assert can_derive('1D', '1W')
+    assert not can_derive('1D', '1H')
+
+def test_resample_minutes_to_hour():
+    """Test 1m bars aggregate into aligned hourly OHLCV"""
+    bars = _minute_bars('2024-08-12 09:00', 90)
+    hourly = resample_bars(bars, '1H', source_interval='1m')
+
+    assert list(hourly['time'].dt.strftime('%H:%M')) == ['09:00', '10:00']
+    first = hourly.iloc[0]
+    assert first['open'] == 100
+    assert first['close'] == 159.25
+    assert first['high'] == 159.5
+    assert first['low'] == 99.5
+    assert first['volume'] == 600
+    assert hourly.iloc[1]['volume'] == 300
+
+def test_resample_daily_to_week_and_month():
+    """Test weekly buckets start on Monday and monthly on the 1st"""
+    days = pd.bdate_range('2024-07-29', '2024-08-09')
+    bars = pd.DataFrame({
+        'time': days, 'open': 1.0, 'high': np.arange(len(days)) + 2.0,
+        'low': 0.5, 'close': 1.5, 'volume': 100
+    })
+
+    weekly = resample_bars(bars, '1W', source_interval='1D')
+    assert list(weekly['time'].dt.strftime('%Y-%m-%d')) == ['2024-07-29', '2024-08-05']
+    assert list(weekly['volume']) == [500, 500]
+    assert list(weekly['high']) == [6.0, 11.0]
+
+    monthly = resample_bars(bars, '1M', source_interval='1D')
+    assert list(monthly['time'].dt.strftime('%Y-%m-%d')) == ['2024-07-01', '2024-08-01']
+    assert list(monthly['volume']) == [300, 700]
+
+def test_resample_rejects_finer_target():
+    """Test deriving a finer interval is refused"""
+    with pytest.raises(ValueError):
+        resample_bars(_minute_bars('2024-08-12 09:00', 10), '5m', source_interval='15m')
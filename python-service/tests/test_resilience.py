@@ -0,0 +1,156 @@
+"""
+Test module for upstream resilience helpers
+"""
+import asyncio
+import time
+import pytest
+from app.services.resilience import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceededError,
+    get_breaker, guarded_async, guarded_call, guarded_gather, remaining_budget, request_budget
+)
+
+def test_guarded_call_returns_result():
+    """Test successful guarded call passes arguments through"""
+    assert guarded_call('test.ok', lambda a, b=0: a + b, 1, b=2) == 3
+    assert get_breaker('test.ok').state == CircuitBreaker.CLOSED
+
+def test_guarded_call_times_out():
+    """Test hung upstream call is abandoned after its deadline"""
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceededError):
+        guarded_call('test.slow', time.sleep, 1.0, timeout=0.05)
+    assert time.monotonic() - started < 0.5
+
+def test_request_budget_caps_call_timeout():
+    """Test per-call timeout is capped by the remaining request budget"""
+    started = time.monotonic()
+    with request_budget(0.1):
+        with pytest.raises(DeadlineExceededError):
+            guarded_call('test.budget', time.sleep, 1.0, timeout=5)
+    assert time.monotonic() - started < 0.5
+
+def test_nested_budget_only_shrinks():
+    """Test inner budget cannot extend the outer deadline"""
+    with request_budget(1):
+        with request_budget(60):
+            assert remaining_budget() <= 1
+    assert remaining_budget() is None
+
+def test_budget_exhausted_fails_before_calling():
+    """Test nested call is not started once the budget is spent"""
+    calls = []
+    with request_budget(0):
+        with pytest.raises(DeadlineExceededError):
+            guarded_call('test.exhausted', calls.append, 1)
+    assert calls == []
+
+def test_circuit_opens_and_fails_fast():
+    """Test breaker opens after threshold failures and rejects calls"""
+    breaker = get_breaker('test.flaky')
+    breaker.failure_threshold = 2
+    breaker.reset_timeout = 60
+
+    def fail():
+        raise ConnectionError("upstream down")
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            guarded_call('test.flaky', fail)
+
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        guarded_call('test.flaky', calls.append, 1)
+    assert calls == []
+    snapshot = breaker.snapshot()
+    assert snapshot["state"] == CircuitBreaker.OPEN
+    assert snapshot["total_rejected"] == 1
+
+def test_circuit_half_open_trial():
+    """Test breaker closes again after a successful half-open trial"""
+    breaker = CircuitBreaker('test.trial', failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert not breaker.allow_request()
+
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    # Only one probe while half-open
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_guarded_gather_runs_concurrently():
+    """Test gathered calls share one deadline and return exceptions in place"""
+    def slow(value):
+        time.sleep(0.2)
+        return value
+
+    def fail():
+        raise ValueError("bad payload")
+
+    started = time.monotonic()
+    results = guarded_gather(
+        ('test.gather_a', lambda: slow('a')),
+        ('test.gather_b', lambda: slow('b')),
+        ('test.gather_c', fail)
+    )
+    assert time.monotonic() - started < 0.35
+    assert results[:2] == ['a', 'b']
+    assert isinstance(results[2], ValueError)
+
+def test_guarded_async_counts_server_errors_and_releases_cancelled_trials():
+    """Test a classified error response trips the breaker and cancellation frees the half-open probe"""
+    breaker = get_breaker('test.async')
+    breaker.failure_threshold = 1
+    breaker.reset_timeout = 0.05
+
+    async def respond(status):
+        return status
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    def classify(status):
+        return ConnectionError(f"HTTP {status}") if status >= 500 else None
+
+    async def scenario():
+        assert await guarded_async('test.async', lambda: respond(404), classify=classify) == 404
+        with pytest.raises(ConnectionError):
+            await guarded_async('test.async', lambda: respond(503), classify=classify)
+        assert breaker.state == CircuitBreaker.OPEN
+
+        await asyncio.sleep(0.06)
+        probe = asyncio.create_task(guarded_async('test.async', hang))
+        await asyncio.sleep(0.01)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        # The cancelled probe gave no verdict, so the next call may probe again
+        return await guarded_async('test.async', lambda: respond(200), classify=classify)
+
+    assert asyncio.run(scenario()) == 200
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_data_errors_do_not_count_as_failures():
+    """Test provider 'no data' errors leave the circuit closed while outages still open it"""
+    breaker = get_breaker('test.data_errors')
+    breaker.failure_threshold = 2
+    breaker.reset_timeout = 60
+
+    def unknown_ticker():
+        raise ValueError("Không tìm thấy dữ liệu")
+
+    def down():
+        raise ConnectionError("upstream down")
+
+    for _ in range(5):
+        with pytest.raises(ValueError):
+            guarded_call('test.data_errors', unknown_ticker)
+    assert guarded_gather(('test.data_errors', unknown_ticker))[0].__class__ is ValueError
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    # A caller may count its own errors, and transport errors always count
+    with pytest.raises(ValueError):
+        guarded_call('test.data_errors', unknown_ticker, is_failure=lambda e: True)
+    with pytest.raises(ConnectionError):
+        guarded_call('test.data_errors', down)
+    assert breaker.state == CircuitBreaker.OPEN
@@ -0,0 +1,162 @@
+"""
+Test module for portfolio risk analytics
+"""
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import pytest
+from app.models import HoldingValuation, OptimizeRequest, PortfolioValuation
+from app.services.risk_service import RiskService
+from app.utils import optimize, risk
+
+def test_risk_measures():
+    """Test risk measures against hand-computed values"""
+    rng = np.random.default_rng(7)
+    returns = rng.normal(0.0005, 0.01, size=(500, 3))
+    weights = np.array([0.5, 0.3, 0.2])
+
+    cov = risk.covariance(returns)
+    assert cov == pytest.approx(np.cov(returns.T) * 252)
+    assert risk.portfolio_volatility(weights, cov) == pytest.approx(np.std(returns @ weights, ddof=1) * np.sqrt(252))
+    assert risk.risk_contributions(weights, cov).sum() == pytest.approx(1.0)
+    assert np.diag(risk.correlation(cov)) == pytest.approx(np.ones(3))
+
+    # An asset that is twice the benchmark has beta 2
+    assert risk.betas(returns[:, :1] * 2, returns[:, 0]) == pytest.approx([2.0])
+
+    var, cvar = risk.historical_var_cvar(returns @ weights, 0.95)
+    assert 0 < var < cvar
+    var, cvar = risk.parametric_var_cvar(returns @ weights, 0.95)
+    assert 0 < var < cvar
+
+    assert risk.max_drawdown(np.array([0.1, -0.5, 0.2])) == pytest.approx(0.5)
+    assert risk.max_drawdown(np.array([-0.2, 0.1])) == pytest.approx(0.2)
+
+def test_returns_matrix_aligns_symbols():
+    """Test suspended days are carried forward and pre-listing dates dropped"""
+    prices = pd.DataFrame({'A': [10.0, 11.0, None, 12.1], 'B': [None, 20.0, 22.0, 22.0]},
+                          index=['2024-08-09', '2024-08-12', '2024-08-13', '2024-08-14'])
+    returns = risk.returns_matrix(prices)
+    assert list(returns.index) == ['2024-08-13', '2024-08-14']
+    assert returns['A'].tolist() == pytest.approx([0.0, 0.1])
+    assert returns['B'].tolist() == pytest.approx([0.1, 0.0])
+
+def _history():
+    dates = pd.bdate_range('2024-01-01', periods=120).strftime('%Y-%m-%d')
+    rng = np.random.default_rng(3)
+    market = np.cumprod(1 + rng.normal(0, 0.01, len(dates))) * 1200
+    rows = []
+    for symbol, scale in (('VNINDEX', 1.0), ('FPT', 1.5), ('VCB', 0.5)):
+        closes = market ** scale
+        rows += [(d, symbol, c) for d, c in zip(dates, closes)]
+    return pd.DataFrame(rows, columns=['date', 'symbol', 'close'])
+
+def test_portfolio_risk_uses_cached_returns():
+    """Test portfolio risk and the returns cache keyed by history version"""
+    service = RiskService(benchmark='VNINDEX', cache_ttl_seconds=60)
+    valuation = PortfolioValuation(
+        portfolio_id='p1', market_value=300, cost_basis=0, unrealized_pnl=0, day_change=0, as_of='2024-06-14T15:00:00',
+        holdings=[HoldingValuation(symbol='FPT', quantity=1, market_value=100),
+                  HoldingValuation(symbol='VCB', quantity=1, market_value=200),
+                  HoldingValuation(symbol='MWG', quantity=1, market_value=None)]
+    )
+    with patch('app.services.risk_service.portfolio_service.get_valuation', return_value=valuation), \
+         patch('app.services.risk_service.db_service.get_history_version', return_value=('2024-06-14', 360, '2024-06-14 15:30')), \
+         patch('app.services.risk_service.db_service.get_close_history', return_value=_history()) as history:
+        result = service.analyze_portfolio('p1', window=60)
+        again = service.analyze_portfolio('p1', window=60)
+
+    assert history.call_count == 1
+    assert again == result
+    assert result.observations == 60
+    assert [h.symbol for h in result.holdings] == ['FPT', 'VCB']
+    assert [h.weight for h in result.holdings] == pytest.approx([1 / 3, 2 / 3])
+    # Log-linear prices: betas close to their exponents
+    assert [h.beta for h in result.holdings] == pytest.approx([1.5, 0.5], abs=0.05)
+    assert result.beta == pytest.approx(1.5 / 3 + 0.5 * 2 / 3, abs=0.05)
+    assert result.correlation[0][1] == pytest.approx(1.0, abs=0.01)
+    assert result.missing_symbols == []
+
+def test_optimizers():
+    """Test optimiser weights satisfy their optimality conditions"""
+    rng = np.random.default_rng(11)
+    factors = rng.normal(0, 0.01, size=(250, 2))
+    returns = factors @ rng.normal(1, 0.5, size=(2, 30)) + rng.normal(0.0005, 0.015, size=(250, 30))
+    cov = risk.covariance(returns)
+    mu = returns.mean(axis=0) * 252
+
+    # Minimum variance: equal marginal variance on every asset strictly inside the bounds
+    weights = optimize.min_variance_weights(cov, 0.0, 0.1)
+    assert weights.sum() == pytest.approx(1.0) and weights.min() >= 0 and weights.max() <= 0.1 + 1e-9
+    marginal = cov @ weights
+    inside = (weights > 1e-6) & (weights < 0.1 - 1e-6)
+    assert np.ptp(marginal[inside]) < 1e-8
+
+    # Risk parity: equal risk contributions
+    parity = optimize.risk_parity_weights(cov)
+    assert risk.risk_contributions(parity, cov) == pytest.approx(np.full(30, 1 / 30))
+
+    # Frontier: a batched solve matches one-at-a-time solves and trades risk for return
+    gammas = optimize.frontier_risk_aversions(mu, cov, 8)
+    frontier = optimize.mean_variance_weights(mu, cov, gammas, 0.0, 0.2)
+    assert frontier[3] == pytest.approx(optimize.mean_variance_weights(mu, cov, gammas[3], 0.0, 0.2)[0], abs=1e-6)
+    expected, volatility, _ = optimize.performance(frontier, mu, cov)
+    assert np.all(np.diff(expected) >= -1e-9) and np.all(np.diff(volatility) >= -1e-9)
+
+    with pytest.raises(ValueError):
+        optimize.min_variance_weights(cov, 0.0, 0.01)
+
+def test_optimize_request():
+    """Test the optimisation service over cached stored returns"""
+    service = RiskService(benchmark='VNINDEX', cache_ttl_seconds=60)
+    with patch('app.services.risk_service.db_service.get_history_version', return_value=('2024-06-14', 360, '2024-06-14 15:30')), \
+         patch('app.services.risk_service.db_service.get_close_history', return_value=_history()):
+        result = service.optimize(OptimizeRequest(symbols=['fpt', 'vcb', 'mwg'], method='min_variance',
+                                                  window=60, frontier_points=5))
+        with pytest.raises(ValueError):
+            service.optimize(OptimizeRequest(symbols=['FPT'], method='max_return'))
+
+    assert [a.symbol for a in result.allocations] == ['FPT', 'VCB']
+    assert sum(a.weight for a in result.allocations) == pytest.approx(1.0)
+    assert result.missing_symbols == ['MWG']
+    assert len(result.frontier) == 5
+    # The low-volatility asset dominates the minimum-variance portfolio
+    assert result.allocations[1].weight > 0.9
+
+def test_short_history_is_reported_not_truncating_the_window():
+    """Test a symbol listed for part of the window is left out instead of shrinking it"""
+    history = _history()
+    dates = sorted(history['date'].unique())
+    listed = pd.DataFrame({'date': dates[-10:], 'symbol': 'NEW', 'close': np.linspace(10, 11, 10)})
+    history = pd.concat([history, listed], ignore_index=True)
+    service = RiskService(benchmark='VNINDEX', cache_ttl_seconds=60)
+    versions = [('2024-06-14', 370, '2024-06-14 15:30'), ('2024-06-14', 370, '2024-06-14 16:00')]
+    with patch('app.services.risk_service.db_service.get_history_version', side_effect=versions), \
+         patch('app.services.risk_service.db_service.get_close_history', return_value=history) as load:
+        result = service.optimize(OptimizeRequest(symbols=['FPT', 'VCB', 'NEW'], window=60))
+        # A corrected bar keeps the date and row count but still invalidates the cached matrix
+        service.optimize(OptimizeRequest(symbols=['FPT', 'VCB', 'NEW'], window=60))
+
+    assert load.call_count == 2
+    assert result.observations == 60
+    assert [a.symbol for a in result.allocations] == ['FPT', 'VCB']
+    assert result.missing_symbols == ['NEW']
+
+def test_risk_parity_drops_flat_assets_and_rejects_bounds():
+    """Test risk parity leaves out zero-variance assets and refuses weight bounds"""
+    history = _history()
+    dates = sorted(history['date'].unique())
+    flat = pd.DataFrame({'date': dates, 'symbol': 'HALT', 'close': 25.0})
+    history = pd.concat([history, flat], ignore_index=True)
+    service = RiskService(benchmark='VNINDEX', cache_ttl_seconds=60)
+    with patch('app.services.risk_service.db_service.get_history_version', return_value=('2024-06-14', 480, '2024-06-14 15:30')), \
+         patch('app.services.risk_service.db_service.get_close_history', return_value=history):
+        result = service.optimize(OptimizeRequest(symbols=['FPT', 'VCB', 'HALT'], method='risk_parity', window=60))
+        with pytest.raises(ValueError):
+            service.optimize(OptimizeRequest(symbols=['FPT', 'VCB'], method='risk_parity', window=60, max_weight=0.6))
+
+    assert [a.symbol for a in result.allocations] == ['FPT', 'VCB']
+    assert result.missing_symbols == ['HALT']
+    assert [a.risk_contribution for a in result.allocations] == pytest.approx([0.5, 0.5])
+    with pytest.raises(ValueError):
+        optimize.risk_parity_weights(np.diag([0.04, 0.0]))
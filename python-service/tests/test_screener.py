@@ -0,0 +1,88 @@
+"""
+Test module for the stock screener
+"""
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import pytest
+from app.models import ScreenerRequest
+from app.services.price_matrix import PriceMatrix
+from app.services.screener_service import FUNDAMENTAL_COLUMNS, ScreenerService
+from app.utils import expressions, indicators
+from app.utils.expressions import ExpressionError
+
+def test_expression_sql_and_three_valued_logic():
+    """Test parsing, SQL pushdown and NULL semantics matching SQL"""
+    node = expressions.parse("pe < 12 and (roe >= 15 or exchange = 'HOSE') and not pb > 2 * eps")
+    assert [expressions.unparse(t) for t in expressions.conjuncts(node)][0] == 'pe < 12'
+
+    params = {}
+    sql = expressions.to_sql(node, FUNDAMENTAL_COLUMNS, params)
+    assert sql.startswith('((s.pe < %(p0)s) AND ')
+    assert params == {'p0': 12.0, 'p1': 15.0, 'p2': 'HOSE', 'p3': 2.0}
+
+    data = {'pe': np.array([10, 10, np.nan, 20.0]), 'roe': np.array([20, np.nan, 20, 20.0])}
+    truth = expressions.evaluate(expressions.parse('pe < 12 and roe > 15'), data.get, 4)
+    np.testing.assert_array_equal(truth, [1, np.nan, np.nan, 0])
+    # not(unknown) stays unknown, as in SQL
+    truth = expressions.evaluate(expressions.parse('not roe > 15'), data.get, 4)
+    assert np.isnan(truth[1]) and truth[0] == 0
+
+    for bad in ('pe <', 'pe 12', 'pe < 12 and', "exchange > 'HOSE'", 'pe + exchange > 1', '(pe < 1) + 2 > 1'):
+        with pytest.raises(ExpressionError):
+            expressions.check(expressions.parse(bad), {'exchange'})
+
+def test_indicators_match_pandas():
+    """Test vectorised indicators against per-symbol pandas references"""
+    rng = np.random.default_rng(3)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.02, (120, 3)), axis=0)
+    close[:50, 2] = np.nan  # listed later
+
+    for column in range(3):
+        series = pd.Series(close[:, column]).dropna()
+        assert indicators.sma(close, 20)[column] == pytest.approx(series.iloc[-20:].mean())
+        delta = series.diff().dropna()
+        gain = delta.clip(lower=0)
+        loss = -delta.clip(upper=0)
+        average_gain, average_loss = gain.iloc[:14].mean(), loss.iloc[:14].mean()
+        for g, l in zip(gain.iloc[14:], loss.iloc[14:]):
+            average_gain = (average_gain * 13 + g) / 14
+            average_loss = (average_loss * 13 + l) / 14
+        assert indicators.rsi(close, 14)[column] == pytest.approx(100 - 100 / (1 + average_gain / average_loss))
+
+    # Too little history is unknown, not zero
+    assert np.isnan(indicators.sma(close, 100)[2]) and not np.isnan(indicators.sma(close, 100)[0])
+    assert np.isnan(indicators.ema(close[:60], 20)[2])
+
+def test_screen_pushes_down_fundamentals_and_ranks():
+    """Test SQL receives only fundamental terms and technical ones filter the rows"""
+    stocks = pd.DataFrame({'symbol': ['AAA', 'BBB', 'CCC'], 'name': ['A', 'B', 'C']})
+    for name in FUNDAMENTAL_COLUMNS:
+        stocks[name] = None
+    stocks['pe'] = [8.0, 10.0, 9.0]
+    stocks['market_cap'] = [100.0, 300.0, 200.0]
+    dates = [f'2024-01-{d:02d}' for d in range(1, 11)]
+    history = pd.DataFrame(
+        [(d, 'AAA', 10.0 + i, 1000) for i, d in enumerate(dates)]
+        + [(d, 'BBB', 20.0 - i, 1000) for i, d in enumerate(dates)]
+        + [(d, 'CCC', 5.0 + i, 500) for i, d in enumerate(dates) if i != 4],
+        columns=['date', 'symbol', 'close', 'volume']
+    )
+    matrix = PriceMatrix.from_history(history, version=('2024-01-10', 29))
+    assert matrix.volume[4, 2] == 0 and matrix.close[4, 2] == matrix.close[3, 2]
+
+    with patch('app.services.screener_service.db_service.screen_stocks', return_value=stocks) as screen, \
+            patch('app.services.screener_service.price_matrix_service.get', return_value=matrix):
+        service = ScreenerService()
+        response = service.screen(ScreenerRequest(expression='pe < 12 and close > sma5'))
+        assert response.pushed_down == ['pe < 12']
+        assert screen.call_args[0][1] == '(s.pe < %(p0)s)'
+        # BBB is falling; CCC ranks above AAA by market cap
+        assert [r.symbol for r in response.results] == ['CCC', 'AAA']
+        assert response.results[0].values['close'] == 14.0 and response.as_of == '2024-01-10'
+
+        response = service.screen(ScreenerRequest(expression='ret5 > -100', sort_by='ret5', descending=False))
+        assert [r.symbol for r in response.results] == ['BBB', 'AAA', 'CCC']
+
+        with pytest.raises(ExpressionError):
+            service.screen(ScreenerRequest(expression='foo > 1'))
@@ -0,0 +1,51 @@
+"""
+Test module for embedded full-text news search
+"""
+from datetime import datetime, timedelta
+from app.models import NewsArticle
+from app.services.news_index import NewsIndex
+from app.utils.text_search import TextIndex, fold, parse_query
+
+def test_fold_strips_vietnamese_diacritics():
+    """Test folding lower-cases and removes tone marks and đ"""
+    assert fold('Lãi suất Đà Nẵng TĂNG') == 'lai suat da nang tang'
+    assert parse_query('"lãi suất" ngân hàng') == [['lai', 'suat'], ['ngan'], ['hang']]
+
+def test_search_terms_phrases_and_ranking():
+    """Test AND semantics, phrase adjacency and title weighting"""
+    index = TextIndex()
+    index.add(1, 'Ngân hàng giảm lãi suất', 'Nhiều ngân hàng thông báo giảm lãi suất cho vay')
+    index.add(2, 'Thị trường chứng khoán', 'Lãi suất liên ngân hàng tăng nhẹ')
+    index.add(3, 'Giá vàng', 'Suất đầu tư, lãi gộp')
+
+    ranked, total = index.search('lai suat')
+    assert total == 3
+    assert ranked[0][0] == 1  # title hit plus repeated body hits
+
+    ranked, total = index.search('"lãi suất" "ngân hàng"')
+    assert sorted(doc_id for doc_id, _ in ranked) == [1, 2]
+
+    assert index.search('lai suat vang')[1] == 1
+    assert index.search('khong co')[1] == 0
+
+    index.remove(1)
+    assert [doc_id for doc_id, _ in index.search('"giam lai suat"')[0]] == []
+
+def test_news_index_search_follows_articles():
+    """Test the news index keeps full-text search in step with adds and evictions"""
+    base = datetime(2024, 8, 12, 9, 0)
+    articles = [
+        NewsArticle(
+            id=f'id{n}', title=title, summary='', url=f'https://example.com/{n}', source='CafeF',
+            publish_date=base + timedelta(minutes=n), related_symbols=[], tags=[]
+        )
+        for n, title in enumerate(['Hòa Phát lãi kỷ lục', 'Vietcombank tăng vốn', 'Hòa Phát mở rộng Dung Quất'])
+    ]
+    index = NewsIndex(max_articles=2)
+    index.load(articles[:2], complete=True)
+    assert [a.id for a in index.search('hoa phat').articles] == ['id0']
+
+    index.add(articles[2:])  # evicts id0
+    response = index.search('hoa phat')
+    assert [a.id for a in response.articles] == ['id2']
+    assert response.total == 1
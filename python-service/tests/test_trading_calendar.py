@@ -0,0 +1,70 @@
+"""
+Test module for the HOSE/HNX trading calendar
+"""
+import json
+from datetime import datetime, timezone
+from unittest.mock import patch
+from app.services.news_sentiment import session_date
+from app.services import trading_calendar as module
+from app.services.trading_calendar import DEFAULT_HOLIDAYS, TradingCalendar, load_holidays, trading_calendar
+
+def test_sessions_skip_weekends_and_tet():
+    """Test date <-> session lookups across the 2024 Tet closure"""
+    calendar = trading_calendar
+    assert calendar.sessions('2024-02-06', '2024-02-16') == ['2024-02-06', '2024-02-07', '2024-02-15', '2024-02-16']
+    assert not calendar.is_session('2024-02-12') and calendar.is_session('2024-02-15')
+
+    numbers = calendar.index(['2024-02-07', '2024-02-10', '2024-02-15'])
+    # Consecutive sessions across the closure; a closed day maps to the next session
+    assert numbers[2] - numbers[0] == 1 and numbers[1] == numbers[2]
+    assert calendar.session(numbers[:1]) == ['2024-02-07']
+
+    assert calendar.previous_session('2024-02-12') == '2024-02-07'
+    assert calendar.next_session('2024-02-15', inclusive=False) == '2024-02-16'
+    assert calendar.window_start(3, '2024-02-16') == '2024-02-07'
+    assert calendar.count('2024-02-01', '2024-02-29') == 16
+
+    # Evening news on the eve of Tet counts for the first session after it
+    assert session_date(datetime(2024, 2, 7, 10, 0)) == '2024-02-15'
+
+def test_gaps_and_alignment():
+    """Test missing sessions are found and unknown trading days get their own row"""
+    dates = ['2024-08-12', '2024-08-14', '2024-08-19']
+    assert trading_calendar.missing_sessions(dates) == ['2024-08-13', '2024-08-15', '2024-08-16']
+    assert trading_calendar.missing_sessions(dates, end='2024-08-20')[-1] == '2024-08-20'
+
+    grid, rows = trading_calendar.align(['2024-08-14', '2024-08-12', '2024-08-17', '2024-08-14'])
+    assert grid == ['2024-08-12', '2024-08-13', '2024-08-14', '2024-08-15', '2024-08-16', '2024-08-17']
+    assert rows.tolist() == [2, 0, 5, 2]
+
+def test_holidays_file_replaces_a_year(tmp_path):
+    """Test a holidays file overrides built-in years and unlisted years get fixed holidays"""
+    path = tmp_path / 'holidays.json'
+    path.write_text(json.dumps({'2027': ['2027-02-05', '2027-02-08']}))
+    calendar = TradingCalendar(load_holidays(str(path)))
+    assert not calendar.is_session('2027-02-08') and calendar.is_session('2027-02-09')
+    # 2031-09-02 is a Tuesday; 2032-05-01 is a Saturday, observed on Monday
+    assert not calendar.is_session('2031-09-02') and not calendar.is_session('2032-05-03')
+
+def test_market_now_is_naive_vn_time():
+    """Test market time is the naive VN wall clock the bars are stored in"""
+
+    utc_now = datetime(2024, 8, 13, 20, 30, tzinfo=timezone.utc)
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return utc_now.astimezone(tz) if tz else utc_now.replace(tzinfo=None)
+
+    with patch.object(module, 'datetime', FrozenDatetime):
+        now = module.market_now()
+    assert now.tzinfo is None and now == datetime(2024, 8, 14, 3, 30)
+
+def test_unlisted_past_years_are_not_reported_as_gaps():
+    """Test lunar closures are listed for the 10Y history and earlier years are left out of gap checks"""
+    assert trading_calendar.sessions('2018-02-13', '2018-02-21') == ['2018-02-13', '2018-02-21']
+    assert str(trading_calendar.known_from) <= trading_calendar.window_start(2500, '2026-10-16')
+
+    calendar = TradingCalendar({'2024': DEFAULT_HOLIDAYS['2024']})
+    # Tet 2023 is unknown to this calendar, so January 2023 cannot have gaps
+    assert calendar.missing_sessions(['2023-01-03', '2024-01-03']) == ['2024-01-02']
@@ -1,8 +1,12 @@
 """
 Test module for VNStock service
 """
+import time
 import pytest
-from app.services.vnstock_service import vnstock_service
+import pandas as pd
+from unittest.mock import patch, MagicMock
+from app.services.resilience import CircuitBreaker, get_breaker
+from app.services.vnstock_service import vnstock_service, VNStockService
 
 def test_get_stock_price():
     """Test getting stock price"""
@@ -28,3 +32,100 @@ def test_get_market_indices():
     """Test getting market indices"""
     # This would test the get_market_indices method
     pass
+
+def _slow_company(delay):
+    def factory(symbol, source):
+        time.sleep(delay)
+        company = MagicMock()
+        company.overview.return_value = pd.DataFrame([{
+            'company_name': 'Vietcombank', 'exchange': 'HOSE', 'sector': 'Banks', 'industry': 'Banks'
+        }])
+        return company
+    return factory
+
+def _slow_finance(delay, calls):
+    def factory(symbol, source):
+        calls.append(symbol)
+        finance = MagicMock()
+        def ratio(**kwargs):
+            time.sleep(delay)
+            return pd.DataFrame([{'pe': 12.5, 'pb': 2.1, 'roe': 18.0}])
+        finance.ratio.side_effect = ratio
+        return finance
+    return factory
+
+def test_get_stock_info_fans_out_and_caches_ratios():
+    """Test overview and ratios are fetched concurrently and ratios are cached"""
+    service = VNStockService()
+    finance_calls = []
+
+    with patch('app.services.vnstock_service.Company', side_effect=_slow_company(0.2)), \
+         patch('app.services.vnstock_service.Finance', side_effect=_slow_finance(0.2, finance_calls)):
+        started = time.monotonic()
+        info = service.get_stock_info('VCB')
+        elapsed = time.monotonic() - started
+
+        assert info is not None
+        assert info.company_name == 'Vietcombank'
+        assert info.pe == 12.5
+        assert elapsed < 0.35  # max(), not sum()
+
+        # Second request only needs the overview
+        info = service.get_stock_info('VCB')
+        assert info.roe == 18.0
+        assert finance_calls == ['VCB']
+
+def test_get_market_indices_batches_board_and_falls_back_concurrently():
+    """Test indices use one price board call and concurrent history fallback"""
+    service = VNStockService()
+    board = pd.DataFrame([['VNINDEX', 1280.5, 4.5, 0.35, 650000000]])
+    board.columns = pd.MultiIndex.from_tuples([
+        ('listing', 'symbol'), ('match', 'match_price'), ('match', 'price_change'),
+        ('match', 'change_percent'), ('match', 'accumulated_volume')
+    ])
+    trading = MagicMock()
+    trading.price_board.return_value = board
+
+    def slow_quote(symbol, source):
+        quote = MagicMock()
+        def history(**kwargs):
+            time.sleep(0.2)
+            return pd.DataFrame([
+                {'time': '2024-08-09', 'close': 100.0, 'volume': 10},
+                {'time': '2024-08-12', 'close': 102.0, 'volume': 20}
+            ])
+        quote.history.side_effect = history
+        return quote
+
+    with patch('app.services.vnstock_service.Trading', return_value=trading), \
+         patch('app.services.vnstock_service.Quote', side_effect=slow_quote):
+        started = time.monotonic()
+        indices = service.get_market_indices(['VNINDEX', 'HNXINDEX', 'VN30'])
+        elapsed = time.monotonic() - started
+
+    assert trading.price_board.call_count == 1
+    assert [i.index_name for i in indices] == ['VNINDEX', 'HNXINDEX', 'VN30']
+    assert indices[0].index_value == 1280.5
+    assert indices[1].change == 2.0
+    assert elapsed < 0.35
+
+def test_unknown_symbols_do_not_open_the_quote_circuit():
+    """Test provider 'no data' errors complete the call instead of counting as outages"""
+    breaker = get_breaker('vnstock.quote')
+    threshold = breaker.failure_threshold
+
+    class Quote:
+        def __init__(self, symbol, source):
+            self.symbol = symbol
+
+        def history(self, **kwargs):
+            if self.symbol == 'BADX':
+                raise ValueError("Không tìm thấy dữ liệu")
+            return pd.DataFrame({'time': ['2024-08-12'], 'open': [100.0], 'high': [101.0], 'low': [99.0],
+                                 'close': [100.5], 'volume': [1000]})
+
+    with patch('app.services.vnstock_service.Quote', Quote):
+        for _ in range(threshold + 1):
+            assert vnstock_service.get_stock_history('BADX', '1M', use_store=False) is None
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert vnstock_service.get_stock_history('FPT', '1M', use_store=False).data[0].close == 100.5
@@ -105,11 +105,12 @@ export class VietnamStockAPI {
 
   async getStockHistory(
     symbol: string,
-    period: string = "1Y"
+    period: string = "1Y",
+    adjusted: boolean = false
   ): Promise<VNStockHistory | null> {
     try {
       const response = await fetch(
-        `${this.pythonServiceUrl}/stocks/${symbol}/history?period=${period}`
+        `${this.pythonServiceUrl}/stocks/${symbol}/history?period=${period}&adjusted=${adjusted}`
       );
       if (!response.ok) return null;
 